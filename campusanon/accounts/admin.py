@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, EmailOTP
+from .models import User, EmailOTP, AccountErasure
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -11,4 +11,10 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(EmailOTP)
 class EmailOTPAdmin(admin.ModelAdmin):
     list_display = ('email', 'otp', 'attempts', 'expires_at')
-    search_fields = ('email',)
\ No newline at end of file
+    search_fields = ('email',)
+
+@admin.register(AccountErasure)
+class AccountErasureAdmin(admin.ModelAdmin):
+    list_display = ('user_id', 'status', 'step', 'requested_at', 'updated_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('deleted_counts', 'error')
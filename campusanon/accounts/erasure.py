@@ -0,0 +1,189 @@
+"""
+Chunked account erasure.
+
+Deleting a User through the ORM cascades through every post, comment, like,
+report, notification, rate-limit row and audit entry in one transaction.
+Here each table is emptied in fixed-size batches, children before parents,
+with plain DELETE ... WHERE pk IN (...) statements.
+
+Every step is idempotent ("delete whatever is still left"). Each batch (its
+DELETE, its after-batch hook and the progress saved on the AccountErasure
+row) commits as one transaction, so an interrupted job simply resumes from
+its recorded step with its counters right. Steps touching posts_post / posts_postlike
+wait outside settings.ERASURE_PEAK_HOURS.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from communities.models import CommunityMembership
+from posts.models import (
+    Post,
+    Comment,
+    PostLike,
+    CommentLike,
+    PostReport,
+    CommentReport,
+    Notification,
+    RateLimit,
+    AdminAuditLog,
+    PostMedia,
+)
+from posts.media import delete_files
+from posts.moderation import REPORT_THRESHOLD, COMMENT_REPORT_THRESHOLD, release_report
+from posts.purge import raw_delete
+from campusanon import stamps
+
+from .models import User, AccountErasure
+
+PEAK_WAIT_SECONDS = 300
+
+
+def _release_reports(model, threshold, target_ids):
+    """ Keep stored report counters right when reports on others' content go away. """
+    unhidden = [
+        target_id
+        for target_id, removed in Counter(target_ids).items()
+        if release_report(model, target_id, threshold, count=removed)
+    ]
+    if not unhidden:
+        return
+    # Unhidden rows change their feed (posts) or their post (comments)
+    if model is Post:
+        rows = Post.objects.filter(pk__in=unhidden).values_list("pk", "community_id")
+        keys = {stamps.feed(cid) for _, cid in rows} | {stamps.post(pk) for pk, _ in rows}
+    else:
+        post_ids = Comment.objects.filter(pk__in=unhidden).values_list("post_id", flat=True)
+        keys = {stamps.post(pid) for pid in post_ids}
+    transaction.on_commit(lambda: stamps.bump(*keys))
+
+
+def _bump_feeds(community_ids):
+    keys = {stamps.feed(cid) for cid in community_ids}
+    transaction.on_commit(lambda: stamps.bump(*keys))
+
+
+def _delete_files(media_ids):
+    # Storage can't roll back: only drop the files once their rows are gone
+    transaction.on_commit(lambda: delete_files(media_ids))
+
+
+# (name, queryset for user_id, touches a hot table, column whose values are
+#  passed to the after-batch hook, after-batch hook)
+STEPS = [
+    ("comment_likes", lambda uid: CommentLike.objects.filter(user_id=uid), False, None, None),
+    ("comment_likes_received", lambda uid: CommentLike.objects.filter(comment__user_id=uid), False, None, None),
+    ("comment_likes_on_posts", lambda uid: CommentLike.objects.filter(comment__post__user_id=uid), False, None, None),
+    ("comment_reports_filed", lambda uid: CommentReport.objects.filter(reporter_id=uid).exclude(comment__user_id=uid),
+     False, "comment_id", lambda ids: _release_reports(Comment, COMMENT_REPORT_THRESHOLD, ids)),
+    ("comment_reports_received", lambda uid: CommentReport.objects.filter(comment__user_id=uid), False, None, None),
+    ("comment_reports_on_posts", lambda uid: CommentReport.objects.filter(comment__post__user_id=uid), False, None, None),
+    ("comments_on_posts", lambda uid: Comment.objects.filter(post__user_id=uid), False, None, None),
+    ("comments", lambda uid: Comment.objects.filter(user_id=uid), False, None, None),
+    ("post_likes", lambda uid: PostLike.objects.filter(user_id=uid), True, None, None),
+    ("post_likes_received", lambda uid: PostLike.objects.filter(post__user_id=uid), True, None, None),
+    ("post_reports_filed", lambda uid: PostReport.objects.filter(reporter_id=uid).exclude(post__user_id=uid),
+     False, "post_id", lambda ids: _release_reports(Post, REPORT_THRESHOLD, ids)),
+    ("post_reports_received", lambda uid: PostReport.objects.filter(post__user_id=uid), False, None, None),
+    ("notifications_received", lambda uid: Notification.objects.filter(recipient_id=uid), False, None, None),
+    ("notifications_sent", lambda uid: Notification.objects.filter(actor_id=uid), False, None, None),
+    ("notifications_on_posts", lambda uid: Notification.objects.filter(post__user_id=uid), False, None, None),
+    ("media", lambda uid: PostMedia.objects.filter(uploader_id=uid), False, "id", _delete_files),
+    ("media_on_posts", lambda uid: PostMedia.objects.filter(post__user_id=uid), False, "id", _delete_files),
+    ("posts", lambda uid: Post.objects.filter(user_id=uid), True, "community_id", _bump_feeds),
+    ("rate_limits", lambda uid: RateLimit.objects.filter(user_id=uid), False, None, None),
+    ("audit_logs", lambda uid: AdminAuditLog.objects.filter(admin_id=uid), False, None, None),
+    ("memberships", lambda uid: CommunityMembership.objects.filter(user_id=uid), False, None, None),
+]
+STEP_NAMES = [name for name, *_ in STEPS]
+
+
+def _peak_hours():
+    start, end = (int(h) for h in settings.ERASURE_PEAK_HOURS.split("-"))
+    return start, end
+
+
+def is_peak_time(now=None):
+    start, end = _peak_hours()
+    hour = timezone.localtime(now).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end  # window wraps midnight
+
+
+def request_erasure(user):
+    """
+    Lock the account immediately and create (or return) its erasure job.
+    The rows themselves are removed by run_erasure().
+    """
+    User.objects.filter(pk=user.pk).update(is_banned=True, is_active=False)
+    job, _ = AccountErasure.objects.get_or_create(user_id=user.pk)
+    return job
+
+
+def run_erasure(job, batch_size=None, wait_for_off_peak=True, progress=None):
+    """
+    Run (or resume) one erasure job to completion.
+
+    progress(job, step, deleted_in_batch) is called after every batch.
+    If wait_for_off_peak is False the job returns early (status "running")
+    when it reaches a hot-table step during peak hours.
+    Returns True when the account is fully erased.
+    """
+    batch_size = batch_size or settings.ERASURE_BATCH_SIZE
+    uid = job.user_id
+
+    job.status = "running"
+    job.error = ""
+    job.save(update_fields=["status", "error", "updated_at"])
+
+    start_index = STEP_NAMES.index(job.step) if job.step in STEP_NAMES else 0
+
+    try:
+        for name, make_queryset, hot, hook_field, hook in STEPS[start_index:]:
+            job.step = name
+            job.save(update_fields=["step", "updated_at"])
+
+            while True:
+                if hot and is_peak_time():
+                    if not wait_for_off_peak:
+                        return False
+                    time.sleep(PEAK_WAIT_SECONDS)
+                    continue
+
+                fields = ["pk", hook_field] if hook_field else ["pk"]
+                rows = list(make_queryset(uid).values_list(*fields)[:batch_size])
+                if not rows:
+                    break
+
+                model = make_queryset(uid).model
+                with transaction.atomic():
+                    deleted = raw_delete(model.objects.filter(pk__in=[row[0] for row in rows]))
+                    if hook:
+                        hook([row[1] for row in rows])
+                    job.deleted_counts[name] = job.deleted_counts.get(name, 0) + deleted
+                    job.save(update_fields=["deleted_counts", "updated_at"])
+                if progress:
+                    progress(job, name, deleted)
+
+                if settings.ERASURE_BATCH_PAUSE:
+                    time.sleep(settings.ERASURE_BATCH_PAUSE)
+
+        # Everything heavy is gone; the remaining cascade (admin log
+        # entries, group links) is tiny.
+        job.step = "user"
+        User.objects.filter(pk=uid).delete()
+
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        job.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    job.status = "done"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "step", "finished_at", "updated_at"])
+    return True
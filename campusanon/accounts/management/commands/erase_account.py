@@ -0,0 +1,59 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.erasure import request_erasure, run_erasure
+from accounts.models import User, AccountErasure
+
+
+class Command(BaseCommand):
+    help = 'Erases accounts and all their data in batches (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', help='Users to erase')
+        parser.add_argument('--resume', action='store_true', help='Resume every unfinished erasure job')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--no-wait', action='store_true',
+                            help='Stop instead of waiting when a hot table is reached during peak hours')
+
+    def handle(self, *args, **options):
+        jobs = []
+
+        for user_id in options['user_ids']:
+            try:
+                user_id = uuid.UUID(user_id)
+            except ValueError:
+                raise CommandError(f"{user_id!r} is not a user id")
+            try:
+                user = User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                # Already gone? Resume its job if one exists.
+                job = AccountErasure.objects.filter(user_id=user_id).first()
+                if job is None:
+                    raise CommandError(f"User {user_id} not found")
+                jobs.append(job)
+                continue
+            jobs.append(request_erasure(user))
+
+        if options['resume']:
+            jobs += list(AccountErasure.objects.exclude(status="done").exclude(pk__in=[j.pk for j in jobs]))
+
+        if not jobs:
+            self.stdout.write("Nothing to erase.")
+            return
+
+        def progress(job, step, deleted):
+            self.stdout.write(f"   {job.user_id} · {step}: -{deleted} (total {job.deleted_counts[step]})")
+
+        for job in jobs:
+            self.stdout.write(f"🧹 Erasing {job.user_id} (from step '{job.step or 'start'}')")
+            finished = run_erasure(
+                job,
+                batch_size=options['batch_size'],
+                wait_for_off_peak=not options['no_wait'],
+                progress=progress,
+            )
+            if finished:
+                self.stdout.write(f"✅ Erased {job.user_id}")
+            else:
+                self.stdout.write(f"⏸️  Paused {job.user_id} at '{job.step}' (peak hours); re-run with --resume")
@@ -77,4 +77,30 @@ class EmailOTP(models.Model):
     attempts = models.IntegerField(default=0)
 
     def is_expired(self):
-        return timezone.now() > self.expires_at
\ No newline at end of file
+        return timezone.now() > self.expires_at
+
+class AccountErasure(models.Model):
+    """
+    Progress of an account-erasure job (see accounts/erasure.py).
+    Stores user_id rather than a FK because the user row is deleted last.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    user_id = models.UUIDField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+
+    step = models.CharField(max_length=50, blank=True)  # step currently being processed
+    deleted_counts = models.JSONField(default=dict)     # step -> rows deleted so far
+    error = models.TextField(blank=True)
+
+    requested_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Erasure {self.user_id} ({self.status})"
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from campusanon.scheduler import periodic
+from campusanon.tasks import task
+from .models import EmailOTP
+
+# Expired codes stay a little while: verify_otp answers "expired", not "invalid"
+EXPIRED_OTP_KEEP = timedelta(hours=1)
+
+
+# Own queue: a slow SMTP server never holds up notifications
+@task(queue="email", retries=4)
+def send_otp_email(email, otp):
+    send_mail(
+        subject="Your Verification Code",
+        message=f"Your OTP is {otp}. It expires in 5 minutes.",
+        from_email=None,  # uses DEFAULT_FROM_EMAIL
+        recipient_list=[email],
+    )
+
+
+@periodic("*/15 * * * *")
+def prune_expired_otps():
+    return EmailOTP.objects.filter(expires_at__lt=timezone.now() - EXPIRED_OTP_KEEP).delete()[0]
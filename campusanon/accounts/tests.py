@@ -1,3 +1,130 @@
-from django.test import TestCase
+import io
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from campusanon.testing import BudgetTestCase
+from posts.models import Post, Comment, PostReport
+from posts.moderation import REPORT_THRESHOLD, record_report
+from .erasure import request_erasure, run_erasure
+from .models import AccountErasure, EmailOTP, User
+from .utils import hash_email
+
+
+# ---------------------------------------------------------
+# 📏 Query budgets
+# ---------------------------------------------------------
+class AuthBudgetTests(BudgetTestCase):
+    email = "student@aitpune.edu.in"
+
+    def _otp(self):
+        EmailOTP.objects.update_or_create(
+            email=self.email,
+            defaults={"otp": "123456", "expires_at": timezone.now() + timezone.timedelta(minutes=5)},
+        )
+
+    @override_settings(TASKS_EAGER=True)
+    def test_send_otp(self):
+        for campus in self.campuses():
+            # update_or_create: select + insert, inside two savepoints.
+            # The email goes out after commit, from the task.
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertBudget(6):
+                    self.client.post("/auth/send-otp/", {"email": self.email})
+            self.assertEqual(len(mail.outbox), 1)
+            mail.outbox.clear()
+
+    def test_login(self):
+        for campus in self.campuses():
+            User.objects.filter(pk=campus.viewer.pk).update(email_hash=hash_email(self.email))
+            self._otp()
+            # otp, user exists, user, global membership get_or_create,
+            # clear notifications, delete otp
+            with self.assertBudget(6):
+                response = self.client.post("/auth/verify-otp/", {"email": self.email, "otp": "123456"})
+            self.assertEqual(response.status_code, 200)
+
+    def test_register(self):
+        for campus in self.campuses():
+            self._otp()
+            # + user insert, class membership, global membership (get_or_create
+            # in a savepoint)
+            with self.assertBudget(10):
+                response = self.client.post("/auth/verify-otp/", {
+                    "email": self.email, "otp": "123456", "year": 2, "branch": "IT",
+                })
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data["is_new_user"])
+
+    def test_me(self):
+        for campus in self.campuses():
+            with self.assertBudget(0):
+                self.client_for(campus.viewer).get("/auth/me/")
+
+
+# ---------------------------------------------------------
+# 🧹 Account erasure
+# ---------------------------------------------------------
+@override_settings(ERASURE_PEAK_HOURS="0-0", ERASURE_BATCH_PAUSE=0)
+class ErasureTests(BudgetTestCase):
+    sizes = (5,)
+
+    def reported_post(self, campus):
+        """ A post by authors[1], hidden by reports from authors[0], authors[2] and the viewer. """
+        post = next(p for p in campus.posts if p.user_id == campus.authors[1].id)
+        for reporter in (campus.authors[0], campus.authors[2], campus.viewer)[:REPORT_THRESHOLD]:
+            PostReport.objects.create(post=post, reporter=reporter, reason="spam")
+            record_report(post, REPORT_THRESHOLD)
+        return post
+
+    def test_erasure_removes_everything_in_batches(self):
+        for campus in self.campuses():
+            author = campus.authors[0]
+            post = self.reported_post(campus)
+            own_posts = Post.objects.filter(user=author).count()
+            job = request_erasure(author)
+
+            self.assertTrue(run_erasure(job, batch_size=2))
+
+            self.assertFalse(User.objects.filter(pk=author.pk).exists())
+            self.assertFalse(Post.objects.filter(user_id=author.pk).exists())
+            self.assertFalse(Comment.objects.filter(user_id=author.pk).exists())
+            job.refresh_from_db()
+            self.assertEqual(job.status, "done")
+            self.assertEqual(job.deleted_counts["post_reports_filed"], 1)
+            self.assertEqual(job.deleted_counts["posts"], own_posts)
+
+            # Their report is withdrawn: below the threshold, the post is back
+            post.refresh_from_db()
+            self.assertEqual((post.reports_count, post.is_hidden, post.hidden_reason), (REPORT_THRESHOLD - 1, False, ""))
+
+    def test_failed_batch_rolls_back_and_resumes(self):
+        for campus in self.campuses():
+            author = campus.authors[0]
+            post = self.reported_post(campus)
+            job = request_erasure(author)
+
+            with mock.patch("accounts.erasure.release_report", side_effect=RuntimeError("boom")):
+                with self.assertRaises(RuntimeError):
+                    run_erasure(job)
+
+            # The report delete went back with the hook that failed
+            job = AccountErasure.objects.get(pk=job.pk)
+            self.assertEqual((job.status, job.step), ("failed", "post_reports_filed"))
+            self.assertNotIn("post_reports_filed", job.deleted_counts)
+            self.assertTrue(PostReport.objects.filter(reporter=author).exists())
+
+            self.assertTrue(run_erasure(job))
+            self.assertEqual(job.deleted_counts["post_reports_filed"], 1)
+            post.refresh_from_db()
+            self.assertFalse(post.is_hidden)
+
+    def test_command_rejects_unknown_ids(self):
+        for campus in self.campuses():
+            for user_id in ("not-a-uuid", str(uuid.uuid4())):
+                with self.assertRaises(CommandError):
+                    call_command("erase_account", user_id, stdout=io.StringIO())
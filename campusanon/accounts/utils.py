@@ -2,8 +2,8 @@ import random
 import hashlib
 from datetime import timedelta
 from django.utils import timezone
-from django.core.mail import send_mail
 from .models import EmailOTP
+from .tasks import send_otp_email
 import string
 
 
@@ -34,9 +34,5 @@ def send_email_otp(email):
         }
     )
 
-    send_mail(
-        subject="Your Verification Code",
-        message=f"Your OTP is {otp}. It expires in 5 minutes.",
-        from_email=None,  # uses DEFAULT_FROM_EMAIL
-        recipient_list=[email],
-    )
+    # Sent by the task worker: the request doesn't wait on SMTP
+    send_otp_email.delay(email, otp)
@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,13 +9,16 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from .models import User, EmailOTP
 from .utils import send_email_otp, hash_email, generate_internal_username
 
-# ✅ Import Community Models directly for strict lookup
-from communities.models import Community, CommunityMembership
+# ✅ Communities come from the in-memory registry (no SQL per login)
+from communities.models import CommunityMembership
+from communities.registry import community_registry
 from posts.models import Notification
 
 
 COLLEGE_DOMAIN = "@aitpune.edu.in"
 
+logger = logging.getLogger(__name__)
+
 class SendOTPView(APIView):
     permission_classes = [AllowAny]
 
@@ -33,8 +38,8 @@ class SendOTPView(APIView):
         try:
             send_email_otp(email)
             return Response({"message": "OTP sent successfully"})
-        except Exception as e:
-            print(f"Error sending OTP: {e}")
+        except Exception:
+            logger.exception("Error sending OTP")
             return Response({"error": "Failed to send email"}, status=500)
 
 
@@ -93,13 +98,8 @@ class VerifyOTPView(APIView):
             clean_div = division if division in ['A', 'B'] else None
 
             # 🛑 Lookup the EXACT community (e.g. "1st Year COMP A")
-            try:
-                target_community = Community.objects.get(
-                    year=year,
-                    branch=clean_branch,
-                    division=clean_div
-                )
-            except Community.DoesNotExist:
+            target_community = community_registry.get_by_class(year, clean_branch, clean_div)
+            if target_community is None:
                 return Response(
                     {"error": f"Class {year} {clean_branch} {clean_div or ''} not found."},
                     status=400
@@ -119,7 +119,7 @@ class VerifyOTPView(APIView):
             CommunityMembership.objects.create(user=user, community=target_community)
             
             # ✅ Add to Global
-            global_comm = Community.objects.filter(is_global=True).first()
+            global_comm = community_registry.get_global()
             if global_comm:
                 CommunityMembership.objects.get_or_create(user=user, community=global_comm)
 
@@ -137,7 +137,7 @@ class VerifyOTPView(APIView):
             # We trust the membership we created during registration.
             
             # Ensure Global is still there (safe fallback)
-            global_comm = Community.objects.filter(is_global=True).first()
+            global_comm = community_registry.get_global()
             if global_comm:
                  CommunityMembership.objects.get_or_create(user=user, community=global_comm)
 
@@ -0,0 +1,44 @@
+"""
+Conditional GET helpers (ETag -> 304).
+
+Views derive the validator from cheap inputs (version stamps from
+campusanon/stamps.py, a token stored next to a cached payload, the request
+parameters) *before* running their queries, so an unchanged response costs a
+cache lookup instead of a database round trip.
+
+There is no Last-Modified: an ETag also covers the viewer and the request
+parameters, and stamp tokens are finer than HTTP dates' whole seconds, so
+If-Modified-Since alone could answer 304 for a changed response.
+"""
+import hashlib
+
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _strip(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request, etag):
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    if if_none_match.strip() == "*":
+        return True
+    return _strip(etag) in {_strip(t) for t in if_none_match.split(",")}
+
+
+def with_validators(response, etag):
+    response["ETag"] = etag
+    return response
+
+
+def not_modified_response(etag):
+    return with_validators(Response(status=304), etag)
@@ -0,0 +1,170 @@
+"""
+Primary / read-replica routing.
+
+Replicas come from DATABASE_REPLICA_URLS (comma separated) and are registered
+as DATABASES["replica_1"], ["replica_2"], ... in settings. Only views that
+opt in with ReplicaReadMixin send their GET queries to a replica; everything
+else, and every write, uses "default".
+
+Read-your-writes: after a successful non-GET request the user is pinned to
+the primary for REPLICA_PIN_SECONDS. A replica is skipped while it is
+unreachable or more than REPLICA_MAX_LAG_SECONDS behind; when none is
+usable the read goes to the primary.
+
+Local testing: point DATABASE_URL at one Postgres and
+DATABASE_REPLICA_URLS at a second one (a streaming replica, or any copy of
+the schema if you only want to watch the routing).
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_read_alias = ContextVar("read_db_alias", default=None)
+
+HEALTH_CHECK_INTERVAL = 5  # seconds a replica health result is trusted
+
+_health = {}  # alias -> (checked_at, healthy)
+_health_lock = threading.Lock()
+
+LAG_SQL = """
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END, 0)
+"""
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def _check(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+    except Exception as e:
+        logger.warning("Replica %s unavailable: %s", alias, e)
+        connections[alias].close()
+        return False
+
+    if lag > settings.REPLICA_MAX_LAG_SECONDS:
+        logger.warning("Replica %s lagging %.1fs, skipping", alias, lag)
+        return False
+    return True
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (0, False))
+    if now - checked_at < HEALTH_CHECK_INTERVAL:
+        return healthy
+
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (0, False))
+        if now - checked_at >= HEALTH_CHECK_INTERVAL:
+            healthy = _check(alias)
+            _health[alias] = (now, healthy)
+    return healthy
+
+
+def pick_replica():
+    """ A healthy replica alias, or None to stay on the primary. """
+    candidates = replica_aliases()
+    random.shuffle(candidates)
+    for alias in candidates:
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+# ---------------------------------------------------------
+# Read-your-writes stickiness
+# ---------------------------------------------------------
+def _pin_key(user_id):
+    return f"db_pin_primary_{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+# ---------------------------------------------------------
+# Router / view mixin / middleware
+# ---------------------------------------------------------
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaReadMixin:
+    """
+    Opt a DRF view into replica reads for safe methods.
+    Decided after authentication, so pinned users stay on the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method not in SAFE_METHODS or not replica_aliases():
+            return
+        user = request.user
+        if user.is_authenticated and is_pinned(user.id):
+            return
+
+        alias = pick_replica()
+        if alias:
+            _read_alias.set(alias)
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Resets the per-request read alias and pins users who just wrote
+    something to the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and replica_aliases()
+        ):
+            # DRF copies the authenticated user onto the Django request
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.id)
+
+        return response
@@ -0,0 +1,165 @@
+"""
+In-process cache in front of Redis, for hot values that rarely change.
+
+Each worker keeps an LRU of up to LOCAL_CACHE_MAX_ENTRIES values and
+LOCAL_CACHE_MAX_BYTES (pickled size, measured once on insert); the least
+recently used entries go first. Entries also expire after their own TTL,
+capped at LOCAL_CACHE_MAX_TTL.
+
+invalidate(*keys) drops keys here and publishes them on a Redis channel;
+every worker listens and drops them too. A worker that loses its
+subscription clears everything once it is back, since messages sent in
+between are lost; the TTL cap bounds staleness if Redis pub/sub is down.
+
+Values are shared between requests: treat them as read-only.
+stats() (ops/connections/) reports hits, misses, evictions and size.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+from django.conf import settings
+
+from campusanon.redis import pubsub_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "local_cache:invalidate"
+
+_MISSING = object()
+
+
+class LocalCache:
+
+    def __init__(self, max_entries, max_bytes, max_ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()   # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    # ---------------------------------------------------------
+    # Reads / writes
+    # ---------------------------------------------------------
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, size = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl):
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes // 10:
+            return  # one value may not push out a tenth of the cache
+        self._ensure_listener()
+
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key, load, ttl):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = load()
+            self.set(key, value, ttl)
+        return value
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ---------------------------------------------------------
+    # Cross-worker invalidation
+    # ---------------------------------------------------------
+    def invalidate(self, *keys):
+        """ Drop keys in this worker and tell every other worker to do the same. """
+        self.delete(*keys)
+        self.invalidations += len(keys)
+        try:
+            redis_client.publish(CHANNEL, orjson.dumps(keys))
+        except Exception as exc:
+            logger.warning("Could not publish cache invalidation: %s", exc)
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name="local-cache", daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                # Own connection without a read timeout: a quiet channel is normal
+                with pubsub_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    pubsub.subscribe(CHANNEL)
+                    # Invalidations published while we were disconnected are lost
+                    self.clear()
+                    backoff = 1
+                    for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self.delete(*orjson.loads(message["data"]))
+            except Exception as exc:
+                logger.warning("Local cache listener disconnected: %s", exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+local_cache = LocalCache(
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+    max_ttl=settings.LOCAL_CACHE_MAX_TTL,
+)
@@ -0,0 +1,204 @@
+"""
+Structured, non-blocking logging.
+
+- QueueStreamHandler: the request thread only copies the record onto a
+  bounded in-memory queue; a QueueListener thread formats it and writes to
+  stdout. When the queue is full, records are dropped (and counted) rather
+  than blocking a request.
+- JsonFormatter: one JSON object per line, including the request id and any
+  `extra={...}` fields.
+- RequestIdMiddleware / RequestIdFilter: every record logged while serving
+  a request carries its X-Request-ID (taken from the proxy or generated).
+- QueueRotatingFileHandler: the same, writing to a size-rotated file
+  (used for the slow query log).
+- SampleFilter: keeps a fraction of a chatty logger's INFO/DEBUG records.
+  Warnings and errors always pass.
+
+Wired up in settings.LOGGING.
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import orjson
+
+_request_id = ContextVar("request_id", default=None)
+
+# Anything a LogRecord has by default; the rest came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def set_request_id(value):
+    """ For work outside requests (background tasks); returns a token for reset_request_id(). """
+    return _request_id.set(value)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+# ---------------------------------------------------------
+# Request ids
+# ---------------------------------------------------------
+class RequestIdMiddleware:
+    """ Reuses a sane incoming X-Request-ID or makes one, and echoes it back. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        incoming = request.headers.get("X-Request-ID", "")
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        request.request_id = request_id
+
+        token = _request_id.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_id.reset(token)
+
+        response["X-Request-ID"] = request_id
+        return response
+
+
+class RequestIdFilter(logging.Filter):
+    """ Stamps the current request id on the record (runs in the caller's thread). """
+
+    def filter(self, record):
+        # django.request logs after the middleware returns, but passes the request
+        request = getattr(record, "request", None)
+        record.request_id = getattr(request, "request_id", None) or _request_id.get()
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """ Passes `rate` (0..1) of records below WARNING. """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+# ---------------------------------------------------------
+# JSON lines
+# ---------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+# ---------------------------------------------------------
+# Queue handler
+# ---------------------------------------------------------
+class _Listener(QueueListener):
+
+    def stop(self):
+        if self._thread is not None:  # atexit may come after an explicit stop()
+            super().stop()
+
+    def enqueue_sentinel(self):
+        # A full queue at shutdown: wait for the running thread to make room
+        # instead of failing (and losing what is queued)
+        self.queue.put(self._sentinel)
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Hands records to a background thread that formats and writes them.
+    The formatter configured for this handler is used by that thread.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = self.make_target(stream)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def make_target(self, stream):
+        return logging.StreamHandler(stream or sys.stdout)
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, not in prepare()
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        # Threads don't survive fork: start one per (gunicorn worker) process
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._listener = _Listener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+                atexit.register(self._listener.stop)
+
+    def prepare(self, record):
+        # Cheap copy: merge args now (they may change later), keep fields raw
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueueRotatingFileHandler(QueueStreamHandler):
+    """ Same, but the background thread writes to a size-rotated file. """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        super().__init__(queue_size=queue_size)
+
+    def make_target(self, stream):
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        return RotatingFileHandler(
+            self.filename, maxBytes=self.max_bytes, backupCount=self.backup_count, delay=True
+        )
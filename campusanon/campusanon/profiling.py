@@ -0,0 +1,165 @@
+"""
+On-demand profiling of a single request, for staff.
+
+Send `X-Profile: 1` (or `?_profile=1`) with a staff account's token. That
+request is run under:
+
+- a stack sampler: a background thread records the request thread's stack
+  every PROFILER_INTERVAL seconds (wall clock, so time spent waiting on
+  Postgres / Redis shows up too), aggregated as collapsed stacks that
+  flamegraph.pl / speedscope read directly;
+- tracemalloc: top allocation sites (by line) and the peak traced memory.
+
+The result is kept in the cache for PROFILE_TTL seconds and the response
+carries `X-Profile-Id` / `X-Profile-URL` (campusanon/views.py serves it).
+
+Requests without the trigger only pay a header lookup. One profile runs at
+a time per process; tracemalloc is process-wide, so other threads of the
+same worker are slower while it runs.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from posts.permissions import IsAdminUser
+
+HEADER = "X-Profile"
+QUERY_PARAM = "_profile"
+PROFILE_TTL = 3600
+MAX_STACKS = 2000        # distinct collapsed stacks kept
+TOP_ALLOCATIONS = 30
+
+_profile_lock = threading.Lock()
+
+
+def profile_key(profile_id):
+    return f"profile:{profile_id}"
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = "/".join(filename.split(os.sep)[-2:])
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+class StackSampler(threading.Thread):
+    """ Samples one thread's stack at a fixed interval. """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _wants_profile(request):
+    return request.headers.get(HEADER) == "1" or request.GET.get(QUERY_PARAM) == "1"
+
+
+def _is_staff(request):
+    """ Session user, or the JWT DRF would authenticate later. """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        user = result[0] if result else None
+    return user is not None and IsAdminUser().has_permission(SimpleNamespace(user=user), None)
+
+
+class RequestProfilerMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _wants_profile(request) or not _is_staff(request):
+            return self.get_response(request)
+
+        if not _profile_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response[HEADER] = "busy"
+            return response
+        try:
+            return self._profile(request)
+        finally:
+            _profile_lock.release()
+
+    def _profile(self, request):
+        profile_id = uuid.uuid4().hex
+        sampler = StackSampler(threading.get_ident(), settings.PROFILER_INTERVAL)
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+
+        allocations = [
+            {
+                "where": str(stat.traceback[0]),
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            }
+            for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+        ]
+        cache.set(profile_key(profile_id), {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "request_id": getattr(request, "request_id", None),
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 2),
+            "interval_ms": settings.PROFILER_INTERVAL * 1000,
+            "samples": sum(sampler.samples.values()),
+            "stacks": dict(sampler.samples.most_common(MAX_STACKS)),
+            "peak_memory_kb": round(peak / 1024, 1),
+            "allocations": allocations,
+        }, timeout=PROFILE_TTL)
+
+        response[HEADER + "-Id"] = profile_id
+        response[HEADER + "-URL"] = f"/ops/profiles/{profile_id}/"
+        return response
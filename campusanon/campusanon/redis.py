@@ -1,11 +1,172 @@
+"""
+One Redis connection layer for the whole project.
+
+Each worker process keeps three bounded, instrumented pools, all on
+REDIS_URL (one database, so plans that only offer db 0 work too):
+
+- the cache pool: Django's `cache` (django_redis, through
+  SharedConnectionFactory). Replies are bytes, as django_redis needs. Every
+  cache key starts with the cache's KEY_PREFIX, and `cache.clear()`
+  (PrefixedCacheClient) deletes only those keys instead of FLUSHDB;
+- the data pool behind `redis_client`: rate limits, the audit buffer, task
+  queues, scheduler locks, the duplicate index... Replies are str
+  (decode_responses). None of its keys carry the cache prefix, so clearing
+  the cache never wipes queued work;
+- `pubsub_client`, for the invalidation listeners: a subscriber waits on a
+  quiet channel for as long as it takes, so its connections have no read
+  timeout (keepalive notices a dead server instead).
+
+redis_stats() reports connections opened, handshake time, round trips and
+commands sent by this process, plus pool usage.
+"""
+import threading
+import time
 import redis
-import os
 from django.conf import settings
+from django_redis.client import DefaultClient
+from django_redis.exceptions import ConnectionInterrupted
+from django_redis.pool import ConnectionFactory
+
+_stats_lock = threading.Lock()
+_stats = {
+    "connections_opened": 0,
+    "handshake_ms": 0.0,
+    "round_trips": 0,
+    "commands": 0,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+class InstrumentedConnection(redis.Connection):
+    """ Counts handshakes, round trips and commands. """
+
+    def connect(self):
+        if self._sock:
+            return
+        started = time.perf_counter()
+        super().connect()
+        _count(connections_opened=1, handshake_ms=(time.perf_counter() - started) * 1000)
+
+    def pack_command(self, *args):
+        _count(commands=1)
+        return super().pack_command(*args)
+
+    def pack_commands(self, commands):
+        commands = list(commands)
+        _count(commands=len(commands))
+        return super().pack_commands(commands)
+
+    def send_packed_command(self, command, check_health=True):
+        _count(round_trips=1)
+        return super().send_packed_command(command, check_health)
+
+
+class InstrumentedPool(redis.BlockingConnectionPool):
+    """ Bounded pool that keeps its own count of connections made and checked out. """
+
+    def __init__(self, *args, **kwargs):
+        self._usage_lock = threading.Lock()
+        self.created = 0
+        self.in_use = 0
+        super().__init__(*args, **kwargs)
+
+    def reset(self):
+        # Also runs after fork: the child starts with no connections
+        with self._usage_lock:
+            self.created = 0
+            self.in_use = 0
+        super().reset()
+
+    def make_connection(self):
+        connection = super().make_connection()
+        with self._usage_lock:
+            self.created += 1
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        connection = super().get_connection(*args, **kwargs)
+        with self._usage_lock:
+            self.in_use += 1
+        return connection
+
+    def release(self, connection):
+        with self._usage_lock:
+            self.in_use = max(self.in_use - 1, 0)
+        super().release(connection)
+
+    def usage(self):
+        with self._usage_lock:
+            return {
+                "max_connections": self.max_connections,
+                "created": self.created,
+                "in_use": self.in_use,
+                "idle": self.created - self.in_use,
+            }
+
+
+# Bounded: callers wait (up to `timeout`) for a free connection instead of
+# opening more. redis-py pools reset themselves after fork, so gunicorn
+# workers never share sockets.
+_pool_options = dict(
+    connection_class=InstrumentedConnection,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=5,
+    socket_connect_timeout=2,
+    socket_timeout=5,
+    socket_keepalive=True,
+    health_check_interval=30,
+)
+
+pool = InstrumentedPool.from_url(settings.REDIS_URL, **_pool_options)
+client_pool = InstrumentedPool.from_url(settings.REDIS_URL, decode_responses=True, **_pool_options)
+# One connection per listener thread (registry, content filter, local cache)
+pubsub_pool = InstrumentedPool.from_url(settings.REDIS_URL, decode_responses=True, **{
+    **_pool_options,
+    "max_connections": 8,
+    "socket_timeout": None,
+})
+
+redis_client = redis.Redis(connection_pool=client_pool)
+pubsub_client = redis.Redis(connection_pool=pubsub_pool)
+
+
+class SharedConnectionFactory(ConnectionFactory):
+    """ django_redis factory that hands out the shared cache pool instead of its own. """
+
+    def get_or_create_connection_pool(self, params):
+        return pool
+
+
+class PrefixedCacheClient(DefaultClient):
+    """ django_redis client whose clear() only deletes the cache's own (prefixed) keys. """
+
+    CLEAR_BATCH = 1000
+
+    def clear(self, client=None):
+        if client is None:
+            client = self.get_client(write=True)
+        try:
+            batch = []
+            for key in client.scan_iter(match=f"{self._backend.key_prefix}:*", count=self.CLEAR_BATCH):
+                batch.append(key)
+                if len(batch) >= self.CLEAR_BATCH:
+                    client.unlink(*batch)
+                    batch = []
+            if batch:
+                client.unlink(*batch)
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            raise ConnectionInterrupted(connection=client) from e
 
-# ⚡ 6. Redis (Production settings)
-redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-redis_client = redis.Redis.from_url(
-    redis_url,
-    decode_responses=True  # Important: Returns strings instead of bytes
-)
\ No newline at end of file
+def redis_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pool"] = pool.usage()
+    stats["client_pool"] = client_pool.usage()
+    stats["pubsub_pool"] = pubsub_pool.usage()
+    return stats
@@ -0,0 +1,322 @@
+"""
+Periodic jobs with cron schedules, declared next to the code they maintain.
+
+    from campusanon.scheduler import periodic
+
+    @periodic("*/15 * * * *")       # minute hour day month weekday, UTC
+    def prune_expired_otps():
+        ...
+
+`manage.py runscheduler` (Procfile "scheduler") does not run jobs itself:
+when a job is due it queues it as a background task (campusanon/tasks.py)
+and a runworker thread runs it. Any number of schedulers may be up:
+
+- one of them holds the leader lock (SET NX with a LEASE_SECONDS expiry,
+  renewed every tick); the others wait to take over if it goes quiet;
+- every (job, minute) is fired at most once, through a SET NX key, so a
+  hand-over never runs a job twice. Minutes missed while nobody led are
+  caught up (once per job) if they are at most MAX_CATCHUP old.
+
+Supported cron syntax: "*", "5", "1-5", "*/10", "0-30/5" and lists of
+those, per field; weekday 0 or 7 is Sunday. As in cron, when both day and
+weekday are restricted a day matching either one runs the job. Schedules
+are UTC, like the competition day (communities/rollups.py).
+
+A job never overlaps itself: a run that finds the previous one still going
+(scheduler:running:<job>) is skipped, and one that can't check (Redis down)
+fails without running; the next scheduled run is the retry. Every run
+records its start, duration and outcome in Redis (newest HISTORY_KEEP per
+job); staff read them at ops/scheduler/.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import orjson
+
+from campusanon.redis import redis_client
+from campusanon.tasks import DEFAULT_QUEUE, task
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "scheduler:leader"
+LAST_TICK_KEY = "scheduler:last_tick"
+FIRED_PREFIX = "scheduler:fired:"
+HISTORY_PREFIX = "scheduler:history:"
+RUNNING_PREFIX = "scheduler:running:"
+
+TICK_SECONDS = 5
+LEASE_SECONDS = 30
+MAX_CATCHUP = timedelta(minutes=10)
+FIRED_TTL = 2 * 86400
+HISTORY_KEEP = 50
+RUNNING_TTL = 3600          # a run that died without unlocking frees its job after this
+MINUTE = timedelta(minutes=1)
+
+_jobs = {}
+
+# Extend the lease only if we still hold it
+_renew = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+""")
+
+
+_unlock = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+# ---------------------------------------------------------
+# Cron expressions
+# ---------------------------------------------------------
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(","):
+        value_range, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start, end = (int(v) for v in value_range.split("-", 1))
+        else:
+            start = int(value_range)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"{part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class Cron:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron needs 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = frozenset(d % 7 for d in _parse_field(fields[4], 0, 7))
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def __str__(self):
+        return self.expression
+
+    def _day_matches(self, dt):
+        day = dt.day in self.days
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays  # cron: 0 = Sunday
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def matches(self, dt):
+        return (
+            dt.minute in self.minutes
+            and dt.hour in self.hours
+            and dt.month in self.months
+            and self._day_matches(dt)
+        )
+
+    def next_after(self, dt):
+        """ First matching minute after dt (None if none within a year). """
+        t = dt.replace(second=0, microsecond=0) + MINUTE
+        limit = t + timedelta(days=366)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += MINUTE
+            else:
+                return t
+        return None
+
+
+# ---------------------------------------------------------
+# Declaring jobs
+# ---------------------------------------------------------
+class Job:
+    def __init__(self, name, cron, task_, func):
+        self.name = name
+        self.cron = cron
+        self.task = task_
+        self.func = func  # the undecorated job, without locking or history
+
+
+def periodic(schedule, *, name=None, queue=DEFAULT_QUEUE):
+    """ Run the decorated function on a cron schedule (returns its Task). """
+    cron = Cron(schedule)
+
+    def wrap(func):
+        job_name = name or f"{func.__module__}.{func.__qualname__}"
+        if job_name in _jobs:
+            raise ValueError(f"Job {job_name} is already scheduled")
+
+        def run():
+            _run_and_record(job_name, func)
+        run.__doc__ = func.__doc__
+
+        # No retries: the next scheduled run is the retry
+        task_ = task(run, name=job_name, queue=queue, retries=0)
+        _jobs[job_name] = Job(job_name, cron, task_, func)
+        return task_
+    return wrap
+
+
+def _run_and_record(name, func):
+    token = uuid.uuid4().hex
+    try:
+        if not redis_client.set(RUNNING_PREFIX + name, token, nx=True, ex=RUNNING_TTL):
+            logger.info("Job %s is still running, skipped", name)
+            return
+    except Exception as exc:
+        logger.warning("Could not lock %s, not running it: %s", name, exc)
+        raise
+
+    started = time.time()
+    error = None
+    try:
+        func()
+    except Exception as exc:
+        error = repr(exc)
+        raise
+    finally:
+        entry = {
+            "started_at": started,
+            "duration_ms": round((time.time() - started) * 1000, 2),
+            "ok": error is None,
+            "error": error,
+        }
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.lpush(HISTORY_PREFIX + name, orjson.dumps(entry))
+            pipe.ltrim(HISTORY_PREFIX + name, 0, HISTORY_KEEP - 1)
+            pipe.execute()
+        except Exception as exc:
+            logger.warning("Could not record run of %s: %s", name, exc)
+        try:
+            _unlock(keys=[RUNNING_PREFIX + name], args=[token])
+        except Exception:
+            pass  # expires after RUNNING_TTL
+        logger.info("Job %s ran in %.0fms", name, entry["duration_ms"], extra={"ok": entry["ok"]})
+
+
+def jobs():
+    return dict(_jobs)
+
+
+# ---------------------------------------------------------
+# Scheduler (runscheduler)
+# ---------------------------------------------------------
+def _minute_floor(dt):
+    return dt.replace(second=0, microsecond=0)
+
+
+class Scheduler:
+    def __init__(self):
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.stopping = threading.Event()
+        self.leading = False
+
+    def run(self):
+        try:
+            while not self.stopping.is_set():
+                try:
+                    if self.lead():
+                        self.tick()
+                except Exception as exc:
+                    logger.warning("Scheduler tick failed: %s", exc)
+                self.stopping.wait(TICK_SECONDS)
+        finally:
+            if self.leading:
+                # Hand over at once instead of after the lease runs out
+                _renew(keys=[LEADER_KEY], args=[self.id, 0])
+
+    def stop(self):
+        self.stopping.set()
+
+    def lead(self):
+        """ Take or keep the leader lock; True while we hold it. """
+        was_leading = self.leading
+        self.leading = bool(
+            redis_client.set(LEADER_KEY, self.id, nx=True, ex=LEASE_SECONDS)
+            or _renew(keys=[LEADER_KEY], args=[self.id, LEASE_SECONDS])
+        )
+        if self.leading != was_leading:
+            logger.info("Scheduler %s %s", self.id, "is now the leader" if self.leading else "lost the lead")
+        return self.leading
+
+    def tick(self, now=None):
+        """ Queue every job due since the last tick. Returns the names fired. """
+        now = _minute_floor(now or datetime.now(dt_timezone.utc))
+        last = redis_client.get(LAST_TICK_KEY)
+        start = now
+        if last is not None:
+            last = datetime.fromtimestamp(float(last), tz=dt_timezone.utc)
+            start = max(last + MINUTE, now - MAX_CATCHUP)
+
+        fired = []
+        for job in _jobs.values():
+            # Latest due minute only: a job missed several times runs once
+            due = None
+            minute = start
+            while minute <= now:
+                if job.cron.matches(minute):
+                    due = minute
+                minute += MINUTE
+            if due is not None and self.fire(job, due):
+                fired.append(job.name)
+
+        redis_client.set(LAST_TICK_KEY, now.timestamp())
+        return fired
+
+    def fire(self, job, minute):
+        key = f"{FIRED_PREFIX}{job.name}:{int(minute.timestamp())}"
+        if not redis_client.set(key, self.id, nx=True, ex=FIRED_TTL):
+            return False
+        job.task.delay()
+        return True
+
+
+# ---------------------------------------------------------
+# Ops
+# ---------------------------------------------------------
+def status(history=5):
+    now = datetime.now(dt_timezone.utc)
+    names = sorted(_jobs)
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(LEADER_KEY)
+    for job_name in names:
+        pipe.lrange(HISTORY_PREFIX + job_name, 0, history - 1)
+    leader, *histories = pipe.execute()
+
+    result = []
+    for job_name, runs in zip(names, histories):
+        job = _jobs[job_name]
+        runs = [orjson.loads(raw) for raw in runs]
+        for run in runs:
+            run["started_at"] = datetime.fromtimestamp(run["started_at"], tz=dt_timezone.utc)
+        result.append({
+            "name": job_name,
+            "schedule": str(job.cron),
+            "queue": job.task.queue,
+            "next_run": job.cron.next_after(now),
+            "history": runs,
+        })
+    return {"leader": leader, "jobs": result}
@@ -49,12 +49,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # 🌐 8. CORS (Must be at the top)
+    'campusanon.logs.RequestIdMiddleware',  # 🔍 X-Request-ID on every log line
+    'campusanon.profiling.RequestProfilerMiddleware',  # 🔬 X-Profile: 1 (staff only)
+    'campusanon.slow_queries.SlowQueryContextMiddleware',  # 🐢 view / route for slow queries
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'campusanon.db_router.DatabaseRoutingMiddleware',  # 📖 Replica reads / read-your-writes
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,17 +86,66 @@ WSGI_APPLICATION = 'campusanon.wsgi.application'
 # =================================================
 # 🗄️ 5. DATABASE (PostgreSQL)
 # =================================================
-# Reads DATABASE_URL from .env
-DATABASES = {
-    'default': dj_database_url.config(
-        default=os.getenv('DATABASE_URL'),
-        conn_max_age=600,
+# 🏊 Connection pooling (psycopg3 + psycopg_pool, Django >= 5.1)
+# With a pool each worker keeps DB_POOL_MIN..DB_POOL_MAX open connections
+# instead of one persistent connection per thread (CONN_MAX_AGE must be 0).
+try:
+    from psycopg_pool import ConnectionPool as _PsycopgPool
+except ImportError:  # psycopg2 / no pool available: keep persistent connections
+    _PsycopgPool = None
+
+DB_POOL_ENABLED = _PsycopgPool is not None and os.getenv('DB_POOL', 'True') == 'True'
+
+
+def _database(url):
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DB_POOL_ENABLED else 600,
         # 👇 CHANGE THIS LINE
         # This checks for a specific env variable. If it's missing, it defaults to False.
-        ssl_require=os.getenv('DB_SSL_MODE') == 'True' 
-    )
+        ssl_require=os.getenv('DB_SSL_MODE') == 'True'
+    ) if url else {}
+    if DB_POOL_ENABLED and 'postgresql' in config.get('ENGINE', ''):
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX', 10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),       # wait for a free connection
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),    # close idle extras
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+            'check': _PsycopgPool.check_connection,                   # health check on checkout
+        }
+    return config
+
+
+# Reads DATABASE_URL from .env
+DATABASES = {
+    'default': _database(os.getenv('DATABASE_URL'))
 }
 
+# 📖 Read replicas (campusanon/db_router.py)
+# DATABASE_REPLICA_URLS=postgres://...replica1,postgres://...replica2
+for _i, _url in enumerate(u.strip() for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u.strip()):
+    _replica = _database(_url)
+    # Fail fast so a dead replica falls back to the primary quickly
+    if 'postgresql' in _replica['ENGINE']:
+        _replica.setdefault('OPTIONS', {})['connect_timeout'] = int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 2))
+    # Tests run against the primary only
+    _replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{_i + 1}'] = _replica
+
+DATABASE_ROUTERS = ['campusanon.db_router.PrimaryReplicaRouter']
+# Skip a replica that is more than this far behind the primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+# After a write, the user's reads stay on the primary for this long
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+# Opt-in monthly partitioning of posts_notification (posts/partitions.py).
+# Only read while migration posts/0019 runs: flipping it later changes nothing,
+# and partition maintenance refuses to run until it matches the table again.
+# The scheduler keeps future partitions (posts/tasks.py), `manage.py
+# manage_partitions` does it by hand.
+PARTITIONED_NOTIFICATIONS = os.getenv('PARTITIONED_NOTIFICATIONS', 'False') == 'True'
+
 # =================================================
 # 🌐 8. CORS (Frontend Access)
 # =================================================
@@ -118,6 +171,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # ⚡ orjson-backed JSON (campusanon/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'campusanon.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -134,15 +192,30 @@ AUTH_USER_MODEL = "accounts.User"
 # =================================================
 # ⚡ CACHING (Redis)
 # =================================================
+# Shared by the cache and redis_client (queues, audit buffer, locks...): the
+# cache's keys carry KEY_PREFIX and cache.clear() only deletes those
+REDIS_URL = os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1")
+# Per worker process and per pool (cache / redis_client), see campusanon/redis.py
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 20))
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "cache",
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CLIENT_CLASS": "campusanon.redis.PrefixedCacheClient",
         }
     }
 }
+# django_redis uses the project's instrumented cache pool
+DJANGO_REDIS_CONNECTION_FACTORY = "campusanon.redis.SharedConnectionFactory"
+
+# 🧠 In-process LRU in front of Redis, per worker (campusanon/local_cache.py)
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", 5000))
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# Upper bound on staleness if an invalidation message is lost
+LOCAL_CACHE_MAX_TTL = int(os.getenv("LOCAL_CACHE_MAX_TTL", 60))
 
 
 # =================================================
@@ -184,23 +257,120 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'  # Required for collectstatic
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# =================================================
+# 🖼️ MEDIA (image attachments, posts/media.py)
+# =================================================
+# Local filesystem by default; point MEDIA_STORAGE_BACKEND at any Django
+# storage (e.g. an S3 backend) to move uploads off the web servers.
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', BASE_DIR / 'media'))
+MEDIA_URL = os.getenv('MEDIA_URL', '/media/')
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "media": {"BACKEND": os.getenv('MEDIA_STORAGE_BACKEND', "django.core.files.storage.FileSystemStorage")},
+}
+
+MEDIA_MAX_UPLOAD_BYTES = int(os.getenv('MEDIA_MAX_UPLOAD_BYTES', 8 * 1024 * 1024))
+MEDIA_MAX_PIXELS = int(os.getenv('MEDIA_MAX_PIXELS', 40_000_000))
+MEDIA_MAX_PER_POST = int(os.getenv('MEDIA_MAX_PER_POST', 4))
+
+# =================================================
+# ⚙️ BACKGROUND TASKS (campusanon/tasks.py, `manage.py runworker`)
+# =================================================
+# Run tasks inline at enqueue time instead of on a worker (dev without a worker, tests)
+TASKS_EAGER = os.getenv('TASKS_EAGER') == 'True'
+TASKS_WORKER_THREADS = int(os.getenv('TASKS_WORKER_THREADS', 4))
+# First retry after this many seconds, doubling each time
+TASKS_RETRY_BACKOFF = float(os.getenv('TASKS_RETRY_BACKOFF', 5))
+# Failed tasks kept for inspection / re-queueing (ops/tasks/)
+TASKS_DEAD_LETTER_KEEP = int(os.getenv('TASKS_DEAD_LETTER_KEEP', 1000))
+
+# Periodic jobs (campusanon/scheduler.py, `manage.py runscheduler`)
+# Notifications older than this are pruned nightly (0 = keep them all)
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+
+# =================================================
+# 🪞 NEAR-DUPLICATE SPAM (posts/duplicates.py)
+# =================================================
+# Copies of a post / comment within this window count towards a raid
+DUPLICATE_WINDOW_SECONDS = int(os.getenv('DUPLICATE_WINDOW_SECONDS', 900))
+# SimHash bits (of 64) two texts may differ by and still be copies
+DUPLICATE_MAX_DISTANCE = int(os.getenv('DUPLICATE_MAX_DISTANCE', 12))
+# Shorter texts ("same here", "lol") repeat innocently and are not checked
+DUPLICATE_MIN_LENGTH = int(os.getenv('DUPLICATE_MIN_LENGTH', 40))
+# Earlier copies in the window before a new one is published hidden / refused
+DUPLICATE_HIDE_AFTER = int(os.getenv('DUPLICATE_HIDE_AFTER', 2))
+DUPLICATE_BLOCK_AFTER = int(os.getenv('DUPLICATE_BLOCK_AFTER', 5))
+
 # =================================================
 # 🔍 11. LOGGING
 # =================================================
+# JSON lines on stdout, written by a background thread (campusanon/logs.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "campusanon.logs.RequestIdFilter"},
+        # High-volume INFO events: keep a sample (warnings/errors always pass)
+        "sample_admin_check": {
+            "()": "campusanon.logs.SampleFilter",
+            "rate": float(os.getenv("LOG_SAMPLE_ADMIN_CHECK", 0.01)),
+        },
+    },
+    "formatters": {
+        "json": {"()": "campusanon.logs.JsonFormatter"},
+    },
     "handlers": {
         "console": {
-            "class": "logging.StreamHandler",
+            "()": "campusanon.logs.QueueStreamHandler",
+            "queue_size": int(os.getenv("LOG_QUEUE_SIZE", 10000)),
+            "formatter": "json",
+            "filters": ["request_id"],
+        },
+        "slow_queries_file": {
+            "()": "campusanon.logs.QueueRotatingFileHandler",
+            "filename": os.getenv("SLOW_QUERY_LOG", str(BASE_DIR / "logs" / "slow_queries.log")),
+            "max_bytes": 10 * 1024 * 1024,
+            "backup_count": 5,
+            "formatter": "json",
+            "filters": ["request_id"],
         },
     },
     "root": {
         "handlers": ["console"],
-        "level": "INFO",
+        "level": LOG_LEVEL,
+    },
+    "loggers": {
+        # "Who is posting as admin" checks on every create post / comment
+        "posts.admin_check": {"filters": ["sample_admin_check"]},
+        # 🐢 campusanon/slow_queries.py: rotating file, plus the console
+        "campusanon.slow_queries": {"handlers": ["slow_queries_file"]},
     },
 }
 
+# 🐢 Slow query capture (campusanon/slow_queries.py); 0 disables it
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+# Fraction of slow SELECTs that also get EXPLAIN (ANALYZE, BUFFERS)
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 0.1))
+# Entries kept in Redis for ops/slow-queries/
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", 500))
+
+# 🔬 Per-request profiling for staff (campusanon/profiling.py)
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "True") == "True"
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", 0.001))  # seconds between stack samples
+
+# =================================================
+# 🧹 12. ACCOUNT ERASURE (accounts/erasure.py)
+# =================================================
+ERASURE_BATCH_SIZE = int(os.getenv('ERASURE_BATCH_SIZE', 500))
+# Seconds to sleep between batches (gives the primary room to breathe)
+ERASURE_BATCH_PAUSE = float(os.getenv('ERASURE_BATCH_PAUSE', 0.05))
+# Local hours "start-end" during which posts_post / posts_postlike are left alone
+ERASURE_PEAK_HOURS = os.getenv('ERASURE_PEAK_HOURS', '17-24')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,160 @@
+"""
+Slow query capture.
+
+Every database connection gets an execute wrapper (installed on
+connection_created). A query taking SLOW_QUERY_MS or more is recorded with
+the view class and URL route that issued it (set per request by
+SlowQueryContextMiddleware; "-" outside requests, e.g. management commands).
+
+For SLOW_QUERY_EXPLAIN_RATE of the slow SELECTs the plan is captured right
+away on the same connection: EXPLAIN (ANALYZE, BUFFERS) on Postgres, which
+runs the query a second time, or EXPLAIN QUERY PLAN on SQLite. Only plain
+reads are explained (no FOR UPDATE / FOR SHARE, no data-modifying CTE), in
+a savepoint so a failed or cancelled EXPLAIN can't abort the caller's
+transaction.
+
+Entries go to the "campusanon.slow_queries" logger (a rotating JSON file,
+see settings.LOGGING) and to a capped Redis list read by the staff endpoint
+ops/slow-queries/. Query parameters are never stored.
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from campusanon.logs import get_request_id
+from campusanon.redis import redis_client
+
+logger = logging.getLogger("campusanon.slow_queries")
+
+RECENT_KEY = "slow_queries:recent"
+MAX_SQL_LENGTH = 4000
+
+_request_context = ContextVar("slow_query_context", default=None)
+_local = threading.local()  # re-entrancy guard while running EXPLAIN
+
+EXPLAIN_PREFIX = {
+    "postgresql": "EXPLAIN (ANALYZE, BUFFERS) ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+
+def fingerprint(sql):
+    """ SQL is already parameterised, so the text identifies the query shape. """
+    return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+# Row locks (FOR [NO KEY] UPDATE, FOR [KEY] SHARE) or a CTE that writes:
+# running these a second time is not harmless
+_NOT_READ_ONLY = re.compile(r"\bFOR\s+(KEY\s+)?SHARE\b|\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def _is_read_only(sql):
+    head = sql.lstrip()[:10].upper()
+    if not (head.startswith("SELECT") or head.startswith("WITH")):
+        return False
+    return _NOT_READ_ONLY.search(sql) is None
+
+
+def _explain(connection, sql, params):
+    prefix = EXPLAIN_PREFIX.get(connection.vendor)
+    if prefix is None or not _is_read_only(sql):
+        return None
+    _local.explaining = True
+    try:
+        # A savepoint: a failure (e.g. statement_timeout) rolls back only the EXPLAIN
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        _local.explaining = False
+
+
+def record(connection, sql, params, many, duration_ms):
+    context = _request_context.get() or {}
+    explain = None
+    if not many and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+        explain = _explain(connection, sql, params)
+
+    entry = {
+        "time": timezone.now().isoformat(),
+        "duration_ms": round(duration_ms, 2),
+        "alias": connection.alias,
+        "view": context.get("view", "-"),
+        "route": context.get("route", "-"),
+        "method": context.get("method", "-"),
+        "request_id": get_request_id(),
+        "fingerprint": fingerprint(sql),
+        "sql": sql[:MAX_SQL_LENGTH],
+        "many": many,
+        "explain": explain,
+    }
+    logger.warning("slow query %.1fms in %s", duration_ms, entry["view"], extra={"slow_query": entry})
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.lpush(RECENT_KEY, orjson.dumps(entry))
+        pipe.ltrim(RECENT_KEY, 0, settings.SLOW_QUERY_KEEP - 1)
+        pipe.execute()
+    except Exception:
+        pass  # the log file still has it
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_local, "explaining", False):
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= settings.SLOW_QUERY_MS:
+        record(context["connection"], sql, params, many, duration_ms)
+    return result
+
+
+def install(sender, connection, **kwargs):
+    # Wrappers live on the DatabaseWrapper, which outlives each connect()
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def recent(limit):
+    return [orjson.loads(raw) for raw in redis_client.lrange(RECENT_KEY, 0, limit - 1)]
+
+
+class SlowQueryContextMiddleware:
+    """ Tells the wrapper which view and route a query belongs to. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request_context.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _request_context.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "view_class", view_func)
+        match = request.resolver_match
+        _request_context.set({
+            "view": f"{view.__module__}.{view.__qualname__}",
+            "route": match.route if match else request.path,
+            "method": request.method,
+        })
+
+
+if settings.SLOW_QUERY_MS > 0:
+    connection_created.connect(install)
@@ -0,0 +1,60 @@
+"""
+Version stamps for cached read paths.
+
+A stamp is a small token in the cache. Cache keys and ETags embed the
+stamps they depend on, so bumping a stamp invalidates every derived entry
+at once without hunting down keys.
+
+Stamps expire after STAMP_TTL (a read of any id creates one, so they must
+not pile up). An expired stamp comes back as a new token: derived entries
+just miss once.
+"""
+import time
+
+from django.core.cache import cache
+
+PREFIX = "stamp:"
+STAMP_TTL = 86400
+
+
+def feed(community_id):
+    """ Posts (and their counters) visible in one community feed """
+    return f"feed:{community_id}"
+
+
+def likes(community_id):
+    """ Like counts in one community feed (kept apart so likes don't evict cached pages) """
+    return f"likes:{community_id}"
+
+
+def post(post_id):
+    """ One post and its comment list """
+    return f"post:{post_id}"
+
+
+def _new_token():
+    return str(time.time_ns())
+
+
+def get_many(names):
+    """ Current token per name. Missing stamps are created, never reported as a shared default. """
+    keys = {PREFIX + name: name for name in names}
+    found = cache.get_many(list(keys))
+
+    result = {keys[k]: v for k, v in found.items()}
+    for key, name in keys.items():
+        if name not in result:
+            # add() so concurrent readers agree on one token
+            cache.add(key, _new_token(), timeout=STAMP_TTL)
+            result[name] = cache.get(key) or _new_token()
+    return result
+
+
+def get(name):
+    return get_many([name])[name]
+
+
+def bump(*names):
+    if names:
+        token = _new_token()
+        cache.set_many({PREFIX + name: token for name in names}, timeout=STAMP_TTL)
@@ -0,0 +1,154 @@
+"""
+Stampede-safe caching for expensive computed values.
+
+get_or_compute(key, compute, ttl, stale_ttl) stores the value together
+with a soft expiry:
+
+- fresh (younger than ~ttl): returned as is;
+- stale (past the soft expiry, still within ttl + stale_ttl): returned at
+  once, and one process recomputes it in a background thread;
+- missing: one caller computes it while the others wait up to
+  WAIT_SECONDS for the result (then compute it themselves rather than fail).
+
+"One" is decided by a lock key taken with cache.add (SET NX on Redis), so
+it holds across gunicorn workers and machines. Soft and hard expiries are
+jittered so entries written together don't all expire together.
+
+Fresh entries are also kept in this worker's local_cache (until their
+soft expiry), so a hot key costs a dict lookup; invalidate(key) drops it
+from Redis and from every worker.
+
+Values must be picklable and are shared between requests (treat them as
+read-only); None is a valid value.
+"""
+import contextvars
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connections
+
+from campusanon.local_cache import local_cache
+
+logger = logging.getLogger(__name__)
+
+JITTER = 0.1             # fraction of the TTL
+LOCK_TIMEOUT = 30        # seconds; a crashed recompute frees the lock after this
+WAIT_SECONDS = 5
+POLL_SECONDS = 0.05
+REFRESH_THREADS = 2
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _entry_key(key):
+    # Own namespace: entries are (value, fresh_until), not what callers stored before
+    return f"swr:{key}"
+
+
+def _lock_key(key):
+    return f"swr:{key}:recompute"
+
+
+def _keep_local(key, entry):
+    local_cache.set(_entry_key(key), entry, ttl=entry[1] - time.time())
+
+
+def _store(key, value, ttl, stale_ttl):
+    fresh_until = time.time() + ttl * (1 - JITTER * random.random())
+    timeout = math.ceil((ttl + stale_ttl) * (1 + JITTER * random.random()))
+    entry = (value, fresh_until)
+    cache.set(_entry_key(key), entry, timeout=timeout)
+    _keep_local(key, entry)
+
+
+def invalidate(*keys):
+    """ Forget keys everywhere: Redis and every worker's local copy. """
+    entry_keys = [_entry_key(key) for key in keys]
+    cache.delete_many(entry_keys)
+    local_cache.invalidate(*entry_keys)
+
+
+def _acquire(key, lock_timeout):
+    token = uuid.uuid4().hex
+    return token if cache.add(_lock_key(key), token, timeout=lock_timeout) else None
+
+
+def _release(key, token):
+    # Best effort: don't drop a lock a later recompute took after ours timed out
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def _get_executor():
+    # Threads don't survive fork: one pool per (gunicorn worker) process
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(REFRESH_THREADS, thread_name_prefix="swr-refresh")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _refresh(key, compute, ttl, stale_ttl, token):
+    try:
+        _store(key, compute(), ttl, stale_ttl)
+    except Exception:
+        logger.exception("Background refresh of %s failed", key)
+    finally:
+        _release(key, token)
+        connections.close_all()  # this thread's connections only
+
+
+def get_or_compute(key, compute, ttl, stale_ttl=None, lock_timeout=LOCK_TIMEOUT, wait=WAIT_SECONDS):
+    """
+    Cached value of compute() under `key`. Fresh for about `ttl` seconds,
+    then served stale for up to `stale_ttl` more (default: ttl) while one
+    caller refreshes it.
+    """
+    stale_ttl = ttl if stale_ttl is None else stale_ttl
+
+    # Only fresh entries are kept locally
+    entry = local_cache.get(_entry_key(key))
+    if entry is not None:
+        return entry[0]
+
+    entry = cache.get(_entry_key(key))
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            _keep_local(key, entry)
+        else:
+            token = _acquire(key, lock_timeout)
+            if token:
+                # Keep the request id etc. on the refresh's log records
+                context = contextvars.copy_context()
+                _get_executor().submit(context.run, _refresh, key, compute, ttl, stale_ttl, token)
+        return value
+
+    token = _acquire(key, lock_timeout)
+    if token is None:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_SECONDS)
+            entry = cache.get(_entry_key(key))
+            if entry is not None:
+                return entry[0]
+        logger.warning("Gave up waiting for %s to be computed", key)
+
+    try:
+        value = compute()
+        _store(key, value, ttl, stale_ttl)
+        return value
+    finally:
+        if token:
+            _release(key, token)
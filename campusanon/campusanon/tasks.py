@@ -0,0 +1,361 @@
+"""
+Background tasks on Redis, run by `manage.py runworker`.
+
+    from campusanon.tasks import task
+
+    @task(retries=5)
+    def send_otp_email(email, otp):
+        ...
+
+    send_otp_email.delay(email, otp)            # once the transaction commits
+    send_otp_email.apply_async(args=(email, otp), countdown=60)
+
+Arguments go through orjson (UUIDs and datetimes arrive as strings) and a
+task is looked up by name ("module.function") in the worker, which imports
+every app's tasks.py.
+
+Redis layout:
+
+- tasks:queue:<queue>      list, LPUSH in / moved out from the right;
+- tasks:processing:<slot>  list, what one worker thread is running. BLMOVE
+                           from the queue makes the hand-over atomic, so a
+                           task is only lost if Redis itself loses it;
+- tasks:delayed            zset scored by run time: countdowns, retries and
+                           work recovered from dead workers; moved onto its
+                           queue by the workers (Lua, atomic);
+- tasks:dead               list of tasks out of retries (newest first, capped
+                           at TASKS_DEAD_LETTER_KEEP), with the error;
+- tasks:workers            hash worker id -> threads; each worker refreshes
+                           tasks:worker:<id> (with a TTL) as a heartbeat, and
+                           any worker re-queues the processing lists of one
+                           whose heartbeat is gone;
+- tasks:stats:<name>       hash: succeeded, retried, dead, run / wait seconds.
+
+Failures retry after TASKS_RETRY_BACKOFF * 2**attempt seconds (+ jitter).
+A task may run more than once (a worker dying mid-task re-runs it), so
+tasks should be idempotent.
+
+If Redis is down, delay() runs the task in the calling thread instead
+(like the audit buffer); TASKS_EAGER=True always does (dev and tests).
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import orjson
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from campusanon.logs import get_request_id, reset_request_id, set_request_id
+from campusanon.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PREFIX = "tasks:queue:"
+PROCESSING_PREFIX = "tasks:processing:"
+DELAYED_KEY = "tasks:delayed"
+DEAD_KEY = "tasks:dead"
+WORKERS_KEY = "tasks:workers"
+HEARTBEAT_PREFIX = "tasks:worker:"
+STATS_PREFIX = "tasks:stats:"
+NAMES_KEY = "tasks:names"
+
+DEFAULT_QUEUE = "default"
+BLOCK_SECONDS = 1           # how long an idle thread waits on its first queue
+HEARTBEAT_SECONDS = 5
+HEARTBEAT_TTL = 30          # a worker silent for this long is presumed dead
+PROMOTE_BATCH = 100
+
+_registry = {}
+
+# Due delayed tasks -> their queue, atomically
+_promote = redis_client.register_script("""
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, payload in ipairs(due) do
+    redis.call('ZREM', KEYS[1], payload)
+    redis.call('LPUSH', ARGV[3] .. cjson.decode(payload)['queue'], payload)
+end
+return #due
+""")
+
+# A dead worker thread's processing list -> delayed (due now), atomically
+_recover = redis_client.register_script("""
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for _, payload in ipairs(items) do
+    redis.call('ZADD', KEYS[2], ARGV[1], payload)
+end
+redis.call('DEL', KEYS[1])
+return #items
+""")
+
+
+def _queue_key(queue):
+    return QUEUE_PREFIX + queue
+
+
+# ---------------------------------------------------------
+# Declaring / enqueueing
+# ---------------------------------------------------------
+class Task:
+    def __init__(self, func, name, queue, retries):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.retries = retries
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        """ Run now, in this thread. """
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<Task {self.name}>"
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown=0):
+        """ Queue the task once the current transaction commits; returns its id. """
+        message = {
+            "id": uuid.uuid4().hex,
+            "task": self.name,
+            "queue": self.queue,
+            "args": list(args),
+            "kwargs": kwargs or {},
+            "attempt": 0,
+            "enqueued_at": time.time(),
+            "request_id": get_request_id(),
+        }
+        payload = orjson.dumps(message)  # unserialisable arguments fail here, in the caller
+        transaction.on_commit(lambda: _send(self, message, payload, countdown))
+        return message["id"]
+
+
+def task(func=None, *, name=None, queue=DEFAULT_QUEUE, retries=3):
+    """ @task or @task(queue=..., retries=...) """
+    def wrap(func):
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        if task_name in _registry:
+            raise ValueError(f"Task {task_name} is already registered")
+        _registry[task_name] = Task(func, task_name, queue, retries)
+        return _registry[task_name]
+    return wrap(func) if func is not None else wrap
+
+
+def declared_queues():
+    """ Queues of the registered tasks, default first. """
+    return [DEFAULT_QUEUE] + sorted({t.queue for t in _registry.values()} - {DEFAULT_QUEUE})
+
+
+def _send(task_, message, payload, countdown):
+    if settings.TASKS_EAGER:
+        task_(*message["args"], **message["kwargs"])
+        return
+    try:
+        if countdown > 0:
+            redis_client.zadd(DELAYED_KEY, {payload: time.time() + countdown})
+        else:
+            redis_client.lpush(_queue_key(message["queue"]), payload)
+    except Exception as exc:
+        logger.warning("Task queue unavailable, running %s inline: %s", task_.name, exc)
+        try:
+            task_(*message["args"], **message["kwargs"])
+        except Exception:
+            logger.exception("Inline run of %s failed", task_.name)
+
+
+# ---------------------------------------------------------
+# Worker
+# ---------------------------------------------------------
+class Worker:
+    """ `threads` threads taking tasks from `queues` (earlier queues first). """
+
+    def __init__(self, queues, threads):
+        self.queues = list(queues)
+        self.threads = threads
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.stopping = threading.Event()
+
+    def slot_key(self, slot):
+        return f"{PROCESSING_PREFIX}{self.id}:{slot}"
+
+    def run(self):
+        self._heartbeat()
+        redis_client.hset(WORKERS_KEY, self.id, self.threads)
+        logger.info("Worker %s started", self.id, extra={"queues": self.queues, "threads": self.threads})
+
+        threads = [
+            threading.Thread(target=self._consume, args=(slot,), name=f"task-worker-{slot}", daemon=True)
+            for slot in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self.stopping.is_set():
+                try:
+                    self._heartbeat()
+                    _promote(keys=[DELAYED_KEY], args=[time.time(), PROMOTE_BATCH, QUEUE_PREFIX])
+                    recover_dead_workers()
+                except Exception as exc:
+                    logger.warning("Worker housekeeping failed: %s", exc)
+                self.stopping.wait(HEARTBEAT_SECONDS)
+        finally:
+            # Let running tasks finish, then leave
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+            pipe = redis_client.pipeline()
+            pipe.hdel(WORKERS_KEY, self.id)
+            pipe.delete(HEARTBEAT_PREFIX + self.id)
+            pipe.execute()
+            logger.info("Worker %s stopped", self.id)
+
+    def stop(self):
+        self.stopping.set()
+
+    def _heartbeat(self):
+        redis_client.set(HEARTBEAT_PREFIX + self.id, 1, ex=HEARTBEAT_TTL)
+
+    def _consume(self, slot):
+        processing = self.slot_key(slot)
+        while not self.stopping.is_set():
+            try:
+                payload = self._take(processing)
+            except Exception as exc:
+                logger.warning("Could not take a task: %s", exc)
+                self.stopping.wait(BLOCK_SECONDS)
+                continue
+            if payload is not None:
+                close_old_connections()
+                try:
+                    execute(payload, processing)
+                finally:
+                    close_old_connections()
+        connection.close()
+
+    def _take(self, processing):
+        for queue in self.queues[1:]:
+            payload = redis_client.lmove(_queue_key(queue), processing, "RIGHT", "LEFT")
+            if payload is not None:
+                return payload
+        return redis_client.blmove(_queue_key(self.queues[0]), processing, BLOCK_SECONDS, "RIGHT", "LEFT")
+
+
+def execute(payload, processing):
+    """ Run one task and settle it: done, retry later, or dead letter. """
+    message = orjson.loads(payload)
+    name = message["task"]
+    task_ = _registry.get(name)
+    started = time.time()
+    token = set_request_id(message.get("request_id") or message["id"])
+    try:
+        if task_ is None:
+            raise LookupError(f"Unknown task {name}")
+        task_(*message["args"], **message["kwargs"])
+        error = None
+    except Exception as exc:
+        error = exc
+        details = traceback.format_exc()
+    finally:
+        reset_request_id(token)
+    run_seconds = time.time() - started
+
+    stats_key = STATS_PREFIX + name
+    pipe = redis_client.pipeline()  # MULTI: settle and count together
+    pipe.lrem(processing, 1, payload)
+    pipe.sadd(NAMES_KEY, name)
+    pipe.hincrbyfloat(stats_key, "run_seconds", run_seconds)
+    pipe.hincrbyfloat(stats_key, "wait_seconds", started - message["enqueued_at"])
+
+    if error is None:
+        pipe.hincrby(stats_key, "succeeded", 1)
+    elif task_ is not None and message["attempt"] < task_.retries:
+        delay = settings.TASKS_RETRY_BACKOFF * 2 ** message["attempt"] * (1 + random.random() / 2)
+        message["attempt"] += 1
+        message["enqueued_at"] = time.time() + delay  # wait time counts from the retry
+        pipe.zadd(DELAYED_KEY, {orjson.dumps(message): time.time() + delay})
+        pipe.hincrby(stats_key, "retried", 1)
+        logger.warning("Task %s failed (attempt %s), retrying in %.0fs: %s",
+                       name, message["attempt"], delay, error, extra={"task_id": message["id"]})
+    else:
+        message.update(error=repr(error), traceback=details, failed_at=time.time())
+        pipe.lpush(DEAD_KEY, orjson.dumps(message))
+        pipe.ltrim(DEAD_KEY, 0, settings.TASKS_DEAD_LETTER_KEEP - 1)
+        pipe.hincrby(stats_key, "dead", 1)
+        logger.error("Task %s failed for good: %s", name, error, extra={"task_id": message["id"], "traceback": details})
+    pipe.execute()
+
+
+def recover_dead_workers():
+    """ Re-queue what workers without a heartbeat were running. Returns tasks recovered. """
+    recovered = 0
+    for worker_id, threads in redis_client.hgetall(WORKERS_KEY).items():
+        if redis_client.exists(HEARTBEAT_PREFIX + worker_id):
+            continue
+        for slot in range(int(threads)):
+            recovered += _recover(
+                keys=[f"{PROCESSING_PREFIX}{worker_id}:{slot}", DELAYED_KEY], args=[time.time()]
+            )
+        redis_client.hdel(WORKERS_KEY, worker_id)
+        logger.warning("Worker %s is gone; re-queued its tasks", worker_id)
+    return recovered
+
+
+# ---------------------------------------------------------
+# Ops
+# ---------------------------------------------------------
+def stats():
+    names = sorted(redis_client.smembers(NAMES_KEY))
+    queues = declared_queues()
+
+    pipe = redis_client.pipeline(transaction=False)
+    for queue in queues:
+        pipe.llen(_queue_key(queue))
+    pipe.zcard(DELAYED_KEY)
+    pipe.llen(DEAD_KEY)
+    pipe.hlen(WORKERS_KEY)
+    for name in names:
+        pipe.hgetall(STATS_PREFIX + name)
+    results = pipe.execute()
+
+    queue_lengths = dict(zip(queues, results[:len(queues)]))
+    delayed, dead, workers = results[len(queues):len(queues) + 3]
+
+    tasks = {}
+    for name, raw in zip(names, results[len(queues) + 3:]):
+        counts = {k: float(v) for k, v in raw.items()}
+        runs = counts.get("succeeded", 0) + counts.get("retried", 0) + counts.get("dead", 0)
+        tasks[name] = {
+            "succeeded": int(counts.get("succeeded", 0)),
+            "retried": int(counts.get("retried", 0)),
+            "dead": int(counts.get("dead", 0)),
+            "avg_run_ms": round(counts.get("run_seconds", 0) / runs * 1000, 2) if runs else None,
+            "avg_wait_ms": round(counts.get("wait_seconds", 0) / runs * 1000, 2) if runs else None,
+        }
+
+    return {"queues": queue_lengths, "delayed": delayed, "dead": dead, "workers": workers, "tasks": tasks}
+
+
+def dead_letters(limit):
+    return [orjson.loads(raw) for raw in redis_client.lrange(DEAD_KEY, 0, limit - 1)]
+
+
+def requeue_dead(limit):
+    """ Give the newest `limit` dead tasks a fresh set of retries. Returns how many. """
+    payloads = redis_client.lrange(DEAD_KEY, 0, limit - 1)
+    pipe = redis_client.pipeline()
+    for payload in payloads:
+        message = orjson.loads(payload)
+        for field in ("error", "traceback", "failed_at"):
+            message.pop(field, None)
+        message.update(attempt=0, enqueued_at=time.time())
+        pipe.lrem(DEAD_KEY, 1, payload)
+        pipe.lpush(_queue_key(message["queue"]), orjson.dumps(message))
+    pipe.execute()
+    return len(payloads)
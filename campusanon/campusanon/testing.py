@@ -0,0 +1,167 @@
+"""
+Shared helpers for the query-budget tests (accounts/, communities/, posts/ tests.py).
+
+- build_campus(): a realistic slice of the app (communities, authors, posts
+  of every type, likes, comments, comment likes, notifications) built with
+  bulk_create so large sizes stay fast.
+- run_job(): a @periodic job's body, for tests that run without Redis.
+- BudgetTestCase: runs each check at several data sizes and pins
+  the number of SQL queries (and Redis commands, when TEST_REDIS=True) per
+  request, plus EXPLAIN helpers to assert which index a query uses.
+
+Without TEST_REDIS the cache is a LocMemCache and only SQL is pinned; tests
+that need the Redis client itself (rate limits...) are skipped. With
+TEST_REDIS=True, REDIS_URL must point at a disposable database: it is
+flushed between checks.
+"""
+import os
+from contextlib import contextmanager
+from itertools import cycle
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from communities.models import Community, CommunityMembership
+from communities.registry import community_registry
+from posts.content_filter import content_filter
+from posts.models import Post, PostLike, Comment, CommentLike, Notification
+from campusanon.redis import redis_client, redis_stats
+from campusanon.local_cache import local_cache
+from campusanon.scheduler import jobs
+
+USE_REDIS = os.getenv("TEST_REDIS") == "True"
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+DATA_SIZES = (5, 60)  # posts per community
+
+
+def build_campus(posts_per_community, likes_per_post=3, comments_per_post=2, year=2, branch="IT"):
+    """ A viewer, their communities and enough activity to expose N+1s. """
+    everyone = Community.objects.create(name="All", slug="all", is_global=True)
+    own_class = Community.objects.create(name=f"{year} {branch}", slug=f"{year}-{branch}".lower(), year=year, branch=branch)
+    other_class = Community.objects.create(name="3 COMP", slug="3-comp", year=3, branch="COMP")
+
+    viewer = User.objects.create(email_hash="viewer", internal_username="viewer", year=year, branch=branch)
+    staff = User.objects.create(email_hash="staff", internal_username="staff", year=year, branch=branch, is_staff=True)
+    authors = User.objects.bulk_create([
+        User(email_hash=f"author{i}", internal_username=f"author{i}", year=year, branch=branch)
+        for i in range(max(likes_per_post, comments_per_post, 3))
+    ])
+    CommunityMembership.objects.bulk_create([
+        CommunityMembership(user=viewer, community=everyone),
+        CommunityMembership(user=viewer, community=own_class),
+    ])
+
+    post_types = cycle([value for value, _ in Post.POST_TYPES])
+    owners = cycle([viewer] + authors)
+    posts = Post.objects.bulk_create([
+        Post(
+            user=next(owners),
+            community=community,
+            alias=f"alias{i}",
+            content=f"post {i} about exams",
+            post_type=next(post_types),
+        )
+        for community in (everyone, own_class, other_class)
+        for i in range(posts_per_community)
+    ])
+
+    PostLike.objects.bulk_create([
+        PostLike(user=author, post=post) for post in posts for author in authors[:likes_per_post]
+    ])
+    comments = Comment.objects.bulk_create([
+        Comment(post=post, user=author, alias=f"c{i}", content="same here")
+        for post in posts for i, author in enumerate(authors[:comments_per_post])
+    ])
+    CommentLike.objects.bulk_create([
+        CommentLike(user=viewer, comment=comment) for comment in comments
+    ])
+    Notification.objects.bulk_create([
+        Notification(recipient=viewer, actor=authors[0], verb="like", post=post)
+        for post in posts if post.user_id == viewer.id
+    ])
+
+    return SimpleNamespace(
+        everyone=everyone,
+        own_class=own_class,
+        other_class=other_class,
+        viewer=viewer,
+        staff=staff,
+        authors=authors,
+        posts=posts,
+        comments=comments,
+    )
+
+
+def run_job(job_task):
+    """ Run a @periodic job's own function: no running lock or history, so no Redis. """
+    return jobs()[job_task.name].func()
+
+
+class BudgetTestCase(TestCase):
+    """ Pins SQL queries / Redis commands per request at every size in DATA_SIZES. """
+
+    sizes = DATA_SIZES
+
+    @classmethod
+    def setUpClass(cls):
+        if not USE_REDIS:
+            cls._caches = override_settings(CACHES=LOCMEM_CACHES)
+            cls._caches.enable()
+            cls.addClassCleanup(cls._caches.disable)
+        super().setUpClass()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def campuses(self, **kwargs):
+        """ Yield a fresh campus per data size; each is rolled back afterwards. """
+        for size in self.sizes:
+            with transaction.atomic():
+                cache.clear()
+                if USE_REDIS:
+                    redis_client.flushdb()
+                local_cache.clear()
+                community_registry.invalidate()
+                campus = build_campus(size, **kwargs)
+                community_registry.invalidate()
+                community_registry.all()  # warm, so its load isn't counted
+                content_filter.invalidate()
+                content_filter.check("")
+                campus.size = size
+                yield campus
+                transaction.set_rollback(True)
+        community_registry.invalidate()
+        content_filter.invalidate()
+
+    @contextmanager
+    def assertBudget(self, queries, redis_commands=None):
+        before = redis_stats()["commands"]
+        with self.assertNumQueries(queries):
+            yield
+        if USE_REDIS and redis_commands is not None:
+            self.assertEqual(redis_stats()["commands"] - before, redis_commands, "Redis commands")
+
+    # ---------------------------------------------------------
+    # EXPLAIN
+    # ---------------------------------------------------------
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            # Test tables are tiny: make the planner show the index it *would* use
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = self.explain(queryset)
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f"Expected one of {index_names} in plan:\n{plan}",
+        )
@@ -22,12 +22,24 @@ Including another URLconf
 # ]
 
 
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin  # 👈 Import this
 from django.urls import path, include
 
+from .views import ConnectionStatsView, RequestProfileView, SlowQueriesView, SchedulerStatusView, TaskStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),  # 👈 Add this line
     path("auth/", include("accounts.urls")),
     path("communities/", include("communities.urls")),
     path("posts/", include("posts.urls")),
-]
\ No newline at end of file
+    path("ops/connections/", ConnectionStatsView.as_view()),
+    path("ops/profiles/<str:profile_id>/", RequestProfileView.as_view()),
+    path("ops/slow-queries/", SlowQueriesView.as_view()),
+    path("ops/tasks/", TaskStatsView.as_view()),
+    path("ops/scheduler/", SchedulerStatusView.as_view()),
+]
+
+# Uploaded image variants; in production the web server / CDN serves MEDIA_URL
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,165 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.views import APIView
+
+from posts.permissions import IsAdminUser
+from campusanon.redis import redis_stats
+from campusanon.local_cache import local_cache
+from campusanon.profiling import profile_key
+from campusanon import scheduler, slow_queries, tasks
+
+# New DB sessions opened by this process, per alias. With a pool this only
+# grows when the pool (re)connects; without one, on every new connection.
+_db_connections_opened = Counter()
+
+
+def _count_db_connection(sender, connection, **kwargs):
+    _db_connections_opened[connection.alias] += 1
+
+
+connection_created.connect(_count_db_connection)
+
+
+def db_pool_stats():
+    stats = {}
+    for alias in settings.DATABASES:
+        pool = getattr(connections[alias], "pool", None) if settings.DB_POOL_ENABLED else None
+        stats[alias] = {
+            "pooled": pool is not None,
+            "connections_opened": _db_connections_opened[alias],
+        }
+        if pool is not None:
+            # psycopg_pool: pool_size, pool_available, requests_waiting, connections_ms, ...
+            stats[alias]["pool"] = pool.get_stats()
+    return stats
+
+
+# ---------------------------------------------------------
+# 🔌 Connection and local cache stats for this worker process (staff only)
+# ---------------------------------------------------------
+class ConnectionStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "database": db_pool_stats(),
+            "redis": redis_stats(),
+            "local_cache": local_cache.stats(),
+        })
+
+
+# ---------------------------------------------------------
+# 🔬 Request profiles (campusanon/profiling.py), staff only
+# ---------------------------------------------------------
+class RequestProfileView(APIView):
+    """ JSON by default; ?output=collapsed for flamegraph / speedscope input. """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = cache.get(profile_key(profile_id))
+        if profile is None:
+            return Response({"error": "Profile not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.query_params.get("output") == "collapsed":
+            body = "\n".join(f"{stack} {count}" for stack, count in profile["stacks"].items())
+            response = HttpResponse(body + "\n", content_type="text/plain; charset=utf-8")
+            response["Content-Disposition"] = f'attachment; filename="profile-{profile_id}.txt"'
+            return response
+
+        return Response(profile)
+
+
+# ---------------------------------------------------------
+# 🐢 Recent slow queries (campusanon/slow_queries.py), staff only
+# ---------------------------------------------------------
+class SlowQueriesView(APIView):
+    """
+    Filters: view, route, fingerprint. ?limit=<n> (default 100, max SLOW_QUERY_KEEP)
+    "summary" groups the returned entries by (route, fingerprint), worst first.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = min(int(params.get("limit", 100)), settings.SLOW_QUERY_KEEP)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            entries = slow_queries.recent(settings.SLOW_QUERY_KEEP)
+        except Exception:
+            return Response({"error": "Slow query store unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        for field in ("view", "route", "fingerprint"):
+            if params.get(field):
+                entries = [e for e in entries if e[field] == params[field]]
+        entries = entries[:limit]
+
+        summary = {}
+        for e in entries:
+            group = summary.setdefault((e["route"], e["fingerprint"]), {
+                "route": e["route"],
+                "view": e["view"],
+                "fingerprint": e["fingerprint"],
+                "sql": e["sql"],
+                "count": 0,
+                "max_ms": 0,
+                "total_ms": 0,
+            })
+            group["count"] += 1
+            group["max_ms"] = max(group["max_ms"], e["duration_ms"])
+            group["total_ms"] += e["duration_ms"]
+
+        return Response({
+            "results": entries,
+            "summary": sorted(summary.values(), key=lambda g: g["total_ms"], reverse=True),
+        })
+
+
+# ---------------------------------------------------------
+# ⚙️ Background task queues (campusanon/tasks.py), staff only
+# ---------------------------------------------------------
+class TaskStatsView(APIView):
+    """ Queue lengths, per-task counts and timings, and the newest dead letters (?dead=<n>, default 20). """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            dead = min(int(request.query_params.get("dead", 20)), settings.TASKS_DEAD_LETTER_KEEP)
+        except ValueError:
+            return Response({"error": "dead must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return Response({**tasks.stats(), "dead_letters": tasks.dead_letters(dead)})
+        except Exception:
+            return Response({"error": "Task queue unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+# ---------------------------------------------------------
+# ⏰ Periodic jobs (campusanon/scheduler.py), staff only
+# ---------------------------------------------------------
+class SchedulerStatusView(APIView):
+    """ Every job's schedule and next run, the current leader, and the newest runs (?history=<n>, default 5). """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            history = min(int(request.query_params.get("history", 5)), scheduler.HISTORY_KEEP)
+        except ValueError:
+            return Response({"error": "history must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        autodiscover_modules('tasks')  # jobs are declared in each app's tasks.py
+        try:
+            return Response(scheduler.status(history))
+        except Exception:
+            return Response({"error": "Scheduler state unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
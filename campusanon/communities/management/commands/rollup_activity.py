@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from communities.rollups import RECOMPUTE_HOURS, refresh
+
+
+class Command(BaseCommand):
+    help = 'Keeps the hourly community activity rollup (leaderboards, charts) up to date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=RECOMPUTE_HOURS, help='Trailing hours recounted per pass')
+        parser.add_argument('--backfill-days', type=int, default=None, help='Rebuild this many days, then continue')
+        parser.add_argument('--loop', action='store_true', help='Keep running (worker mode)')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between passes in --loop mode')
+
+    def handle(self, *args, **options):
+        backfill_days = options['backfill_days']
+        while True:
+            close_old_connections()
+            windows, rows = refresh(recompute_hours=options['hours'], backfill_days=backfill_days)
+            if backfill_days:
+                self.stdout.write(f"📊 Backfilled {backfill_days} days ({rows} rows)")
+                backfill_days = None
+            elif windows > 1:
+                self.stdout.write(f"📊 Caught up {windows} days ({rows} rows)")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_community_division_alter_community_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityActivityHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('comments', models.PositiveIntegerField(default=0)),
+                ('comment_likes', models.PositiveIntegerField(default=0)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='communities.community')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='activity_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('community', 'hour'), name='activity_community_hour_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:04
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed(apps, schema_editor):
+    """ Start from the newest rollup row, as refresh() did before the marker existed. """
+    latest = apps.get_model("communities", "CommunityActivityHour").objects.aggregate(latest=Max("hour"))["latest"]
+    if latest is not None:
+        apps.get_model("communities", "ActivityRollupState").objects.create(pk=1, last_hour=latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0006_community_activity_hour'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_hour', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
@@ -32,4 +32,39 @@ class CommunityMembership(models.Model):
         unique_together = ("user", "community")
 
     def __str__(self):
-        return f"{self.user_id} -> {self.community.name}"
\ No newline at end of file
+        return f"{self.user_id} -> {self.community.name}"
+
+class CommunityActivityHour(models.Model):
+    """
+    Per-community activity per hour, maintained by the rollup worker
+    (communities/rollups.py). Leaderboards and charts are range sums over it.
+    """
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="activity")
+    hour = models.DateTimeField()  # start of the hour (UTC)
+
+    posts = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    comment_likes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["community", "hour"], name="activity_community_hour_uniq"),
+        ]
+        indexes = [
+            # Leaderboards: every community over one time window
+            models.Index(fields=["hour"], name="activity_hour_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.community_id} @ {self.hour:%Y-%m-%d %H:00}"
+
+class ActivityRollupState(models.Model):
+    """
+    Single row: the last hour the rollup worker counted. refresh() catches up
+    from it, so a quiet stretch (no new rollup rows) doesn't look like downtime.
+    """
+    last_hour = models.DateTimeField()  # start of the hour (UTC); may have been in progress
+
+    def __str__(self):
+        return f"rollup counted through {self.last_hour:%Y-%m-%d %H:00}"
@@ -0,0 +1,223 @@
+"""
+Process-local registry of Community rows.
+
+Communities change a few times a term, so every worker keeps the whole table
+in memory and answers lookups by id, slug, (year, branch, division) and name
+autocomplete without touching Postgres.
+
+Writes go through the post_save / post_delete signals in communities/signals.py,
+which publish on a Redis channel. Every worker listens on that channel and
+reloads its copy on the next lookup.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from campusanon.redis import pubsub_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "communities:changed"
+
+# Safety net: reload even without a pub/sub message (e.g. Redis was down
+# while an admin edited a community).
+MAX_AGE_SECONDS = 300
+
+# Names are indexed by every substring of up to this length.
+GRAM_SIZE = 3
+
+
+def _grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _normalize_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _class_key(year, branch, division):
+    try:
+        year = int(year) if year is not None else None
+    except (TypeError, ValueError):
+        return None
+    return (year, branch or None, division or None)
+
+
+class _Snapshot:
+    """ Immutable set of indexes built from one read of the table. """
+
+    def __init__(self, communities):
+        self.communities = sorted(communities, key=lambda c: c.name.lower())
+        self.by_id = {c.id: c for c in communities}
+        self.by_slug = {c.slug: c for c in communities}
+        self.by_class = {
+            _class_key(c.year, c.branch, c.division): c
+            for c in communities
+            if not c.is_global
+        }
+
+        # Same row Postgres would return for filter(is_global=True).first()
+        globals_ = sorted((c for c in communities if c.is_global), key=lambda c: c.id)
+        self.global_community = globals_[0] if globals_ else None
+
+        # gram -> ids, for grams of length 1..GRAM_SIZE
+        self.grams = {}
+        for c in communities:
+            name = c.name.lower()
+            for size in range(1, GRAM_SIZE + 1):
+                for gram in _grams(name, size):
+                    self.grams.setdefault(gram, set()).add(c.id)
+
+        self.loaded_at = time.monotonic()
+
+
+class CommunityRegistry:
+    def __init__(self):
+        self._snapshot = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self._listener = None
+
+    # ---------------------------------------------------------
+    # Loading / invalidation
+    # ---------------------------------------------------------
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if (
+            self._stale
+            or snapshot is None
+            or time.monotonic() - snapshot.loaded_at > MAX_AGE_SECONDS
+        ):
+            with self._lock:
+                snapshot = self._snapshot
+                if self._stale or snapshot is None or time.monotonic() - snapshot.loaded_at > MAX_AGE_SECONDS:
+                    snapshot = self._load()
+            self._ensure_listener()
+        return snapshot
+
+    def _load(self):
+        from .models import Community
+
+        # Clear the flag first so a change published mid-load triggers another reload.
+        self._stale = False
+        snapshot = _Snapshot(list(Community.objects.all()))
+        self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """ Drop this worker's copy; the next lookup reloads it. """
+        self._stale = True
+
+    def notify_changed(self):
+        """ Invalidate this worker and tell every other worker to do the same. """
+        self.invalidate()
+        try:
+            redis_client.publish(CHANNEL, "1")
+        except Exception as exc:
+            logger.warning("Could not publish community change: %s", exc)
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name="community-registry", daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                with pubsub_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    pubsub.subscribe(CHANNEL)
+                    # Anything published while we were disconnected is lost, so
+                    # reload once the subscription is back.
+                    self.invalidate()
+                    backoff = 1
+                    for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self.invalidate()
+            except Exception as exc:
+                logger.warning("Community registry listener disconnected: %s", exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    # ---------------------------------------------------------
+    # Lookups (returned instances are shared: treat them as read-only)
+    # ---------------------------------------------------------
+    def all(self):
+        return list(self._get_snapshot().communities)
+
+    def get(self, community_id):
+        key = _normalize_id(community_id)
+        if key is None:
+            return None
+        return self._get_snapshot().by_id.get(key)
+
+    def get_many(self, community_ids):
+        by_id = self._get_snapshot().by_id
+        found = []
+        for community_id in community_ids:
+            community = by_id.get(_normalize_id(community_id))
+            if community is not None:
+                found.append(community)
+        return found
+
+    def get_by_slug(self, slug):
+        return self._get_snapshot().by_slug.get(slug)
+
+    def get_by_class(self, year, branch, division=None):
+        key = _class_key(year, branch, division)
+        if key is None:
+            return None
+        return self._get_snapshot().by_class.get(key)
+
+    def get_global(self):
+        return self._get_snapshot().global_community
+
+    def search(self, query, limit=20):
+        """
+        Case-insensitive substring match on name (same rows as name__icontains),
+        ranked: whole-name prefix, then word prefix, then anywhere.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        snapshot = self._get_snapshot()
+
+        if len(query) <= GRAM_SIZE:
+            candidate_ids = snapshot.grams.get(query, set())
+        else:
+            candidate_ids = None
+            for gram in _grams(query, GRAM_SIZE):
+                ids = snapshot.grams.get(gram)
+                if not ids:
+                    return []
+                candidate_ids = ids if candidate_ids is None else candidate_ids & ids
+
+        def rank(c):
+            name = c.name.lower()
+            if name.startswith(query):
+                return 0
+            if any(word.startswith(query) for word in name.split()):
+                return 1
+            return 2
+
+        matches = [
+            snapshot.by_id[cid]
+            for cid in candidate_ids
+            if query in snapshot.by_id[cid].name.lower()
+        ]
+        matches.sort(key=lambda c: (rank(c), c.name.lower()))
+        return matches[:limit]
+
+
+community_registry = CommunityRegistry()
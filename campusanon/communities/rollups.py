@@ -0,0 +1,204 @@
+"""
+Hourly activity rollup per community.
+
+CommunityActivityHour holds, for every (community, UTC hour) with activity,
+the number of posts, post likes, comments and comment likes created in that
+hour. A scheduled job (communities/tasks.py) keeps it current: each pass
+recounts the last few hours from the source tables (one GROUP BY per table,
+range-scanned on created_at) and replaces those rows, so late commits and
+deletes near the edge settle on the next pass and re-running a pass is
+harmless.
+
+Everything score-related then reads the rollup instead of joining posts,
+likes and comments:
+
+- leaderboards for any competition day, week or month: one SUM ... GROUP BY
+  community over the window's hours;
+- a community's score today: the same, for one community;
+- activity charts: that community's hourly rows over the window.
+
+Competition days start at 6 AM (the leaderboard's "6 AM rule"); hours are
+whole UTC hours, so every window is an exact range of rows.
+"""
+import calendar
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from posts.models import Post, PostLike, Comment, CommentLike
+from .models import ActivityRollupState, CommunityActivityHour
+
+FIELDS = ("posts", "likes", "comments", "comment_likes")
+
+# 🧮 DAILY SCORE FORMULA
+SCORE_WEIGHTS = {"posts": 5, "likes": 2, "comments": 8, "comment_likes": 1}
+
+# (rollup field, source model, path to the community id)
+SOURCES = (
+    ("posts", Post, "community_id"),
+    ("likes", PostLike, "post__community_id"),
+    ("comments", Comment, "post__community_id"),
+    ("comment_likes", CommentLike, "comment__post__community_id"),
+)
+
+RECOMPUTE_HOURS = 3          # trailing hours recounted on every pass
+MAX_CATCHUP = timedelta(days=7)
+STATE_ID = 1                 # ActivityRollupState is a single row
+DAY_START_HOUR = 6
+PERIODS = ("day", "week", "month")
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+# ---------------------------------------------------------
+# Time windows
+# ---------------------------------------------------------
+def hour_floor(dt):
+    return dt.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def competition_day_start(now=None):
+    """ Start of the competition day containing `now` (the 6 AM rule). """
+    now = (now or timezone.now()).astimezone(dt_timezone.utc)
+    start = now.replace(hour=DAY_START_HOUR, minute=0, second=0, microsecond=0)
+    return start - DAY if now < start else start
+
+
+def day_start(day):
+    """ Competition day starting at 6 AM on the given date. """
+    return datetime.combine(day, time(DAY_START_HOUR), tzinfo=dt_timezone.utc)
+
+
+def period_window(period, day):
+    """
+    [start, end) for a period ending with competition day `day`:
+    the day itself, the 7 days up to it, or its calendar month.
+    Raises ValueError for an unknown period.
+    """
+    if period == "day":
+        start = day_start(day)
+        return start, start + DAY
+    if period == "week":
+        end = day_start(day) + DAY
+        return end - 7 * DAY, end
+    if period == "month":
+        start = day_start(day.replace(day=1))
+        days = calendar.monthrange(day.year, day.month)[1]
+        return start, start + days * DAY
+    raise ValueError(period)
+
+
+# ---------------------------------------------------------
+# Maintenance (scheduler; rollup_activity for backfills)
+# ---------------------------------------------------------
+def _hourly_counts(model, community_path, start, end):
+    # Range scan on the created_at BRIN indexes (posts/migrations/0019)
+    return (
+        model.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(bucket=TruncHour("created_at", tzinfo=dt_timezone.utc))
+        .values(community_path, "bucket")
+        .annotate(n=Count("pk"))
+        .order_by()
+    )
+
+
+def rollup_window(start, end):
+    """ Recount [start, end) (whole hours) and replace its rollup rows. """
+    rows = defaultdict(dict)
+    for field, model, community_path in SOURCES:
+        for row in _hourly_counts(model, community_path, start, end):
+            rows[(row[community_path], row["bucket"])][field] = row["n"]
+
+    with transaction.atomic():
+        CommunityActivityHour.objects.filter(hour__gte=start, hour__lt=end).delete()
+        CommunityActivityHour.objects.bulk_create([
+            CommunityActivityHour(community_id=community_id, hour=hour, **counts)
+            for (community_id, hour), counts in rows.items()
+        ], batch_size=1000)
+    return len(rows)
+
+
+def refresh(recompute_hours=RECOMPUTE_HOURS, backfill_days=None, now=None):
+    """
+    Bring the rollup up to date, one day-sized window at a time.
+
+    Normally recounts the last `recompute_hours`. If the last hour counted
+    (ActivityRollupState) is older (the worker was down) it restarts from
+    there, up to MAX_CATCHUP back; the first run counts from the first post.
+    `backfill_days` forces a rebuild of that many days. Returns
+    (windows, rows written).
+    """
+    end = hour_floor(now or timezone.now()) + HOUR
+
+    if backfill_days:
+        start = end - backfill_days * DAY
+    else:
+        state = ActivityRollupState.objects.filter(pk=STATE_ID).first()
+        if state is None:
+            first = Post.objects.aggregate(first=Min("created_at"))["first"]
+            start = hour_floor(first) if first else end - HOUR
+        else:
+            start = max(min(state.last_hour, end - recompute_hours * HOUR), end - MAX_CATCHUP)
+
+    windows = written = 0
+    while start < end:
+        window_end = min(start + DAY, end)
+        # Each window moves the marker, so an interrupted catch-up resumes where it stopped
+        with transaction.atomic():
+            written += rollup_window(start, window_end)
+            ActivityRollupState.objects.update_or_create(pk=STATE_ID, defaults={"last_hour": window_end - HOUR})
+        windows += 1
+        start = window_end
+    return windows, written
+
+
+# ---------------------------------------------------------
+# Reads
+# ---------------------------------------------------------
+def totals(start, end, community_ids=None):
+    """ {community_id: {"posts", "likes", "comments", "comment_likes"}} over [start, end). """
+    rows = CommunityActivityHour.objects.filter(hour__gte=start, hour__lt=end)
+    if community_ids is not None:
+        rows = rows.filter(community_id__in=community_ids)
+    rows = rows.values("community_id").annotate(**{
+        f"total_{field}": Sum(field) for field in FIELDS
+    }).order_by()
+    return {
+        row["community_id"]: {field: row[f"total_{field}"] for field in FIELDS}
+        for row in rows
+    }
+
+
+def score(stats):
+    return sum(stats[field] * weight for field, weight in SCORE_WEIGHTS.items())
+
+
+def series(community_id, start, end, bucket="hour"):
+    """
+    Activity of one community over [start, end) as a list of
+    {"start", *FIELDS}, one per hour or per competition day (empty buckets
+    included, so charts don't have to fill gaps).
+    """
+    step = DAY if bucket == "day" else HOUR
+    align = competition_day_start if bucket == "day" else hour_floor
+
+    buckets = {}
+    cursor = align(start)
+    while cursor < end:
+        buckets[cursor] = dict.fromkeys(FIELDS, 0)
+        cursor += step
+
+    rows = CommunityActivityHour.objects.filter(
+        community_id=community_id, hour__gte=start, hour__lt=end
+    ).values_list("hour", *FIELDS)
+    for hour, *counts in rows:
+        counts_for_bucket = buckets[align(hour)]
+        for field, n in zip(FIELDS, counts):
+            counts_for_bucket[field] += n
+
+    return [{"start": key.isoformat(), **counts} for key, counts in buckets.items()]
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Community, CommunityMembership
+from .registry import community_registry
+from .utils import forget_memberships
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+def refresh_community_registry(sender, instance, **kwargs):
+    # Wait for the commit so other workers don't reload the old rows.
+    transaction.on_commit(community_registry.notify_changed)
+
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def forget_cached_memberships(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: forget_memberships(user_id))
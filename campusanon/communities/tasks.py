@@ -0,0 +1,17 @@
+from campusanon.scheduler import periodic
+from . import rollups
+from .views import warm_leaderboards
+
+
+@periodic("* * * * *")
+def refresh_activity_rollup():
+    """ Recount the trailing hours of the activity rollup (was `rollup_activity --loop`). """
+    rollups.refresh()
+
+
+# A minute past the 6 AM rollover: the 06:00 refresh has settled yesterday's
+# last hour (yesterday's champion), and refreshes never run side by side
+@periodic("1 6 * * *")
+def warm_leaderboard_rollover():
+    """ Build the new competition day's leaderboard and scores ahead of the morning rush. """
+    warm_leaderboards(rollups.competition_day_start())
@@ -1,3 +1,313 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from campusanon import swr
+from campusanon.local_cache import LocalCache, local_cache
+from campusanon.testing import BudgetTestCase, run_job
+from posts.models import Post
+from . import rollups
+from .models import ActivityRollupState, Community, CommunityActivityHour, CommunityMembership
+from .registry import community_registry
+from .tasks import refresh_activity_rollup, warm_leaderboard_rollover
+from .utils import joined_community_ids
+
+
+# ---------------------------------------------------------
+# 📏 Query budgets
+# ---------------------------------------------------------
+class CommunityBudgetTests(BudgetTestCase):
+
+    def test_my_communities(self):
+        for campus in self.campuses():
+            client = self.client_for(campus.viewer)
+            with self.assertBudget(1):
+                client.get("/communities/")
+            with self.assertBudget(0):
+                client.get("/communities/")
+
+    def test_my_communities_as_staff(self):
+        for campus in self.campuses():
+            with self.assertBudget(0):
+                self.client_for(campus.staff).get("/communities/")
+
+    def test_search_is_in_memory(self):
+        for campus in self.campuses():
+            with self.assertBudget(0):
+                response = self.client_for(campus.viewer).get("/communities/search/", {"q": "comp"})
+            self.assertEqual([c["slug"] for c in response.data], ["3-comp"])
+
+    def test_leaderboard(self):
+        for campus in self.campuses():
+            rollups.refresh()
+            client = self.client_for(campus.viewer)
+            # one rollup range sum each for today and yesterday, all years
+            with self.assertBudget(2):
+                response = client.get("/communities/leaderboard/")
+            with self.assertBudget(0):
+                client.get("/communities/leaderboard/")
+
+            own = next(c for c in response.data[2]["live_leaderboard"] if c["id"] == str(campus.own_class.id))
+            self.assertEqual(own["stats"], {"posts": campus.size, "likes": 3 * campus.size, "comments": 2 * campus.size})
+
+    def test_leaderboard_history(self):
+        for campus in self.campuses():
+            rollups.refresh()
+            client = self.client_for(campus.viewer)
+            for period in rollups.PERIODS:
+                with self.assertBudget(1):
+                    client.get("/communities/leaderboard/", {"period": period})
+            with self.assertBudget(0):
+                response = client.get("/communities/leaderboard/", {"period": "day"})
+            self.assertEqual(response.data["years"][2]["winner"]["id"], str(campus.own_class.id))
+
+            self.assertEqual(client.get("/communities/leaderboard/", {"period": "year"}).status_code, 400)
+            for params in ({"date": "0001-01-01", "period": "week"}, {"date": "9999-12-31"}, {"date": "2024-13-01"}):
+                self.assertEqual(client.get("/communities/leaderboard/", params).status_code, 400)
+
+    def test_rollover_job_warms_the_new_day(self):
+        for campus in self.campuses():
+            run_job(refresh_activity_rollup)
+            with self.assertBudget(3):  # live: today + yesterday; scores: today
+                run_job(warm_leaderboard_rollover)
+            client = self.client_for(campus.viewer)
+            with self.assertBudget(0):
+                client.get("/communities/leaderboard/")
+                client.get(f"/communities/{campus.own_class.id}/score/")
+
+    def test_community_score(self):
+        for campus in self.campuses():
+            rollups.refresh()
+            client = self.client_for(campus.viewer)
+            with self.assertBudget(1):
+                response = client.get(f"/communities/{campus.own_class.id}/score/")
+            self.assertEqual(response.data["score"], rollups.score({
+                "posts": campus.size, "likes": 3 * campus.size,
+                "comments": 2 * campus.size, "comment_likes": 2 * campus.size,
+            }))
+            with self.assertBudget(0):
+                client.get(f"/communities/{campus.other_class.id}/score/")
+
+    def test_batch_scores(self):
+        for campus in self.campuses():
+            rollups.refresh()
+            client = self.client_for(campus.viewer)
+            ids = [campus.own_class.id, campus.other_class.id, campus.everyone.id]
+            # one range sum for every community, whatever the list length
+            with self.assertBudget(1):
+                response = client.get("/communities/scores/", {"ids": ",".join(map(str, ids))})
+            self.assertEqual([r["id"] for r in response.data], [str(i) for i in ids])
+            self.assertEqual([r["rank"] for r in response.data], [1, 1, None])
+
+            with self.assertBudget(0):
+                client.get("/communities/scores/", {"ids": str(campus.own_class.id)})
+
+            self.assertEqual(client.get("/communities/scores/", {"ids": "nope"}).status_code, 400)
+
+    def test_activity_chart(self):
+        for campus in self.campuses():
+            rollups.refresh()
+            client = self.client_for(campus.viewer)
+            with self.assertBudget(1):
+                response = client.get(f"/communities/{campus.own_class.id}/activity/", {"days": 2})
+            self.assertEqual(len(response.data["series"]), 48)
+            self.assertEqual(sum(point["posts"] for point in response.data["series"]), campus.size)
+
+            with self.assertBudget(1):
+                response = client.get(f"/communities/{campus.own_class.id}/activity/", {"days": 30, "bucket": "day"})
+            self.assertEqual(len(response.data["series"]), 30)
+
+
+# ---------------------------------------------------------
+# 🗂️ Community registry
+# ---------------------------------------------------------
+class RegistryTests(BudgetTestCase):
+    sizes = (5,)
+
+    def test_search_matches_icontains_ranked_by_prefix(self):
+        for campus in self.campuses():
+            Community.objects.bulk_create([
+                Community(name="Computer Club", slug="computer-club"),
+                Community(name="Robotics and Computing", slug="robotics"),
+                Community(name="Sports", slug="sports"),
+            ])
+            community_registry.invalidate()
+            for query in ("comp", "COMP", "o", "ics a", "spo", "nothing here", "  "):
+                expected = set(Community.objects.filter(name__icontains=query.strip()).values_list("slug", flat=True))
+                found = [c.slug for c in community_registry.search(query)]
+                self.assertEqual(set(found), expected if query.strip() else set(), query)
+            self.assertEqual([c.slug for c in community_registry.search("comp")], ["computer-club", "3-comp", "robotics"])
+
+    def test_lookups(self):
+        for campus in self.campuses():
+            with self.assertBudget(0):
+                self.assertEqual(community_registry.get(str(campus.own_class.id)).slug, campus.own_class.slug)
+                self.assertIsNone(community_registry.get("not-a-uuid"))
+                self.assertEqual(community_registry.get_by_class("2", "IT"), campus.own_class)
+                self.assertIsNone(community_registry.get_by_class("two", "IT"))
+                self.assertEqual(community_registry.get_global(), campus.everyone)
+                self.assertEqual(
+                    [c.slug for c in community_registry.get_many([campus.other_class.id, "junk", campus.everyone.id])],
+                    ["3-comp", "all"],
+                )
+
+    def test_saved_communities_reload_after_commit(self):
+        for campus in self.campuses():
+            with self.captureOnCommitCallbacks(execute=True):
+                community = Community.objects.create(name="Drama", slug="drama")
+                self.assertIsNone(community_registry.get_by_slug("drama"))
+            self.assertEqual(community_registry.get_by_slug("drama").id, community.id)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                community.delete()
+            self.assertIsNone(community_registry.get_by_slug("drama"))
+
+
+# ---------------------------------------------------------
+# 📊 Rollup maintenance
+# ---------------------------------------------------------
+class RollupTests(BudgetTestCase):
+    sizes = (5,)
+
+    def test_refresh_recounts_trailing_hours(self):
+        for campus in self.campuses():
+            rollups.refresh()
+            now = timezone.now()
+            today = rollups.totals(now - timedelta(hours=1), now + timedelta(hours=1))
+            self.assertEqual(today[campus.own_class.id]["comments"], 2 * campus.size)
+
+            # Activity recorded late (or deleted) inside the window settles on the next pass
+            Post.objects.filter(community=campus.own_class).first().delete()
+            rollups.refresh()
+            today = rollups.totals(now - timedelta(hours=1), now + timedelta(hours=1))
+            self.assertEqual(today[campus.own_class.id]["posts"], campus.size - 1)
+
+    def test_catch_up_starts_from_the_last_counted_hour(self):
+        for campus in self.campuses():
+            now = timezone.now()
+            rollups.refresh(now=now)
+
+            # A quiet stretch leaves no new rows, but only the trailing hours are recounted
+            later = now + timedelta(days=2)
+            rollups.refresh(now=later - rollups.HOUR)
+            self.assertEqual(rollups.refresh(now=later)[0], 1)
+            self.assertEqual(ActivityRollupState.objects.get().last_hour, rollups.hour_floor(later))
+
+            # The worker was down: everything since its last pass is counted
+            Post.objects.filter(pk=campus.posts[0].pk).update(created_at=later + timedelta(hours=1))
+            self.assertEqual(rollups.refresh(now=later + timedelta(days=1, hours=12))[0], 2)
+            counted = rollups.totals(later, later + timedelta(days=2))
+            self.assertEqual(counted[campus.posts[0].community_id]["posts"], 1)
+
+    def test_backfill_spreads_activity_over_hours(self):
+        for campus in self.campuses():
+            earlier = timezone.now() - timedelta(days=3)
+            Post.objects.filter(pk=campus.posts[0].pk).update(created_at=earlier)
+            rollups.refresh(backfill_days=5)
+
+            row = CommunityActivityHour.objects.get(hour=rollups.hour_floor(earlier))
+            self.assertEqual((row.community_id, row.posts), (campus.posts[0].community_id, 1))
+
+    def test_period_windows(self):
+        day = timezone.now().date().replace(month=2, day=10)
+        start, end = rollups.period_window("week", day)
+        self.assertEqual((end - start, end), (timedelta(days=7), rollups.day_start(day) + timedelta(days=1)))
+        start, end = rollups.period_window("month", day)
+        self.assertEqual(start, rollups.day_start(day.replace(day=1)))
+        self.assertEqual(end, rollups.day_start(day.replace(month=3, day=1)))
+
+
+# ---------------------------------------------------------
+# 🐘 Caching (campusanon/swr.py, campusanon/local_cache.py)
+# ---------------------------------------------------------
+class StampedeTests(BudgetTestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "fresh"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(swr.get_or_compute("k", compute, ttl=60)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual((len(calls), results), (1, ["fresh"] * 5))
+
+    def test_stale_value_served_while_refreshing(self):
+        cache.set(swr._entry_key("k"), ("old", time.time() - 1))  # past its soft expiry
+
+        self.assertEqual(swr.get_or_compute("k", lambda: "new", ttl=60), "old")
+        for _ in range(40):
+            if cache.get(swr._entry_key("k"))[0] == "new":
+                break
+            time.sleep(0.05)
+        self.assertEqual(swr.get_or_compute("k", lambda: "newer", ttl=60), "new")
+
+
+class LocalCacheTests(BudgetTestCase):
+
+    def test_lru_stays_within_bounds(self):
+        lru = LocalCache(max_entries=3, max_bytes=10_000, max_ttl=60)
+        for key in "abcd":
+            lru.set(key, key * 10, ttl=60)
+        self.assertIsNone(lru.get("a"))  # least recently used went first
+        self.assertEqual(lru.get("d"), "d" * 10)
+
+        lru.set("big", "x" * 900, ttl=60)
+        lru.set("bigger", "x" * 5000, ttl=60)  # over a tenth of max_bytes: not kept
+        self.assertIsNone(lru.get("bigger"))
+        self.assertLessEqual(lru.stats()["bytes"], 10_000)
+        self.assertEqual(lru.stats()["evictions"], 2)
+
+    def test_membership_change_reaches_cached_access_sets(self):
+        for campus in self.campuses():
+            self.assertNotIn(campus.other_class.id, joined_community_ids(campus.viewer.id))
+            with self.captureOnCommitCallbacks(execute=True):
+                CommunityMembership.objects.create(user=campus.viewer, community=campus.other_class)
+            with self.assertBudget(1):
+                self.assertIn(campus.other_class.id, joined_community_ids(campus.viewer.id))
+            with self.assertBudget(0):
+                joined_community_ids(campus.viewer.id)
+
+
+# ---------------------------------------------------------
+# 🔎 EXPLAIN
+# ---------------------------------------------------------
+class LeaderboardIndexTests(BudgetTestCase):
+    sizes = (60,)
+
+    def test_standings_read_one_window_of_the_rollup(self):
+        start = rollups.competition_day_start()
+        for campus in self.campuses():
+            rollups.refresh()
+            standings = CommunityActivityHour.objects.filter(hour__gte=start, hour__lt=start + rollups.DAY)
+            self.assertUsesIndex(standings, "activity_hour_idx")
+
+            # SQLite names the unique constraint's index sqlite_autoindex_*
+            one = standings.filter(community_id=campus.own_class.id)
+            self.assertUsesIndex(one, "activity_community_hour_uniq", "communityactivityhour_1")
+
+    @skipUnless(connection.vendor == "postgresql", "BRIN indexes are Postgres only")
+    def test_rollup_range_scans_created_at(self):
+        since = timezone.now() - timedelta(hours=rollups.RECOMPUTE_HOURS)
+        for campus in self.campuses():
+            for _, model, community_path in rollups.SOURCES:
+                counts = rollups._hourly_counts(model, community_path, since, timezone.now())
+                self.assertUsesIndex(counts, "created_brin")
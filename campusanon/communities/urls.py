@@ -3,7 +3,9 @@ from .views import (
     MyCommunitiesView, 
     SearchCommunitiesView, 
     LeaderboardView,     
-    CommunityScoreView   
+    CommunityScoreView,
+    CommunityScoresView,
+    CommunityActivityView,
 )
 
 urlpatterns = [
@@ -18,4 +20,10 @@ urlpatterns = [
 
     # ✅ 4. ADD THIS: Score (matches /communities/<id>/score/)
     path("<uuid:community_id>/score/", CommunityScoreView.as_view(), name="community-score"),
+
+    # 5. Scores for many communities at once (matches /communities/scores/?ids=...)
+    path("scores/", CommunityScoresView.as_view(), name="community-scores"),
+
+    # 6. Activity chart (hourly / daily, from the rollup)
+    path("<uuid:community_id>/activity/", CommunityActivityView.as_view(), name="community-activity"),
 ]
\ No newline at end of file
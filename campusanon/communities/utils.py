@@ -1,10 +1,16 @@
+from campusanon.swr import get_or_compute, invalidate
 from .models import Community, CommunityMembership
+from .registry import community_registry
 
 def get_or_create_global_community():
     """
     Safely retrieves the Global 'All' community.
     Since there is only one global community, using get_or_create here is safe.
     """
+    community = community_registry.get_by_slug("all")
+    if community is not None:
+        return community
+
     community, _ = Community.objects.get_or_create(
         slug="all",
         defaults={
@@ -26,4 +32,31 @@ def add_user_to_community(user, community):
     CommunityMembership.objects.get_or_create(
         user=user,
         community=community
-    )
\ No newline at end of file
+    )
+
+
+def _joined_key(user_id):
+    return f"joined_communities_{user_id}"
+
+
+def my_communities_key(user_id):
+    # MyCommunitiesView's payload
+    # ⚠️ FIX: We added '_v2_' and '{user.id}' to the admin key.
+    # This forces a fresh fetch and prevents admins from sharing stale data.
+    # v3: the entry is {"etag", "data"} so unchanged lists can answer 304.
+    return f"communities_v3_{user_id}"
+
+
+def joined_community_ids(user_id):
+    """
+    Ids of the communities a user explicitly joined (access checks, home
+    timeline, MyCommunitiesView). Cached in Redis and in-process; dropped
+    everywhere when a membership changes (communities/signals.py).
+    """
+    return get_or_compute(_joined_key(user_id), lambda: frozenset(
+        CommunityMembership.objects.filter(user_id=user_id).values_list("community_id", flat=True)
+    ), ttl=900)
+
+
+def forget_memberships(user_id):
+    invalidate(_joined_key(user_id), my_communities_key(user_id))
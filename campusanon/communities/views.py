@@ -1,47 +1,51 @@
+import logging
+import uuid
+
 from rest_framework.views import APIView
+from campusanon.db_router import ReplicaReadMixin
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework import status
-from django.core.cache import cache
-from .models import Community, CommunityMembership
-from django.db.models import Count, Sum, F, IntegerField, Q
-from django.db.models.functions import Coalesce
-from django.db.models import Count
+from .registry import community_registry
+from . import rollups
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date
+
+from .utils import get_or_create_global_community, joined_community_ids, my_communities_key  # ✅ Import this helper
+from campusanon.conditional import make_etag, is_not_modified, not_modified_response, with_validators
+from campusanon.swr import get_or_compute
 
-from .utils import get_or_create_global_community  # ✅ Import this helper
+logger = logging.getLogger(__name__)
 
-class MyCommunitiesView(APIView):
+class MyCommunitiesView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
         
-        # 1. GENERATE A UNIQUE CACHE KEY
-        # ⚠️ FIX: We added '_v2_' and '{user.id}' to the admin key.
-        # This forces a fresh fetch and prevents admins from sharing stale data.
-        cache_key = f"communities_v2_{user.id}"
-        
-        # 2. CHECK REDIS
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+        # 1. GENERATE A UNIQUE CACHE KEY (dropped when memberships change)
+        cache_key = my_communities_key(user.id)
+
+        # 2. CHECK REDIS (15 mins, then up to 2 more served stale while one request refreshes)
+        cached = get_or_compute(cache_key, lambda: self.build(user), ttl=900, stale_ttl=120)
+        if is_not_modified(request, cached["etag"]):
+            return not_modified_response(cached["etag"])
+        return with_validators(Response(cached["data"]), cached["etag"])
 
+    def build(self, user):
         # ---------------------------------------------------------
         # 👑 GOD MODE (Staff/Superuser)
         # ---------------------------------------------------------
         if user.is_staff or user.is_superuser:
-            print(f"👑 ADMIN DETECTED ({user.internal_username}): Checking Integrity...")
+            logger.debug("Admin %s: checking community integrity", user.internal_username)
             
             # ✅ SELF-HEAL: If 'All' is missing for some reason, create it NOW.
             # This fixes the issue where CLI-created superusers don't trigger the setup script.
-            if not Community.objects.filter(slug="all").exists():
-                print("   🛠️ Self-Healing: Re-creating missing 'All' community...")
+            if community_registry.get_by_slug("all") is None:
+                logger.warning("Self-healing: re-creating missing 'All' community")
                 get_or_create_global_community()
 
             # Admins see EVERYTHING
-            all_communities = Community.objects.all()
+            all_communities = community_registry.all()
         
         else:
             # -----------------------------------------------------
@@ -49,17 +53,15 @@ class MyCommunitiesView(APIView):
             # -----------------------------------------------------
             
             # 1. GLOBAL: Get 'All'
-            auto_communities = Community.objects.filter(is_global=True)
+            auto_communities = [c for c in community_registry.all() if c.is_global]
 
             # 2. MANUAL: Get strictly joined communities
-            joined_ids = CommunityMembership.objects.filter(
-                user=user
-            ).values_list('community_id', flat=True)
+            joined_ids = joined_community_ids(user.id)
             
-            manual_communities = Community.objects.filter(id__in=joined_ids)
+            manual_communities = community_registry.get_many(joined_ids)
 
-            # 3. COMBINE
-            all_communities = (auto_communities | manual_communities).distinct()
+            # 3. COMBINE (de-duplicated, registry order)
+            all_communities = list({c.id: c for c in auto_communities + manual_communities}.values())
 
         # 4. Serialize
         data = []
@@ -74,14 +76,12 @@ class MyCommunitiesView(APIView):
                 "division": c.division 
             })
 
-        # 5. SAVE TO REDIS (15 mins)
-        cache.set(cache_key, data, timeout=900)
-
-        return Response(data)
+        etag = make_etag("communities", user.id, *sorted(d["id"] for d in data))
+        return {"etag": etag, "data": data}
     
 
 
-class SearchCommunitiesView(APIView):
+class SearchCommunitiesView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -92,7 +92,8 @@ class SearchCommunitiesView(APIView):
         if not query:
             return Response([])
 
-        communities = Community.objects.filter(name__icontains=query)[:20]
+        # ⚡ In-memory autocomplete index (no SQL)
+        communities = community_registry.search(query, limit=20)
 
         return Response([{
             "id": str(c.id),
@@ -102,161 +103,242 @@ class SearchCommunitiesView(APIView):
         } for c in communities])
     
 
-class LeaderboardView(APIView):
+EMPTY_STATS = dict.fromkeys(rollups.FIELDS, 0)
+YEARS = [1, 2, 3, 4]
+
+
+def _cached_entry(cache_key, compute, ttl, stale_ttl=None):
+    """ {"etag", "data"}: compute()'s data through the stampede-safe cache, with an ETag per computation. """
+    def build():
+        data = compute()
+        return {"etag": make_etag(cache_key, timezone.now().timestamp()), "data": data}
+
+    return get_or_compute(cache_key, build, ttl=ttl, stale_ttl=stale_ttl)
+
+
+def _cached_response(request, cache_key, compute, ttl, stale_ttl=None):
+    cached = _cached_entry(cache_key, compute, ttl, stale_ttl)
+    if is_not_modified(request, cached["etag"]):
+        return not_modified_response(cached["etag"])
+    return with_validators(Response(cached["data"]), cached["etag"])
+
+
+def _year_standings(stats, year):
+    """ Ranked class communities of one year; `stats` comes from rollups.totals(). """
+    standings = []
+    for c in community_registry.all():
+        if c.year != year or c.is_global:
+            continue
+        s = stats.get(c.id, EMPTY_STATS)
+        standings.append({
+            "id": str(c.id),
+            "name": c.name,
+            "branch": c.branch,
+            "division": c.division,
+            "score": rollups.score(s),
+            "stats": {
+                "posts": s["posts"],
+                "likes": s["likes"],
+                "comments": s["comments"]
+            }
+        })
+
+    # Sort by Score (Highest First), then add Rank
+    standings.sort(key=lambda x: x['score'], reverse=True)
+    for idx, item in enumerate(standings):
+        item['rank'] = idx + 1
+    return standings
+
+
+def _winner(standings, title):
+    # Can be null if nobody scored
+    top = standings[0] if standings else None
+    if top is None or top["score"] <= 0:
+        return None
+    return {"id": top["id"], "name": top["name"], "score": top["score"], "title": title}
+
+
+# We cache this for 90 seconds so polling clients share one computation
+LIVE_TTL = 90
+
+
+def _live_key(current_start):
+    # v2: the entry is {"etag", "data"} so polling clients can get a 304
+    return f"leaderboard_daily_v2_{current_start.strftime('%Y%m%d')}"
+
+
+class LeaderboardView(ReplicaReadMixin, APIView):
+    """
+    Daily standings per year, summed from the hourly activity rollup.
+
+    Without parameters: today's live standings and yesterday's champion.
+    With `?date=YYYY-MM-DD` and/or `?period=day|week|month`: the standings
+    for that competition day, the 7 days ending with it, or its month.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # ---------------------------------------------------------
-        # 1. DEFINE TIME WINDOWS (The 6 AM Rule)
-        # ---------------------------------------------------------
-        now = timezone.now()
-        
-        # Define "Today 6 AM"
-        today_6am = now.replace(hour=6, minute=0, second=0, microsecond=0)
-        
-        # If it's currently 4 AM, the "competition day" actually started yesterday at 6 AM.
-        if now < today_6am:
-            current_start = today_6am - timedelta(days=1)
-        else:
-            current_start = today_6am
+        # (The 6 AM Rule) the competition day started at the last 6 AM
+        current_start = rollups.competition_day_start()
 
-        # Previous day (for finding yesterday's winner)
-        prev_start = current_start - timedelta(days=1)
-        prev_end = current_start
+        period = request.query_params.get("period")
+        day = request.query_params.get("date")
+        if period is None and day is None:
+            return self.live(request, current_start)
 
-        # ---------------------------------------------------------
-        # 2. CACHE CHECK
-        # ---------------------------------------------------------
-        # We cache this for 5 minutes so we don't hammer the DB
-        cache_key = f"leaderboard_daily_v1_{current_start.strftime('%Y%m%d')}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+        period = period or "day"
+        if period not in rollups.PERIODS:
+            return Response({"error": "Invalid period"}, status=400)
+        try:
+            day = date.fromisoformat(day) if day else current_start.date()
+            # The first / last days have no room for a week or a 6 AM start
+            start, end = rollups.period_window(period, day)
+        except (ValueError, OverflowError):
+            return Response({"error": "Invalid date"}, status=400)
+        return self.history(request, period, start, end)
+
+    def live(self, request, current_start):
+        return _cached_response(request, _live_key(current_start), lambda: self.build_live(current_start), ttl=LIVE_TTL)
+
+    @staticmethod
+    def build_live(current_start):
+        # One range sum each for today and yesterday, all years at once
+        live = rollups.totals(current_start, current_start + rollups.DAY)
+        past = rollups.totals(current_start - rollups.DAY, current_start)
 
         response_data = {}
-
-        # ---------------------------------------------------------
-        # 3. GENERATE LEADERBOARD PER YEAR
-        # ---------------------------------------------------------
-        # We loop through years 1 to 4
-        for year in [1, 2, 3, 4]:
-            
-            # A. GET LIVE STANDINGS (Since 6 AM)
-            # We filter actions that happened >= current_start
-            live_communities = Community.objects.filter(year=year, is_global=False).annotate(
-                # Count actions within the time window
-                daily_posts=Count('post', filter=Q(post__created_at__gte=current_start), distinct=True),
-                daily_likes=Count('post__likes', filter=Q(post__likes__created_at__gte=current_start), distinct=True),
-                daily_comments=Count('post__comments', filter=Q(post__comments__created_at__gte=current_start), distinct=True),
-                daily_comment_likes=Count('post__comments__likes', filter=Q(post__comments__likes__created_at__gte=current_start), distinct=True)
-            )
-
-            leaderboard_list = []
-            for c in live_communities:
-                # 🧮 DAILY SCORE FORMULA
-                score = (
-                    (c.daily_posts * 5) + 
-                    (c.daily_likes * 2) + 
-                    (c.daily_comments * 8) + 
-                    (c.daily_comment_likes * 1)
-                )
-                leaderboard_list.append({
-                    "id": str(c.id),
-                    "name": c.name,
-                    "branch": c.branch,
-                    "division": c.division,
-                    "score": score,
-                    "stats": {
-                        "posts": c.daily_posts,
-                        "likes": c.daily_likes,
-                        "comments": c.daily_comments
-                    }
-                })
-
-            # Sort by Score (Highest First)
-            leaderboard_list.sort(key=lambda x: x['score'], reverse=True)
-            
-            # Add Rank
-            for idx, item in enumerate(leaderboard_list):
-                item['rank'] = idx + 1
-
-
-            # B. GET YESTERDAY'S WINNER
-            # We filter actions in the range [prev_start, prev_end]
-            past_communities = Community.objects.filter(year=year, is_global=False).annotate(
-                past_posts=Count('post', filter=Q(post__created_at__range=(prev_start, prev_end)), distinct=True),
-                past_likes=Count('post__likes', filter=Q(post__likes__created_at__range=(prev_start, prev_end)), distinct=True),
-                past_comments=Count('post__comments', filter=Q(post__comments__created_at__range=(prev_start, prev_end)), distinct=True),
-                past_comment_likes=Count('post__comments__likes', filter=Q(post__comments__likes__created_at__range=(prev_start, prev_end)), distinct=True)
-            )
-            
-            winner_data = None
-            highest_past_score = -1
-
-            for c in past_communities:
-                p_score = (
-                    (c.past_posts * 5) + 
-                    (c.past_likes * 2) + 
-                    (c.past_comments * 8) + 
-                    (c.past_comment_likes * 1)
-                )
-                if p_score > highest_past_score and p_score > 0:
-                    highest_past_score = p_score
-                    winner_data = {
-                        "id": str(c.id),
-                        "name": c.name,
-                        "score": p_score,
-                        "title": "Yesterday's Champion"
-                    }
-
-            # C. ASSEMBLE YEAR DATA
+        for year in YEARS:
             response_data[year] = {
-                "live_leaderboard": leaderboard_list,
-                "yesterday_winner": winner_data  # Can be null if no activity yesterday
+                "live_leaderboard": _year_standings(live, year),
+                "yesterday_winner": _winner(_year_standings(past, year), "Yesterday's Champion")
+            }
+        return response_data
+
+    def history(self, request, period, start, end):
+        cache_key = f"leaderboard_{period}_{start.strftime('%Y%m%d')}"
+
+        # Closed windows no longer change once the worker has settled them
+        settled = rollups.hour_floor(timezone.now()) - rollups.RECOMPUTE_HOURS * rollups.HOUR
+        ttl = 86400 if end <= settled else 90
+        return _cached_response(request, cache_key, lambda: self.build_history(period, start, end), ttl=ttl)
+
+    def build_history(self, period, start, end):
+        stats = rollups.totals(start, end)
+        response_data = {
+            "period": period,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "years": {},
+        }
+        for year in YEARS:
+            standings = _year_standings(stats, year)
+            response_data["years"][year] = {
+                "leaderboard": standings,
+                "winner": _winner(standings, "Champion"),
             }
+        return response_data
+
+
+def daily_scores(current_start):
+    """
+    {community_id (str): {"score", "rank"}} for today, every community at
+    once: one rollup range sum, cached for all clients. Ranks are within
+    the community's year (as on the leaderboard); global communities have
+    no rank.
+    """
+    cache_key = f"community_scores_{current_start.strftime('%Y%m%d')}"
+    return get_or_compute(cache_key, lambda: _build_scores(current_start), ttl=LIVE_TTL)
+
+
+def warm_leaderboards(current_start):
+    """
+    Compute a competition day's live leaderboard and scores before anyone
+    asks (the scheduler, at the 6 AM rollover), so the first requests of
+    the day don't all miss together.
+    """
+    _cached_entry(_live_key(current_start), lambda: LeaderboardView.build_live(current_start), ttl=LIVE_TTL)
+    daily_scores(current_start)
+
+
+def _build_scores(current_start):
+    stats = rollups.totals(current_start, current_start + rollups.DAY)
+    scores = {
+        str(c.id): {"score": rollups.score(stats.get(c.id, EMPTY_STATS)), "rank": None}
+        for c in community_registry.all()
+    }
+    for year in YEARS:
+        for item in _year_standings(stats, year):
+            scores[item["id"]]["rank"] = item["rank"]
+    return scores
+
+
+class CommunityScoreView(ReplicaReadMixin, APIView):
+    """ Get the DAILY score for just ONE community (using the 6 AM rule) """
+    permission_classes = [IsAuthenticated]
 
-        # ---------------------------------------------------------
-        # 4. SAVE TO CACHE
-        # ---------------------------------------------------------
-        cache.set(cache_key, response_data, timeout=90)
+    def get(self, request, community_id):
+        try:
+            scores = daily_scores(rollups.competition_day_start())
+            return Response({"score": scores.get(str(community_id), {"score": 0})["score"]})
+        except Exception:
+            logger.exception("Score calc error for community %s", community_id)
+            return Response({"score": 0})
+
+
+class CommunityScoresView(ReplicaReadMixin, APIView):
+    """
+    Daily score and rank for many communities in one call:
+    `?ids=<uuid>,<uuid>,...` (up to MAX_IDS). Served from daily_scores(),
+    so the cost doesn't depend on how many ids are asked for.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_IDS = 100
 
-        return Response(response_data)
+    def get(self, request):
+        raw_ids = [i.strip() for i in request.query_params.get("ids", "").split(",") if i.strip()]
+        if len(raw_ids) > self.MAX_IDS:
+            return Response({"error": f"At most {self.MAX_IDS} ids"}, status=400)
+        try:
+            ids = [str(uuid.UUID(i)) for i in raw_ids]
+        except ValueError:
+            return Response({"error": "Invalid community id"}, status=400)
 
+        scores = daily_scores(rollups.competition_day_start())
+        # Unknown ids are left out
+        return Response([{"id": i, **scores[i]} for i in dict.fromkeys(ids) if i in scores])
 
-class CommunityScoreView(APIView):
-    """ Get the DAILY score for just ONE community (using the 6 AM rule) """
+
+class CommunityActivityView(ReplicaReadMixin, APIView):
+    """
+    Activity chart for one community: posts, likes, comments and comment
+    likes per hour (`?bucket=hour`, last `?days=` days) or per competition
+    day (`?bucket=day`).
+    """
     permission_classes = [IsAuthenticated]
+    MAX_DAYS = 90
 
     def get(self, request, community_id):
+        if community_registry.get(community_id) is None:
+            return Response({"error": "Community not found"}, status=404)
+
+        bucket = request.query_params.get("bucket", "hour")
+        if bucket not in ("hour", "day"):
+            return Response({"error": "Invalid bucket"}, status=400)
         try:
-            # 1. Calculate Time Window
-            now = timezone.now()
-            today_6am = now.replace(hour=6, minute=0, second=0, microsecond=0)
-            if now < today_6am:
-                current_start = today_6am - timedelta(days=1)
-            else:
-                current_start = today_6am
-
-            # 2. Filter & Annotate (Same as Leaderboard)
-            c = Community.objects.filter(id=community_id).annotate(
-                daily_posts=Count('post', filter=Q(post__created_at__gte=current_start), distinct=True),
-                daily_likes=Count('post__likes', filter=Q(post__likes__created_at__gte=current_start), distinct=True),
-                daily_comments=Count('post__comments', filter=Q(post__comments__created_at__gte=current_start), distinct=True),
-                daily_comment_likes=Count('post__comments__likes', filter=Q(post__comments__likes__created_at__gte=current_start), distinct=True)
-            ).first()
-
-            if not c:
-                return Response({"score": 0})
-
-            # 🧮 SAME FORMULA
-            score = (
-                (c.daily_posts * 5) + 
-                (c.daily_likes * 2) + 
-                (c.daily_comments * 8) + 
-                (c.daily_comment_likes * 1)
-            )
-
-            return Response({"score": score})
-        except Exception as e:
-            print(f"Score Calc Error: {e}")
-            return Response({"score": 0})
\ No newline at end of file
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            return Response({"error": "Invalid days"}, status=400)
+        days = max(1, min(days, self.MAX_DAYS))
+
+        if bucket == "day":
+            end = rollups.competition_day_start() + rollups.DAY
+        else:
+            end = rollups.hour_floor(timezone.now()) + rollups.HOUR
+        start = end - days * rollups.DAY
+
+        cache_key = f"community_activity_{community_id}_{bucket}_{days}_{end.strftime('%Y%m%d%H')}"
+        return _cached_response(request, cache_key, lambda: {
+            "community_id": str(community_id),
+            "bucket": bucket,
+            "series": rollups.series(community_id, start, end, bucket),
+        }, ttl=60)
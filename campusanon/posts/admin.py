@@ -1,10 +1,18 @@
 from django.contrib import admin
 from django.db.models import Count
 # ✅ Added 'Notification' to the imports
-from .models import Post, Comment, PostReport, CommentReport, AdminAuditLog, PostLike, Notification 
+from .models import Post, Comment, PostReport, CommentReport, AdminAuditLog, PostLike, Notification, FilterTerm
+
+class HiddenReasonMixin:
+    def save_model(self, request, obj, form, change):
+        # Hidden / unhidden by hand: a staff decision, never undone automatically
+        if "is_hidden" in form.changed_data:
+            obj.hidden_reason = "admin" if obj.is_hidden else ""
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(HiddenReasonMixin, admin.ModelAdmin):
     list_display = (
         'alias', 
         'community', 
@@ -13,11 +21,14 @@ class PostAdmin(admin.ModelAdmin):
         'created_at', 
         'short_content', 
         'likes_count', 
-        'reports_count'
+        'reports_count',
+        'is_flagged'
     )
     
     list_filter = (
         'is_hidden', 
+        'hidden_reason',
+        'is_flagged',
         'community', 
         'post_type'
     )
@@ -30,32 +41,20 @@ class PostAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
+        # Reports use the stored counter; only likes need a join
         return queryset.annotate(
             total_likes=Count('likes', distinct=True),
-            total_reports=Count('reports', distinct=True)
         )
 
     @admin.display(description='Likes', ordering='total_likes')
     def likes_count(self, obj):
         return obj.total_likes
 
-    @admin.display(description='Reports', ordering='total_reports')
-    def reports_count(self, obj):
-        return obj.total_reports
-
 # ... (Keep CommentAdmin, PostReportAdmin, etc. unchanged)
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('alias', 'post', 'is_hidden', 'created_at', 'reports_count')
-    list_filter = ('is_hidden',)
-    
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(total_reports=Count('reports'))
-
-    @admin.display(description='Reports', ordering='total_reports')
-    def reports_count(self, obj):
-        return obj.total_reports
+class CommentAdmin(HiddenReasonMixin, admin.ModelAdmin):
+    list_display = ('alias', 'post', 'is_hidden', 'created_at', 'reports_count', 'is_flagged')
+    list_filter = ('is_hidden', 'hidden_reason', 'is_flagged')
 
 @admin.register(PostReport)
 class PostReportAdmin(admin.ModelAdmin):
@@ -81,4 +80,13 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('recipient', 'actor', 'verb', 'is_read', 'created_at')
     list_filter = ('is_read', 'verb', 'created_at')  # Filter by Read Status & Type
     search_fields = ('recipient__username', 'actor__username')  # Search by users
-    list_per_page = 50  # Notifications can be many, pagination helps
\ No newline at end of file
+    list_per_page = 50  # Notifications can be many, pagination helps
+
+
+# 🧹 Content filter terms (posts/content_filter.py); edits apply to every worker
+@admin.register(FilterTerm)
+class FilterTermAdmin(admin.ModelAdmin):
+    list_display = ('term', 'match', 'action', 'is_active', 'note', 'created_at')
+    list_filter = ('action', 'match', 'is_active')
+    list_editable = ('action', 'is_active')
+    search_fields = ('term', 'note')
@@ -5,4 +5,5 @@ class PostsConfig(AppConfig):
     name = 'posts'
 
     def ready(self):
-        import posts.signals
\ No newline at end of file
+        import posts.signals
+        import campusanon.slow_queries  # installs the slow query wrapper on new DB connections
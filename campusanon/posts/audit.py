@@ -0,0 +1,223 @@
+"""
+Buffered AdminAuditLog writes.
+
+log_admin_action() pushes the entry onto a Redis list (one RPUSH) and returns;
+a daemon thread in each worker drains the list every few seconds with one
+bulk INSERT. Entries live in Redis, not in worker memory, so a crashed worker
+loses nothing:
+
+- a flush moves its batch atomically from audit:pending to its own
+  audit:processing:<id> list (registered in audit:claims) and only deletes
+  it once the INSERT has committed;
+- a batch still claimed after CLAIM_TIMEOUT_SECONDS belonged to a flusher
+  that died, and the next flush anywhere (or AdminAuditLogView, which drains
+  before reading) puts it back at the head of the queue. A flusher that died
+  between the commit and the delete gets its rows written twice: at least
+  once, never zero.
+
+Entries are validated and truncated to the column sizes when buffered. A
+row the database still refuses (e.g. its admin was erased meanwhile) goes to
+audit:dead with the error instead of blocking every later flush.
+
+If Redis is unreachable the entry is written synchronously instead.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+import uuid
+
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from campusanon.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "audit:pending"
+PROCESSING_PREFIX = "audit:processing:"
+CLAIMS_KEY = "audit:claims"
+DEAD_KEY = "audit:dead"
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 2
+CLAIM_TIMEOUT_SECONDS = 300
+DEAD_KEEP = 1000
+
+# Move up to ARGV[1] entries from the head of the queue to this flush's list
+_claim = redis_client.register_script("""
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then
+    return items
+end
+redis.call('LTRIM', KEYS[1], #items, -1)
+redis.call('RPUSH', KEYS[2], unpack(items))
+redis.call('ZADD', KEYS[3], ARGV[2], KEYS[2])
+return items
+""")
+
+# Put a claimed batch back at the head of the queue, in order
+_unclaim = redis_client.register_script("""
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[1], items[i])
+end
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[3], KEYS[2])
+return #items
+""")
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _serialize(admin_id, action, target_id, target_type, reason):
+    """ Raises ValueError for ids that are not UUIDs, in the caller, not in the flusher. """
+    from .models import AdminAuditLog
+
+    def max_length(name):
+        return AdminAuditLog._meta.get_field(name).max_length
+
+    return json.dumps({
+        "admin_id": str(uuid.UUID(str(admin_id))),
+        "action": action[:max_length("action")],
+        "target_id": str(uuid.UUID(str(target_id))),
+        "target_type": target_type[:max_length("target_type")],
+        "reason": (reason or "")[:max_length("reason")],
+        "created_at": timezone.now().isoformat(),
+    })
+
+
+def _to_row(payload):
+    from .models import AdminAuditLog
+
+    data = json.loads(payload)
+    return AdminAuditLog(
+        admin_id=data["admin_id"],
+        action=data["action"],
+        target_id=data["target_id"],
+        target_type=data["target_type"],
+        reason=data["reason"],
+        created_at=parse_datetime(data["created_at"]),
+    )
+
+
+def enqueue(entries):
+    """
+    Queue (admin_id, action, target_id, target_type, reason) tuples for
+    insertion. Falls back to a direct bulk INSERT if Redis is down.
+    """
+    payloads = [_serialize(*entry) for entry in entries]
+    if not payloads:
+        return
+
+    try:
+        redis_client.rpush(PENDING_KEY, *payloads)
+    except Exception as exc:
+        logger.warning("Audit buffer unavailable, writing directly: %s", exc)
+        _write([_to_row(p) for p in payloads])
+        return
+
+    _ensure_flusher()
+
+
+def _write(rows):
+    from .models import AdminAuditLog
+
+    AdminAuditLog.objects.bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+
+
+def _write_batch(payloads):
+    """ INSERT the batch; rows the database refuses are dead-lettered. Returns rows written. """
+    rows, dead = [], []
+    for payload in payloads:
+        try:
+            rows.append((payload, _to_row(payload)))
+        except (ValueError, KeyError, TypeError) as exc:
+            dead.append((payload, exc))
+
+    try:
+        with transaction.atomic():
+            _write([row for _, row in rows])
+        written = len(rows)
+    except (DataError, IntegrityError):
+        # Find the bad rows one at a time; anything else (database down) propagates
+        written = 0
+        for payload, row in rows:
+            try:
+                with transaction.atomic():
+                    _write([row])
+                written += 1
+            except (DataError, IntegrityError) as exc:
+                dead.append((payload, exc))
+
+    if dead:
+        logger.error("Dead-lettered %s audit entries", len(dead), extra={"errors": [repr(e) for _, e in dead]})
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.lpush(DEAD_KEY, *[json.dumps({"payload": p, "error": repr(e)}) for p, e in dead])
+        pipe.ltrim(DEAD_KEY, 0, DEAD_KEEP - 1)
+        pipe.execute()
+    return written
+
+
+def recover_stale_claims():
+    """ Re-queue batches claimed by flushers that died mid-flush. Returns entries re-queued. """
+    stale = redis_client.zrangebyscore(CLAIMS_KEY, "-inf", time.time() - CLAIM_TIMEOUT_SECONDS)
+    recovered = 0
+    for processing in stale:
+        recovered += _unclaim(keys=[PENDING_KEY, processing, CLAIMS_KEY])
+    if recovered:
+        logger.warning("Re-queued %s audit entries from dead flushers", recovered)
+    return recovered
+
+
+def flush_pending():
+    """ Drain the Redis buffer into AdminAuditLog. Returns rows written. """
+    recover_stale_claims()
+    processing = PROCESSING_PREFIX + uuid.uuid4().hex
+    written = 0
+    while True:
+        payloads = _claim(keys=[PENDING_KEY, processing, CLAIMS_KEY], args=[FLUSH_BATCH_SIZE, time.time()])
+        if not payloads:
+            return written
+        try:
+            written += _write_batch(payloads)
+        except Exception:
+            # Database trouble: back at the head, in order, for the next flush
+            _unclaim(keys=[PENDING_KEY, processing, CLAIMS_KEY])
+            raise
+        pipe = redis_client.pipeline()
+        pipe.delete(processing)
+        pipe.zrem(CLAIMS_KEY, processing)
+        pipe.execute()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            close_old_connections()
+            flush_pending()
+        except Exception as exc:
+            logger.warning("Audit flush failed, will retry: %s", exc)
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_forever, name="audit-flusher", daemon=True)
+            _flusher.start()
+
+
+@atexit.register
+def _flush_on_exit():
+    if _flusher is None:
+        return
+    try:
+        flush_pending()
+    except Exception as exc:
+        logger.warning("Audit flush on exit failed (entries stay queued): %s", exc)
@@ -0,0 +1,240 @@
+"""
+Write-time content filter for posts and comments.
+
+Staff keep FilterTerm rows (Django admin, or the load_filter_terms command
+for whole lists). Every worker compiles the active terms into one
+Aho-Corasick automaton, so checking a post walks its text once whatever
+the number of terms: no regex per term and no query on the request path.
+
+Text and terms go through the same normalize() first, so common evasions
+land on the same spelling:
+
+- case, accents and full-width forms (NFKD);
+- leetspeak: 0 -> o, 1 -> i, 3 -> e, 4 -> a, 5 -> s, @ -> a, $ -> s ...;
+- separators inside a word: "f.u-c_k" -> "fuck";
+- Hinglish spelling variants: ph/f, w/v, q/k, z/j, oo/u, and a dropped
+  aspirate h (bh, dh, gh, jh, kh, th);
+- stretched letters ("fuuuuck") are skipped while scanning, so "ass"
+  still needs two s's.
+
+"word" terms only match whole words (the Scunthorpe problem), "substring"
+terms match anywhere. Each term carries an action; when several match, the
+strongest wins: block (reject) > hide (publish hidden) > flag (publish, put
+it in the moderation queue).
+
+Edits publish on a Redis channel and every worker rebuilds on its next
+check (see communities/registry.py for the same scheme).
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+
+from campusanon.redis import pubsub_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "content_filter:changed"
+
+# Safety net: rebuild even without a pub/sub message
+MAX_AGE_SECONDS = 300
+
+# Strongest first
+ACTIONS = ("block", "hide", "flag")
+
+LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "+": "t",
+})
+# "!" and "|" only stand for i inside a word ("sh!t", not "shit!")
+LEET_INSIDE = re.compile(r"[!|](?=\w)")
+JOINERS = re.compile(r"(?<=\w)[.\-_*'`~]+(?=\w)")
+SEPARATORS = re.compile(r"[\W_]+")
+FOLDS = (
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck"), "k"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"o{2,}"), "u"),
+    (re.compile(r"([bdgjkt])h"), r"\1"),
+)
+
+
+def normalize(text):
+    """ Lowercase ASCII-ish words separated by single spaces, padded with one on each side. """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = LEET_INSIDE.sub("i", text.translate(LEET))
+    text = SEPARATORS.sub(" ", JOINERS.sub("", text))
+    for pattern, replacement in FOLDS:
+        text = pattern.sub(replacement, text)
+    return f" {text.strip()} "
+
+
+class Automaton:
+    """ Aho-Corasick over normalized terms; matches() runs in O(len(text) + matches). """
+
+    def __init__(self, patterns):
+        # patterns: {pattern: payload}
+        self.goto = [{}]
+        self.fail = [0]
+        self.char = [""]        # character leading into each state
+        self.out = [()]
+
+        for pattern, payload in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.char.append(ch)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (payload,)
+
+        # Breadth first, so a state's fail target is done before the state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def matches(self, text):
+        goto, fail, char, out = self.goto, self.fail, self.char, self.out
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                if ch == char[state]:
+                    continue  # a stretched letter: "fuuuck"
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                nxt = goto[state].get(ch, 0)
+            state = nxt
+            if out[state]:
+                yield from out[state]
+
+
+class _Snapshot:
+    """ Automaton built from one read of the active terms. """
+
+    def __init__(self, terms):
+        patterns = {}
+        for term, match, action in terms:
+            pattern = normalize(term)
+            if match == "substring":
+                pattern = pattern.strip()
+            if pattern.strip():
+                patterns[pattern] = (term, action)
+        self.automaton = Automaton(patterns)
+        self.size = len(patterns)
+        self.loaded_at = time.monotonic()
+
+
+class ContentFilter:
+    def __init__(self):
+        self._snapshot = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self._listener = None
+
+    # ---------------------------------------------------------
+    # Loading / invalidation
+    # ---------------------------------------------------------
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if (
+            self._stale
+            or snapshot is None
+            or time.monotonic() - snapshot.loaded_at > MAX_AGE_SECONDS
+        ):
+            with self._lock:
+                snapshot = self._snapshot
+                if self._stale or snapshot is None or time.monotonic() - snapshot.loaded_at > MAX_AGE_SECONDS:
+                    snapshot = self._load()
+            self._ensure_listener()
+        return snapshot
+
+    def _load(self):
+        from .models import FilterTerm
+
+        # Clear the flag first so a change published mid-load triggers another rebuild.
+        self._stale = False
+        terms = FilterTerm.objects.filter(is_active=True).values_list("term", "match", "action")
+        snapshot = _Snapshot(list(terms))
+        self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """ Drop this worker's automaton; the next check rebuilds it. """
+        self._stale = True
+
+    def notify_changed(self):
+        """ Invalidate this worker and tell every other worker to do the same. """
+        self.invalidate()
+        try:
+            redis_client.publish(CHANNEL, "1")
+        except Exception as exc:
+            logger.warning("Could not publish content filter change: %s", exc)
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name="content-filter", daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                with pubsub_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    pubsub.subscribe(CHANNEL)
+                    self.invalidate()
+                    backoff = 1
+                    for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self.invalidate()
+            except Exception as exc:
+                logger.warning("Content filter listener disconnected: %s", exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    # ---------------------------------------------------------
+    # Checks
+    # ---------------------------------------------------------
+    def check(self, text):
+        """
+        Returns (action, matched terms): action is "block", "hide", "flag"
+        or None when nothing matched.
+        """
+        snapshot = self._get_snapshot()
+        if not snapshot.size or not text:
+            return None, []
+
+        found = {}
+        for term, action in snapshot.automaton.matches(normalize(str(text))):
+            found.setdefault(term, action)
+        if not found:
+            return None, []
+
+        action = min(found.values(), key=ACTIONS.index)
+        return action, sorted(found)
+
+
+content_filter = ContentFilter()
@@ -0,0 +1,157 @@
+"""
+Near-duplicate detection for raids: the same text pasted across
+communities, from many accounts, with small edits.
+
+Every post / comment of at least DUPLICATE_MIN_LENGTH characters (after
+content_filter.normalize(), so leetspeak and spacing tricks don't help) gets
+a 64-bit SimHash of its character 4-grams. Texts a few edits apart differ in
+only a few bits.
+
+The index lives in Redis: the hash is cut into BANDS 8-bit bands and each
+band value is a sorted set of the recent items carrying it, scored by time.
+check() is one pipelined round trip of BANDS range reads over small sets
+(each holds ~1/256 of the window), then an exact Hamming distance on the
+candidates. A one-word edit of a short post moves ~5-12 bits and still
+shares a band with the original well over 90% of the time; unrelated posts
+sit 20+ bits apart.
+
+With DUPLICATE_HIDE_AFTER earlier copies inside DUPLICATE_WINDOW_SECONDS the
+new one is published hidden, with DUPLICATE_BLOCK_AFTER it is refused.
+Copies are grouped into clusters named after the first item (e.g.
+"post:<id>"), which staff list through admin/duplicates/.
+
+Redis trouble never blocks a write: the check fails open.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+
+from campusanon.redis import redis_client
+from .content_filter import normalize
+
+logger = logging.getLogger(__name__)
+
+BITS = 64
+BANDS = 8
+BAND_BITS = BITS // BANDS
+SHINGLE = 4
+
+CLUSTERS_KEY = "dupes:clusters"
+CLUSTER_TTL = 24 * 3600     # a cluster is listed until a day after its last copy
+
+
+def _band_keys(simhash):
+    mask = (1 << BAND_BITS) - 1
+    return [f"dupes:band:{band}:{(simhash >> (band * BAND_BITS)) & mask:02x}" for band in range(BANDS)]
+
+
+def _cluster_key(root):
+    return f"dupes:cluster:{root}"
+
+
+def simhash(text):
+    """ 64-bit SimHash of the normalized text, or None when it is too short to judge. """
+    text = normalize(text).strip()
+    if len(text) < settings.DUPLICATE_MIN_LENGTH:
+        return None
+
+    shingles = {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big"), "064b")
+        for s in shingles
+    ]
+    # Bit i is set when most shingle hashes have it set (zip transposes to columns)
+    half = len(hashes) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*hashes)), 2)
+
+
+def distance(a, b):
+    return (a ^ b).bit_count()
+
+
+def check(text):
+    """
+    Returns (action, fingerprint). action is "block", "hide" or None;
+    pass the fingerprint to record() once the post / comment is written
+    (None: nothing to record).
+    """
+    fingerprint = simhash(text)
+    if fingerprint is None:
+        return None, None
+
+    now = time.time()
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in _band_keys(fingerprint):
+            pipe.zrangebyscore(key, now - settings.DUPLICATE_WINDOW_SECONDS, "+inf", withscores=True)
+        results = pipe.execute()
+    except Exception as exc:
+        logger.warning("Duplicate index unavailable: %s", exc)
+        return None, None
+
+    # member: "<simhash hex> <kind>:<id> <cluster root>"
+    matches = {}
+    for rows in results:
+        for member, seen_at in rows:
+            other, item, root = member.split(" ")
+            if item not in matches and distance(fingerprint, int(other, 16)) <= settings.DUPLICATE_MAX_DISTANCE:
+                matches[item] = (seen_at, root)
+
+    if not matches:
+        return None, (fingerprint, None, None)
+
+    # Join the cluster of the oldest copy
+    root_seen_at, root = min(matches.values())
+    if len(matches) >= settings.DUPLICATE_BLOCK_AFTER:
+        action = "block"
+    elif len(matches) >= settings.DUPLICATE_HIDE_AFTER:
+        action = "hide"
+    else:
+        action = None
+    logger.info("Near-duplicate of %s earlier items", len(matches), extra={"cluster": root, "action": action})
+    return action, (fingerprint, root, root_seen_at)
+
+
+def record(kind, item_id, fingerprint):
+    """ Add a written post / comment to the index (and to its cluster, if it copies one). """
+    if fingerprint is None:
+        return
+    simhash_, root, root_seen_at = fingerprint
+    item = f"{kind}:{item_id}"
+    now = time.time()
+    window = settings.DUPLICATE_WINDOW_SECONDS
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        member = f"{simhash_:016x} {item} {root or item}"
+        for key in _band_keys(simhash_):
+            pipe.zadd(key, {member: now})
+            pipe.zremrangebyscore(key, "-inf", now - window)
+            pipe.expire(key, window)
+        if root:
+            # The root joins its cluster the first time it is copied
+            pipe.zadd(_cluster_key(root), {root: root_seen_at}, nx=True)
+            pipe.zadd(_cluster_key(root), {item: now})
+            pipe.expire(_cluster_key(root), CLUSTER_TTL)
+            pipe.zadd(CLUSTERS_KEY, {root: now})
+            pipe.zremrangebyscore(CLUSTERS_KEY, "-inf", now - CLUSTER_TTL)
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Could not index %s for duplicates: %s", item, exc)
+
+
+def recent_clusters(limit):
+    """ [(root, last_seen, [(item, seen_at), ...])], most recently active first. """
+    roots = redis_client.zrevrange(CLUSTERS_KEY, 0, limit - 1, withscores=True)
+    if not roots:
+        return []
+    pipe = redis_client.pipeline(transaction=False)
+    for root, _ in roots:
+        pipe.zrange(_cluster_key(root), 0, -1, withscores=True)
+    return [
+        (root, last_seen, items)
+        for (root, last_seen), items in zip(roots, pipe.execute())
+        if items
+    ]
@@ -0,0 +1,76 @@
+"""
+Community feed pages.
+
+The shared part of a page (the posts) is the same for every reader, so
+first pages are cached per (community, post_type, feed stamp). Like counts
+change far more often than the posts do: they are looked up per page,
+together with the per-viewer flags (liked / reported / mine), for just the
+ids on the page, and likes bump their own stamp (stamps.likes) instead of
+the feed stamp.
+"""
+from django.db.models import Count, Q
+
+from campusanon.swr import get_or_compute
+
+from . import media
+from .models import Post, PostLike, PostReport
+
+POST_TYPES = {value for value, _ in Post.POST_TYPES}
+FIRST_PAGE_CACHE_SECONDS = 300
+
+
+def parse_post_type(value):
+    """ None for "no filter"; raises ValueError for an unknown type. """
+    if not value:
+        return None
+    if value not in POST_TYPES:
+        raise ValueError(value)
+    return value
+
+
+def page_rows(queryset, page_size):
+    """ Viewer-independent rows for one page, newest first. """
+    posts = queryset.order_by("-created_at")[:page_size]
+    return [
+        {
+            "id": p.id,
+            "user_id": p.user_id,
+            "alias": p.alias,
+            "content": p.content,
+            "post_type": p.post_type,
+            "created_at": p.created_at,
+            "media": media.attachment_payload(p.attachments),
+        }
+        for p in posts
+    ]
+
+
+def first_page_rows(queryset, page_size, community_id, post_type, feed_stamp):
+    # A new post changes the stamp, so every reader of a busy feed misses at
+    # once: single-flight keeps that to one page query
+    key = f"feed_page_{community_id}_{post_type or 'all'}_{feed_stamp}"
+    return get_or_compute(key, lambda: page_rows(queryset, page_size), ttl=FIRST_PAGE_CACHE_SECONDS)
+
+
+def for_viewer(rows, user):
+    """ Attach likes_count / is_liked / is_mine / is_reported for this user (two indexed lookups). """
+    ids = [row["id"] for row in rows]
+    likes = {
+        like["post_id"]: like
+        for like in PostLike.objects.filter(post_id__in=ids).values("post_id").annotate(
+            total=Count("id"), mine=Count("id", filter=Q(user=user)),
+        )
+    } if ids else {}
+    reported = set(PostReport.objects.filter(reporter=user, post_id__in=ids).values_list("post_id", flat=True)) if ids else set()
+
+    data = []
+    for row in rows:
+        item = {k: v for k, v in row.items() if k != "user_id"}
+        item["id"] = str(row["id"])
+        like = likes.get(row["id"], {})
+        item["likes_count"] = like.get("total", 0)
+        item["is_liked"] = bool(like.get("mine"))
+        item["is_mine"] = row["user_id"] == user.id
+        item["is_reported"] = row["id"] in reported
+        data.append(item)
+    return data
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.content_filter import content_filter
+from posts.models import FilterTerm
+
+
+class Command(BaseCommand):
+    help = 'Loads banned terms for the content filter from a text file (one term per line, # comments)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Term list file')
+        parser.add_argument('--action', choices=[a for a, _ in FilterTerm.ACTIONS], default=FilterTerm.FLAG)
+        parser.add_argument('--match', choices=[m for m, _ in FilterTerm.MATCHES], default=FilterTerm.WORD)
+        parser.add_argument('--note', default='', help='Stored on every new term (e.g. the list it came from)')
+
+    def handle(self, *args, **options):
+        with open(options['path'], encoding='utf-8') as f:
+            terms = {
+                line.split('#', 1)[0].strip().lower()
+                for line in f
+            }
+        terms.discard('')
+
+        # Terms that already exist keep their current action / match
+        created = FilterTerm.objects.bulk_create([
+            FilterTerm(term=term[:100], action=options['action'], match=options['match'], note=options['note'])
+            for term in sorted(terms)
+        ], ignore_conflicts=True, batch_size=1000)
+
+        # bulk_create sends no post_save: tell the workers ourselves
+        content_filter.notify_changed()
+        self.stdout.write(f"🧹 Loaded {len(created)} terms ({len(terms)} in file)")
@@ -0,0 +1,51 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts.partitions import (
+    PARTITIONED_TABLES,
+    check_partitioning,
+    is_partitioned,
+    ensure_partitions,
+    detach_old_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming monthly partitions and detaches (archives/drops) expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3, help='Months of future partitions to keep ready')
+        parser.add_argument('--retain-months', type=int, default=None,
+                            help='Detach partitions older than this many months (default: keep everything)')
+        parser.add_argument('--drop', action='store_true', help='Drop detached partitions instead of archiving')
+        parser.add_argument('--no-archive', action='store_true', help='Leave detached partitions in the public schema')
+
+    def handle(self, *args, **options):
+        try:
+            check_partitioning()
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        today = timezone.now().date()
+
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(table):
+                self.stdout.write(f"   Note: {table} is not partitioned, skipping")
+                continue
+
+            for name in ensure_partitions(table, today, options['ahead']):
+                self.stdout.write(f"   ✅ Created: {name}")
+
+            if options['retain_months'] is not None:
+                detached = detach_old_partitions(
+                    table,
+                    today,
+                    options['retain_months'],
+                    archive=not options['no_archive'],
+                    drop=options['drop'],
+                )
+                for name in detached:
+                    self.stdout.write(f"   📦 Detached: {name}")
+
+        self.stdout.write("🎉 Partitions up to date.")
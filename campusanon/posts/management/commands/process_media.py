@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.media import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Builds thumbnail / WebP variants for uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Images claimed per pass')
+        parser.add_argument('--loop', action='store_true', help='Keep running (worker mode)')
+        parser.add_argument('--interval', type=int, default=2, help='Seconds to sleep when idle in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            claimed, ready = process_pending(limit=options['limit'])
+            if claimed:
+                self.stdout.write(f"🖼️  Processed {ready}/{claimed} images")
+
+            if not options['loop']:
+                break
+            if claimed < options['limit']:
+                time.sleep(options['interval'])
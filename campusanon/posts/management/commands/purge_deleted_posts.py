@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.purge import PURGE_BATCH_SIZE, purge_deleted_posts
+
+
+class Command(BaseCommand):
+    help = 'Purges soft-deleted posts and their likes, comments, reports and notifications in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Posts per pass')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Rows per DELETE')
+        parser.add_argument('--loop', action='store_true', help='Keep running (worker mode)')
+        parser.add_argument('--interval', type=int, default=30, help='Seconds to sleep when idle in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            purged = purge_deleted_posts(limit=options['limit'], batch_size=options['batch_size'])
+            if purged:
+                self.stdout.write(f"🗑️  Purged {purged} deleted posts")
+
+            if not options['loop']:
+                break
+            if purged < options['limit']:
+                time.sleep(options['interval'])
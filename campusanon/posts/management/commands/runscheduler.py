@@ -0,0 +1,28 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+
+from campusanon import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Queues periodic jobs (campusanon/scheduler.py) on their cron schedules; safe to run on several dynos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', action='store_true', help='Print the declared jobs and their next run, then exit')
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')  # every app's tasks.py declares its jobs
+
+        if options['list']:
+            for job in scheduler.jobs().values():
+                self.stdout.write(f"   {job.cron!s:<16} {job.name}")
+            return
+
+        runner = scheduler.Scheduler()
+        signal.signal(signal.SIGTERM, lambda *_: runner.stop())
+        signal.signal(signal.SIGINT, lambda *_: runner.stop())
+
+        self.stdout.write(f"⏰ Scheduler {runner.id}: {len(scheduler.jobs())} jobs")
+        runner.run()
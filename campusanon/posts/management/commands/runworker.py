@@ -0,0 +1,40 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+
+from campusanon import tasks
+
+
+class Command(BaseCommand):
+    help = 'Runs background tasks (campusanon/tasks.py) from the Redis queues'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queues', default=None,
+                            help='Comma-separated queues, highest priority first (default: every declared queue)')
+        parser.add_argument('--concurrency', type=int, default=settings.TASKS_WORKER_THREADS,
+                            help='Tasks run at once (threads)')
+        parser.add_argument('--requeue-dead', type=int, default=None, metavar='N',
+                            help='Put the newest N dead-lettered tasks back on their queues and exit')
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')  # every app's tasks.py registers its tasks
+
+        if options['requeue_dead'] is not None:
+            count = tasks.requeue_dead(options['requeue_dead'])
+            self.stdout.write(f"♻️  Re-queued {count} dead tasks")
+            return
+
+        if options['queues']:
+            queues = [q.strip() for q in options['queues'].split(',') if q.strip()]
+        else:
+            queues = tasks.declared_queues()
+
+        worker = tasks.Worker(queues, threads=options['concurrency'])
+        # SIGTERM (deploys) / Ctrl-C: finish the running tasks, then exit
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+        self.stdout.write(f"⚙️  Worker {worker.id}: {options['concurrency']} threads on {', '.join(queues)}")
+        worker.run()
@@ -0,0 +1,279 @@
+"""
+Image attachments.
+
+1. Upload: the client POSTs the raw image bytes (Content-Type image/*) to
+   posts/media/upload/. receive_upload() reads the body CHUNK_SIZE bytes at
+   a time into a temporary file on disk, checking the size limit as it goes
+   and the real type from the first bytes (the header is not trusted), then
+   hands the file to the "media" storage (settings.STORAGES), which copies it
+   chunk by chunk as well. No upload is ever held in worker memory.
+2. Attach: CreatePostView takes up to MEDIA_MAX_PER_POST uploaded ids.
+3. Process: the process_media worker decodes each original with Pillow,
+   applies the EXIF rotation, writes WebP variants (thumb, display) without
+   any metadata, then deletes the original, which may carry EXIF / GPS data
+   and is never served.
+4. Serve: sync_attachments() copies the ready variants onto
+   Post.attachments, so feeds render `media` without another query and
+   clients only ever get the small variant URLs.
+"""
+import logging
+import tempfile
+import uuid
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from campusanon import stamps
+from .models import Post, PostMedia
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Longest edge in pixels
+VARIANTS = {"thumb": 320, "display": 1280}
+WEBP_QUALITY = 80
+
+MAX_ATTEMPTS = 3
+CLAIM_TIMEOUT = timedelta(minutes=10)   # a crashed worker's claims are retried after this
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def media_storage():
+    return storages["media"]
+
+
+def original_name(media_id):
+    return f"originals/{media_id.hex}"
+
+
+def variant_name(media_id, variant):
+    return f"variants/{media_id.hex}/{variant}.webp"
+
+
+def sniff(head):
+    """ Content type from the file's magic bytes, or None if not accepted. """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+# ---------------------------------------------------------
+# Upload
+# ---------------------------------------------------------
+def receive_upload(stream, user):
+    """ Stream an image body into storage; returns the unattached PostMedia. """
+    if stream is None:
+        raise UploadRejected("Empty upload")
+
+    media_id = uuid.uuid4()
+    content_type = None
+    size = 0
+    with tempfile.TemporaryFile() as tmp:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if content_type is None:
+                content_type = sniff(chunk[:16])
+                if content_type is None:
+                    raise UploadRejected("Only JPEG, PNG and WebP images are allowed", status=415)
+            size += len(chunk)
+            if size > settings.MEDIA_MAX_UPLOAD_BYTES:
+                raise UploadRejected("Image too large", status=413)
+            tmp.write(chunk)
+
+        if size == 0:
+            raise UploadRejected("Empty upload")
+        tmp.seek(0)
+        name = media_storage().save(original_name(media_id), File(tmp))
+
+    return PostMedia.objects.create(
+        id=media_id,
+        uploader=user,
+        original=name,
+        content_type=content_type,
+        size=size,
+    )
+
+
+# ---------------------------------------------------------
+# Attach
+# ---------------------------------------------------------
+def parse_media_ids(value):
+    """ A list (JSON) or comma-separated string of ids; raises UploadRejected. """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    if not isinstance(value, list):
+        raise UploadRejected("Invalid media_ids")
+    try:
+        ids = list(dict.fromkeys(uuid.UUID(str(v).strip()) for v in value))
+    except ValueError:
+        raise UploadRejected("Invalid media_ids")
+    if len(ids) > settings.MEDIA_MAX_PER_POST:
+        raise UploadRejected(f"At most {settings.MEDIA_MAX_PER_POST} images per post")
+    return ids
+
+
+def check_attachable(user, media_ids):
+    """ The ids must be this user's own, unattached, not failed uploads. """
+    found = PostMedia.objects.filter(
+        id__in=media_ids, uploader=user, post__isnull=True
+    ).exclude(status=PostMedia.FAILED).count()
+    if found != len(media_ids):
+        raise UploadRejected("Unknown media")
+
+
+def attach(post, media_ids):
+    PostMedia.objects.filter(id__in=media_ids, post__isnull=True).update(post=post)
+    sync_attachments(post.id, post)
+
+
+def sync_attachments(post_id, post=None):
+    """
+    Rebuild Post.attachments from its ready media (upload order). Called by
+    attach() and by the worker, so whichever finishes last publishes them.
+    `post` (an instance the caller already has) saves a lookup and is updated.
+    """
+    ready = PostMedia.objects.filter(post_id=post_id, status=PostMedia.READY).order_by("created_at")
+    attachments = [
+        {"id": str(m.id), "width": m.width, "height": m.height, **m.variants}
+        for m in ready
+    ]
+    if post is None:
+        post = Post.objects.filter(pk=post_id).only("attachments", "community_id").first()
+    if post is None or post.attachments == attachments:
+        return
+    Post.objects.filter(pk=post_id).update(attachments=attachments)
+    post.attachments = attachments
+    stamps.bump(stamps.feed(post.community_id), stamps.post(post_id))
+
+
+def attachment_payload(attachments):
+    """ What feeds send: dimensions and variant URLs only. """
+    if not attachments:
+        return []
+    storage = media_storage()
+    return [
+        {
+            "id": a["id"],
+            "width": a["width"],
+            "height": a["height"],
+            **{variant: storage.url(a[variant]) for variant in VARIANTS if variant in a},
+        }
+        for a in attachments
+    ]
+
+
+# ---------------------------------------------------------
+# Process (process_media worker)
+# ---------------------------------------------------------
+def claim_batch(limit):
+    """ Mark up to `limit` unprocessed uploads as ours (SKIP LOCKED on Postgres). """
+    stale = timezone.now() - CLAIM_TIMEOUT
+    with transaction.atomic():
+        # Claimed MAX_ATTEMPTS times and never finished: the image kills the worker
+        PostMedia.objects.filter(
+            status=PostMedia.PROCESSING, claimed_at__lt=stale, attempts__gte=MAX_ATTEMPTS
+        ).update(status=PostMedia.FAILED, error="Gave up")
+
+        ids = list(
+            PostMedia.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=PostMedia.PENDING) | Q(status=PostMedia.PROCESSING, claimed_at__lt=stale))
+            .order_by("created_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        PostMedia.objects.filter(id__in=ids).update(
+            status=PostMedia.PROCESSING, claimed_at=timezone.now(), attempts=F("attempts") + 1
+        )
+    return list(PostMedia.objects.filter(id__in=ids).order_by("created_at"))
+
+
+def build_variants(media):
+    """ Decode the original and write the WebP variants. Returns (variants, width, height). """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = settings.MEDIA_MAX_PIXELS  # larger raises DecompressionBombError
+    storage = media_storage()
+    with storage.open(media.original, "rb") as f:
+        image = Image.open(f)
+        # JPEG can decode at 1/2, 1/4, 1/8 scale: much less work for big photos
+        image.draft("RGB", (max(VARIANTS.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    variants = {}
+    size = image.size
+    for variant, edge in VARIANTS.items():
+        copy = image.copy()
+        copy.thumbnail((edge, edge), Image.LANCZOS)
+        out = BytesIO()
+        copy.save(out, "WEBP", quality=WEBP_QUALITY)  # no exif= : metadata is dropped
+        name = variant_name(media.id, variant)
+        storage.delete(name)  # a retried run overwrites its own files
+        variants[variant] = storage.save(name, ContentFile(out.getvalue()))
+        size = copy.size
+    return variants, size[0], size[1]
+
+
+def process(media):
+    """ Build one upload's variants; returns True when it became ready. """
+    try:
+        variants, width, height = build_variants(media)
+    except ImportError:
+        raise  # Pillow missing: a deployment problem, not the image's fault
+    except Exception as exc:
+        # Undecodable images fail for good after MAX_ATTEMPTS; storage hiccups get retried
+        failed = media.attempts >= MAX_ATTEMPTS
+        PostMedia.objects.filter(pk=media.pk).update(
+            status=PostMedia.FAILED if failed else PostMedia.PENDING, error=str(exc)[:255]
+        )
+        logger.warning("Image %s could not be processed: %s", media.id, exc, extra={"retry": not failed})
+        return False
+
+    PostMedia.objects.filter(pk=media.pk).update(
+        status=PostMedia.READY, variants=variants, width=width, height=height, original="", error=""
+    )
+    media_storage().delete(media.original)
+
+    # Read post_id again: it may have been attached while we worked
+    post_id = PostMedia.objects.filter(pk=media.pk).values_list("post_id", flat=True).first()
+    if post_id:
+        sync_attachments(post_id)
+    return True
+
+
+def process_pending(limit=20):
+    """ Returns (claimed, ready). """
+    batch = claim_batch(limit)
+    return len(batch), sum(process(media) for media in batch)
+
+
+# ---------------------------------------------------------
+# Cleanup (purge / erasure)
+# ---------------------------------------------------------
+def delete_files(media_ids):
+    """ Remove whatever files an upload may have left in storage. """
+    storage = media_storage()
+    for media_id in media_ids:
+        media_id = uuid.UUID(str(media_id))
+        for name in [original_name(media_id)] + [variant_name(media_id, v) for v in VARIANTS]:
+            storage.delete(name)
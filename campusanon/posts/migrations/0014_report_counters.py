@@ -0,0 +1,64 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_community_division_alter_community_unique_together'),
+        ('posts', '0013_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='first_reported_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='last_reported_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='report_velocity',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='first_reported_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_reported_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='report_velocity',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0), ('is_hidden', True), _connector='OR'), fields=['-report_velocity', '-id'], name='comment_modqueue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0), ('is_hidden', True), _connector='OR'), fields=['-report_velocity', '-id'], name='post_modqueue_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    now = timezone.now()
+
+    for model_name, fk in (("Post", "post"), ("Comment", "comment")):
+        model = apps.get_model("posts", model_name)
+        report_model = apps.get_model("posts", f"{model_name}Report")
+
+        stats = report_model.objects.values(fk).annotate(
+            total=Count("id"), first=Min("created_at"), last=Max("created_at")
+        )
+        for row in stats.iterator():
+            hours = max((now - row["first"]).total_seconds() / 3600, 1.0)
+            model.objects.filter(pk=row[fk]).update(
+                reports_count=row["total"],
+                first_reported_at=row["first"],
+                last_reported_at=row["last"],
+                report_velocity=row["total"] / hours,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_report_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
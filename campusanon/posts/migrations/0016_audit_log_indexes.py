@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:32
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_backfill_report_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adminauditlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['-created_at', '-id'], name='audit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['admin', '-created_at', '-id'], name='audit_admin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['action', '-created_at', '-id'], name='audit_action_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['target_type', 'target_id', '-created_at'], name='audit_target_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_audit_log_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adminauditlog',
+            name='action',
+            field=models.CharField(choices=[('BAN_USER', 'Ban User'), ('UNBAN_USER', 'Unban User'), ('HIDE_POST', 'Hide Post'), ('UNHIDE_POST', 'Unhide Post'), ('HIDE_COMMENT', 'Hide Comment'), ('UNHIDE_COMMENT', 'Unhide Comment')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,108 @@
+"""
+Postgres-only storage changes for time-window queries.
+
+1. BRIN indexes on created_at for the append-only tables the leaderboard
+   windows scan (posts, likes, comments, comment likes). Always applied.
+
+2. posts_notification rebuilt as a table partitioned by month on created_at.
+   Only when settings.PARTITIONED_NOTIFICATIONS is on; the rows are copied, so
+   schedule this on a quiet window for large tables. There is no automatic
+   reverse.
+
+No-op on other databases.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations
+
+BRIN_INDEXES = [
+    ("posts_post", "post_created_brin"),
+    ("posts_postlike", "postlike_created_brin"),
+    ("posts_comment", "comment_created_brin"),
+    ("posts_commentlike", "commentlike_created_brin"),
+]
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(d, months):
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def add_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, name in BRIN_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING brin (created_at)')
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, name in BRIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+def partition_notifications(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    if not getattr(settings, "PARTITIONED_NOTIFICATIONS", False):
+        return
+
+    run = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(created_at)::date, now()::date FROM posts_notification")
+        oldest, today = cursor.fetchone()
+
+    run("ALTER TABLE posts_notification RENAME TO posts_notification_legacy")
+    run(
+        "CREATE TABLE posts_notification (LIKE posts_notification_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    # The partition key has to be part of the primary key
+    run("ALTER TABLE posts_notification ADD CONSTRAINT posts_notif_part_pkey PRIMARY KEY (id, created_at)")
+    run(
+        "ALTER TABLE posts_notification ADD CONSTRAINT posts_notif_part_recipient_fk "
+        "FOREIGN KEY (recipient_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED"
+    )
+    run(
+        "ALTER TABLE posts_notification ADD CONSTRAINT posts_notif_part_actor_fk "
+        "FOREIGN KEY (actor_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED"
+    )
+    run(
+        "ALTER TABLE posts_notification ADD CONSTRAINT posts_notif_part_post_fk "
+        "FOREIGN KEY (post_id) REFERENCES posts_post (id) DEFERRABLE INITIALLY DEFERRED"
+    )
+    run("CREATE INDEX posts_notif_part_recipient_idx ON posts_notification (recipient_id, created_at DESC)")
+    run("CREATE INDEX posts_notif_part_actor_idx ON posts_notification (actor_id)")
+    run("CREATE INDEX posts_notif_part_post_idx ON posts_notification (post_id)")
+
+    # Monthly partitions from the oldest row to MONTHS_AHEAD past today,
+    # plus a DEFAULT partition for anything outside them.
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        run(
+            f'CREATE TABLE "posts_notification_p{month.year:04d}_{month.month:02d}" '
+            f"PARTITION OF posts_notification FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    run("CREATE TABLE posts_notification_default PARTITION OF posts_notification DEFAULT")
+
+    run("INSERT INTO posts_notification SELECT * FROM posts_notification_legacy")
+    run("DROP TABLE posts_notification_legacy")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_brin_indexes, drop_brin_indexes),
+        migrations.RunPython(partition_notifications, migrations.RunPython.noop),
+    ]
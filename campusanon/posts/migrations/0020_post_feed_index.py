@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_community_division_alter_community_unique_together'),
+        ('posts', '0019_time_partitioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', '-created_at', '-id'], name='post_feed_idx'),
+        ),
+    ]
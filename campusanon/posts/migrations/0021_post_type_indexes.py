@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_community_division_alter_community_unique_together'),
+        ('posts', '0020_post_feed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_hidden', False)), fields=['community', 'post_type', '-created_at'], name='post_type_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_hidden', False)), fields=['post_type', '-created_at'], name='post_type_recent_idx'),
+        ),
+    ]
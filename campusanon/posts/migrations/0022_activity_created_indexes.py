@@ -0,0 +1,32 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0006_community_activity_hour'),
+        ('posts', '0021_post_type_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='comment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentlike',
+            index=models.Index(fields=['created_at'], name='commentlike_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_at'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['created_at'], name='postlike_created_idx'),
+        ),
+    ]
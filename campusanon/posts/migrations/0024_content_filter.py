@@ -0,0 +1,64 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0006_community_activity_hour'),
+        ('posts', '0023_post_media'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilterTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('match', models.CharField(choices=[('word', 'Whole words'), ('substring', 'Anywhere, even inside words')], default='word', max_length=10)),
+                ('action', models.CharField(choices=[('block', 'Reject the post / comment'), ('hide', 'Publish hidden, pending review'), ('flag', 'Publish, add to the moderation queue')], default='flag', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_modqueue_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_modqueue_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='filter_matches',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='is_flagged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='filter_matches',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_flagged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0), ('is_hidden', True), ('is_flagged', True), _connector='OR'), fields=['-report_velocity', '-id'], name='comment_modqueue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('reports_count__gt', 0), ('is_hidden', True), ('is_flagged', True), _connector='OR'), fields=['-report_velocity', '-id'], name='post_modqueue_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+# posts/moderation.py thresholds at the time of this migration
+REPORT_THRESHOLD = 3
+
+
+def backfill(apps, schema_editor):
+    """ Best guess for rows hidden before the reason was stored; unsure ones count as staff's. """
+    for model_name in ("Post", "Comment"):
+        model = apps.get_model("posts", model_name)
+        hidden = model.objects.filter(is_hidden=True, hidden_reason="")
+        if model_name == "Post":
+            hidden.filter(is_deleted=True).update(hidden_reason="deleted")
+        hidden.filter(is_flagged=True).update(hidden_reason="filter")
+        hidden.filter(reports_count__gte=REPORT_THRESHOLD).update(hidden_reason="reports")
+        hidden.update(hidden_reason="admin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_content_filter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='hidden_reason',
+            field=models.CharField(blank=True, choices=[('', 'Visible'), ('reports', 'Report threshold'), ('admin', 'Hidden by staff'), ('filter', 'Content filter'), ('duplicate', 'Near-duplicate'), ('deleted', 'Deleted by author')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hidden_reason',
+            field=models.CharField(blank=True, choices=[('', 'Visible'), ('reports', 'Report threshold'), ('admin', 'Hidden by staff'), ('filter', 'Content filter'), ('duplicate', 'Near-duplicate'), ('deleted', 'Deleted by author')], default='', max_length=20),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
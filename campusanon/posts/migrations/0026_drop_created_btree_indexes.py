@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_hidden_reason'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='commentlike',
+            name='commentlike_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='postlike',
+            name='postlike_created_idx',
+        ),
+    ]
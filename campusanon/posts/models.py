@@ -1,9 +1,22 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 from communities.models import Community
 
 
+# Why a post / comment is hidden. Only "reports" is undone automatically,
+# when reports are withdrawn (posts/moderation.py release_report).
+HIDDEN_REASONS = [
+    ("", "Visible"),
+    ("reports", "Report threshold"),
+    ("admin", "Hidden by staff"),
+    ("filter", "Content filter"),
+    ("duplicate", "Near-duplicate"),
+    ("deleted", "Deleted by author"),
+]
+
+
 class Post(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -28,8 +41,56 @@ class Post(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     is_hidden = models.BooleanField(default=False)
+    hidden_reason = models.CharField(max_length=20, choices=HIDDEN_REASONS, blank=True, default="")
+
+    # 🗑️ Soft delete: hidden immediately, rows purged later by posts/purge.py
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    # 🚩 Moderation counters (kept up to date by posts/moderation.py)
+    reports_count = models.PositiveIntegerField(default=0)
+    report_velocity = models.FloatField(default=0)  # reports per hour
+    first_reported_at = models.DateTimeField(null=True, blank=True)
+    last_reported_at = models.DateTimeField(null=True, blank=True)
+
+    # 🧹 Write-time content filter (posts/content_filter.py): matched terms
+    # when a post was auto-hidden or flagged for review
+    is_flagged = models.BooleanField(default=False)
+    filter_matches = models.JSONField(default=list, blank=True)
+
+    # 🖼️ Processed images, copied from PostMedia so feeds need no join:
+    # [{"id", "width", "height", "thumb": name, "display": name}] (posts/media.py)
+    attachments = models.JSONField(default=list, blank=True)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Community feeds and timeline id lists: newest first per community
+            models.Index(fields=["community", "-created_at", "-id"], name="post_feed_idx"),
+            # post_type filtered feed / search: only visible posts are indexed
+            models.Index(
+                fields=["community", "post_type", "-created_at"],
+                name="post_type_feed_idx",
+                condition=models.Q(is_hidden=False),
+            ),
+            models.Index(
+                fields=["post_type", "-created_at"],
+                name="post_type_recent_idx",
+                condition=models.Q(is_hidden=False),
+            ),
+            # Moderation queue: only reported / hidden / flagged rows are indexed
+            models.Index(
+                fields=["-report_velocity", "-id"],
+                name="post_modqueue_idx",
+                condition=models.Q(reports_count__gt=0) | models.Q(is_hidden=True) | models.Q(is_flagged=True),
+            ),
+            # Purge worker picks up soft-deleted posts oldest first
+            models.Index(
+                fields=["deleted_at"],
+                name="post_purge_idx",
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.alias} in {self.community.name}"
@@ -47,14 +108,115 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     is_hidden = models.BooleanField(default=False)
+    hidden_reason = models.CharField(max_length=20, choices=HIDDEN_REASONS, blank=True, default="")
+
+    # 🚩 Moderation counters (kept up to date by posts/moderation.py)
+    reports_count = models.PositiveIntegerField(default=0)
+    report_velocity = models.FloatField(default=0)  # reports per hour
+    first_reported_at = models.DateTimeField(null=True, blank=True)
+    last_reported_at = models.DateTimeField(null=True, blank=True)
+
+    # 🧹 Write-time content filter (posts/content_filter.py)
+    is_flagged = models.BooleanField(default=False)
+    filter_matches = models.JSONField(default=list, blank=True)
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(
+                fields=["-report_velocity", "-id"],
+                name="comment_modqueue_idx",
+                condition=models.Q(reports_count__gt=0) | models.Q(is_hidden=True) | models.Q(is_flagged=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.alias} on {self.post.id}"
 
 
+class FilterTerm(models.Model):
+    """
+    A banned word or phrase for the write-time content filter
+    (posts/content_filter.py). Edits reach every worker without a restart.
+    """
+    WORD = "word"
+    SUBSTRING = "substring"
+    MATCHES = [
+        (WORD, "Whole words"),
+        (SUBSTRING, "Anywhere, even inside words"),
+    ]
+
+    # Strongest first: when several terms match, the strongest action wins
+    BLOCK = "block"
+    HIDE = "hide"
+    FLAG = "flag"
+    ACTIONS = [
+        (BLOCK, "Reject the post / comment"),
+        (HIDE, "Publish hidden, pending review"),
+        (FLAG, "Publish, add to the moderation queue"),
+    ]
+
+    term = models.CharField(max_length=100, unique=True)
+    match = models.CharField(max_length=10, choices=MATCHES, default=WORD)
+    action = models.CharField(max_length=10, choices=ACTIONS, default=FLAG)
+    is_active = models.BooleanField(default=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.term} ({self.action})"
+
+
+class PostMedia(models.Model):
+    """
+    An uploaded image. Created unattached by the upload endpoint, attached
+    when the post is created, and turned into WebP variants by the
+    process_media worker (posts/media.py).
+    """
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "Pending"),
+        (PROCESSING, "Processing"),
+        (READY, "Ready"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE, related_name="media_uploads")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name="media")
+
+    original = models.CharField(max_length=255, blank=True)  # storage name, removed once processed
+    content_type = models.CharField(max_length=20)
+    size = models.PositiveIntegerField()
+
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+
+    width = models.PositiveIntegerField(null=True, blank=True)   # of the "display" variant
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict, blank=True)        # name -> storage name
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Worker queue: only unfinished rows are indexed
+            models.Index(
+                fields=["created_at"],
+                name="media_queue_idx",
+                condition=models.Q(status__in=["pending", "processing"]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
 class PostLike(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="likes")
@@ -103,7 +265,9 @@ class AdminAuditLog(models.Model):
     ACTION_CHOICES = [
         ("BAN_USER", "Ban User"),
         ("UNBAN_USER", "Unban User"),
+        ("HIDE_POST", "Hide Post"),
         ("UNHIDE_POST", "Unhide Post"),
+        ("HIDE_COMMENT", "Hide Comment"),
         ("UNHIDE_COMMENT", "Unhide Comment"),
     ]
 
@@ -119,10 +283,19 @@ class AdminAuditLog(models.Model):
     target_type = models.CharField(max_length=30)
 
     reason = models.CharField(max_length=255, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: entries are written in batches (posts/audit.py)
+    # and must keep the time the action happened.
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination (created_at, id) for each AdminAuditLogView filter
+            models.Index(fields=["-created_at", "-id"], name="audit_created_idx"),
+            models.Index(fields=["admin", "-created_at", "-id"], name="audit_admin_idx"),
+            models.Index(fields=["action", "-created_at", "-id"], name="audit_action_idx"),
+            models.Index(fields=["target_type", "target_id", "-created_at"], name="audit_target_idx"),
+        ]
 
     def __str__(self):
         return f"{self.admin_id} → {self.action} ({self.target_type})"
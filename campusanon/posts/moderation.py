@@ -0,0 +1,242 @@
+import math
+import uuid
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from campusanon import stamps
+from . import audit
+from .models import Post, Comment
+
+# Reports needed before a post / comment is auto-hidden
+REPORT_THRESHOLD = 3
+COMMENT_REPORT_THRESHOLD = 3
+
+# Velocity is measured over at least one hour so a single report
+# doesn't outrank a burst. It falls as reports age: refresh_report_velocity
+# (a periodic job) rewrites the stored values.
+MIN_VELOCITY_WINDOW_HOURS = 1.0
+
+# Rows per UPDATE in bulk moderation (keeps row locks short)
+BULK_CHUNK_SIZE = 500
+
+
+def report_velocity(reports_count, first_reported_at, now):
+    """ Reports per hour since the first report. """
+    if not reports_count or first_reported_at is None:
+        return 0.0
+    hours = (now - first_reported_at).total_seconds() / 3600
+    return reports_count / max(hours, MIN_VELOCITY_WINDOW_HOURS)
+
+
+def record_report(obj, threshold):
+    """
+    Count a new report against a Post or Comment with one UPDATE (no COUNT),
+    hiding it once it reaches the threshold.
+    Returns (reports_count, is_hidden).
+    """
+    model = type(obj)
+    now = timezone.now()
+
+    # All SET expressions see the old row, so "old count >= threshold - 1"
+    # means the new count has reached the threshold.
+    model.objects.filter(pk=obj.pk).update(
+        reports_count=F("reports_count") + 1,
+        first_reported_at=Coalesce("first_reported_at", Value(now)),
+        last_reported_at=now,
+        is_hidden=Case(
+            When(reports_count__gte=threshold - 1, then=Value(True)),
+            default=F("is_hidden"),
+        ),
+        # Already hidden for another reason: that reason stays
+        hidden_reason=Case(
+            When(reports_count__gte=threshold - 1, is_hidden=False, then=Value("reports")),
+            default=F("hidden_reason"),
+        ),
+    )
+    obj.refresh_from_db(fields=["reports_count", "first_reported_at", "last_reported_at", "is_hidden", "hidden_reason"])
+
+    # Only write the velocity if no newer report landed in between;
+    # otherwise that request writes a fresher value.
+    velocity = report_velocity(obj.reports_count, obj.first_reported_at, now)
+    model.objects.filter(pk=obj.pk, reports_count=obj.reports_count).update(report_velocity=velocity)
+    obj.report_velocity = velocity
+
+    return obj.reports_count, obj.is_hidden
+
+
+def release_report(model, pk, threshold, count=1):
+    """
+    Undo `count` reports after they are deleted and unhide the target if
+    reports were what hid it and it drops below the threshold (never a
+    deleted post, or one hidden by staff, the content filter or the
+    duplicate check). Returns True if the target was unhidden.
+    """
+    model.objects.filter(pk=pk).update(reports_count=Greatest(F("reports_count") - count, Value(0)))
+    _write_velocities(model, model.objects.filter(pk=pk), timezone.now())
+    unhide = model.objects.filter(pk=pk, is_hidden=True, hidden_reason="reports", reports_count__lt=threshold)
+    if model is Post:
+        unhide = unhide.filter(is_deleted=False)
+    return bool(unhide.update(is_hidden=False, hidden_reason=""))
+
+
+def _write_velocities(model, queryset, now):
+    """
+    Recompute report_velocity for the given rows with one UPDATE. A row is
+    only written if its reports_count is still the one the value was
+    computed from (a newer report writes its own).
+    """
+    changed = {}
+    for pk, reports, first_reported_at, old in queryset.values_list(
+        "pk", "reports_count", "first_reported_at", "report_velocity"
+    ):
+        velocity = report_velocity(reports, first_reported_at, now)
+        if velocity != old:
+            changed[pk] = (reports, velocity)
+    if not changed:
+        return 0
+    return model.objects.filter(pk__in=changed).update(report_velocity=Case(
+        *[When(pk=pk, reports_count=reports, then=Value(velocity)) for pk, (reports, velocity) in changed.items()],
+        default=F("report_velocity"),
+    ))
+
+
+def refresh_report_velocity(model, now=None):
+    """ Let the stored velocity of every reported row decay. Returns rows updated. """
+    now = now or timezone.now()
+    queryset = model.objects.filter(Q(reports_count__gt=0) | Q(report_velocity__gt=0))
+    return sum(
+        _write_velocities(model, model.objects.filter(pk__in=chunk), now)
+        for chunk in iter_pk_chunks(queryset)
+    )
+
+
+def write_time_hidden_reason(filter_action, duplicate_action):
+    """ hidden_reason for a new post / comment ("" to publish it). """
+    if filter_action == "hide":
+        return "filter"
+    if duplicate_action == "hide":
+        return "duplicate"
+    return ""
+
+
+# ---------------------------------------------------------
+# Moderation queue (keyset pagination on velocity, id)
+# ---------------------------------------------------------
+def in_moderation_queue(queryset):
+    # Must match the condition of the post/comment *_modqueue_idx indexes
+    return queryset.filter(Q(reports_count__gt=0) | Q(is_hidden=True) | Q(is_flagged=True))
+
+
+def encode_queue_cursor(obj):
+    return f"{obj.report_velocity!r}_{obj.id}"
+
+
+def apply_queue_cursor(queryset, cursor):
+    """ Rows strictly after the cursor in (-report_velocity, -id) order. """
+    try:
+        velocity, last_id = cursor.split("_", 1)
+        velocity, last_id = float(velocity), uuid.UUID(last_id)
+    except ValueError:
+        return queryset
+    if not math.isfinite(velocity):
+        return queryset
+    return queryset.filter(
+        Q(report_velocity__lt=velocity) | Q(report_velocity=velocity, id__lt=last_id)
+    )
+
+
+# ---------------------------------------------------------
+# Bulk moderation (set-based, chunked)
+# ---------------------------------------------------------
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def iter_pk_chunks(queryset, size=BULK_CHUNK_SIZE):
+    """ Walk a queryset's primary keys in keyset-ordered chunks. """
+    last_pk = None
+    while True:
+        page = queryset.order_by("pk")
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        chunk = list(page.values_list("pk", flat=True)[:size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def _stamp_for(model, parent_id):
+    # Hidden posts change their community feed; hidden comments change their post
+    return stamps.feed(parent_id) if model is Post else stamps.post(parent_id)
+
+
+def set_hidden(model, pk_chunks, hidden):
+    """
+    Set is_hidden on Posts or Comments (as a staff decision), one short
+    transaction per chunk.
+    Only rows whose visibility actually changes are touched, except that
+    hiding a post the reports already hid makes it a staff decision (so
+    withdrawn reports no longer unhide it).
+    Returns the changed primary keys.
+    """
+    parent_field = "community_id" if model is Post else "post_id"
+    changed = []
+    touched_stamps = set()
+
+    for chunk in pk_chunks:
+        with transaction.atomic():
+            rows = list(
+                model.objects.select_for_update()
+                .filter(pk__in=chunk)
+                .exclude(is_hidden=hidden)
+                .values_list("pk", parent_field)
+            )
+            pks = [pk for pk, _ in rows]
+            if pks:
+                model.objects.filter(pk__in=pks).update(is_hidden=hidden, hidden_reason="admin" if hidden else "")
+            if hidden:
+                model.objects.filter(pk__in=chunk, hidden_reason="reports").update(hidden_reason="admin")
+
+        changed.extend(pks)
+        touched_stamps.update(_stamp_for(model, parent_id) for _, parent_id in rows)
+
+    stamps.bump(*touched_stamps)
+    return changed
+
+
+def bulk_set_hidden(admin, model, pks, hidden, reason=""):
+    """ Hide / unhide a list of ids with one batched audit write. """
+    if model is Post and not hidden:
+        # Soft-deleted posts stay hidden until purged
+        pks = Post.objects.filter(pk__in=list(pks), is_deleted=False).values_list("pk", flat=True)
+    changed = set_hidden(model, _chunks(list(pks), BULK_CHUNK_SIZE), hidden)
+
+    action = ("HIDE_" if hidden else "UNHIDE_") + model.__name__.upper()
+    audit.enqueue([(admin.id, action, pk, model.__name__, reason) for pk in changed])
+    return changed
+
+
+def ban_and_purge(admin, user, reason=""):
+    """
+    Ban a user and hide everything they posted.
+    Returns (hidden post ids, hidden comment ids).
+    """
+    type(user).objects.filter(pk=user.pk).update(is_banned=True)
+    user.is_banned = True
+
+    # Report-hidden rows too, so withdrawn reports can't bring them back
+    visible_or_reported = Q(is_hidden=False) | Q(hidden_reason="reports")
+    post_ids = set_hidden(Post, iter_pk_chunks(Post.objects.filter(visible_or_reported, user=user)), True)
+    comment_ids = set_hidden(Comment, iter_pk_chunks(Comment.objects.filter(visible_or_reported, user=user)), True)
+
+    entries = [(admin.id, "BAN_USER", user.id, "User", reason)]
+    entries += [(admin.id, "HIDE_POST", pk, "Post", reason) for pk in post_ids]
+    entries += [(admin.id, "HIDE_COMMENT", pk, "Comment", reason) for pk in comment_ids]
+    audit.enqueue(entries)
+
+    return post_ids, comment_ids
@@ -0,0 +1,156 @@
+"""
+Monthly range partitions (Postgres only).
+
+posts_notification is partitioned by created_at when PARTITIONED_NOTIFICATIONS
+is on while migration 0019 runs; the setting is not read afterwards, so
+check_partitioning() refuses to run maintenance when it no longer matches
+the table. Partitions are named <table>_pYYYY_MM and cover [first of month,
+first of next month), plus a DEFAULT partition. Retention is DETACH
+PARTITION (plus an optional move to an archive schema or DROP) instead of a
+mass DELETE.
+
+posts_post and posts_postlike stay regular tables: comments, likes, reports
+and notifications hold foreign keys to posts_post(id), and PostLike's
+unique (user, post) could not be enforced across partitions. Their time
+windows (leaderboard, rollups) use BRIN indexes on created_at instead.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+PARTITIONED_TABLES = ["posts_notification"]
+ARCHIVE_SCHEMA = "archive"
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def add_months(d, months):
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def _month_from_name(table, name):
+    suffix = name[len(table) + 2:]  # strip "<table>_p"
+    try:
+        year, month = suffix.split("_")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        return None  # e.g. the DEFAULT partition
+
+
+def is_partitioned(table):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def check_partitioning(table="posts_notification"):
+    """ Raise ImproperlyConfigured when PARTITIONED_NOTIFICATIONS disagrees with the table. """
+    if connection.vendor != "postgresql":
+        return
+    partitioned = is_partitioned(table)
+    if partitioned != settings.PARTITIONED_NOTIFICATIONS:
+        raise ImproperlyConfigured(
+            f"{table} is {'' if partitioned else 'not '}partitioned but PARTITIONED_NOTIFICATIONS is "
+            f"{settings.PARTITIONED_NOTIFICATIONS}: the setting only takes effect when migration "
+            f"posts/0019 runs. Set it back to match the table."
+        )
+
+
+def has_default_partition(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pt.partdefid <> 0",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(table):
+    """ {month: partition name} for the attached monthly partitions. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        month = _month_from_name(table, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+def create_partition(cursor, table, month):
+    name = partition_name(table, month)
+    # DDL takes no bind parameters; the bounds are formatted date objects
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+    return name
+
+
+def ensure_partitions(table, today, months_ahead=3):
+    """ Create partitions for the current month and the next months_ahead. """
+    existing = monthly_partitions(table)
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(month_start(today), offset)
+            if month not in existing:
+                created.append(create_partition(cursor, table, month))
+    return created
+
+
+def detach_old_partitions(table, today, retain_months, archive=True, drop=False, concurrently=True):
+    """
+    Detach partitions that end before the retention window.
+    Detached tables are moved to the archive schema, dropped, or left in place.
+    """
+    cutoff = add_months(month_start(today), -retain_months)
+    detached = []
+    concurrently = concurrently and not has_default_partition(table)
+
+    with connection.cursor() as cursor:
+        if archive and not drop:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"')
+
+        for month, name in sorted(monthly_partitions(table).items()):
+            if add_months(month, 1) > cutoff:
+                continue
+
+            # CONCURRENTLY avoids an ACCESS EXCLUSIVE lock on the parent
+            # (needs autocommit, i.e. no surrounding transaction). Postgres
+            # refuses it while the table has a DEFAULT partition, which 0019
+            # always creates, so those tables take the short lock instead.
+            mode = " CONCURRENTLY" if concurrently else ""
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"{mode}')
+
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}"')
+            elif archive:
+                cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"')
+            detached.append(name)
+
+    return detached
@@ -0,0 +1,73 @@
+"""
+Background purge of soft-deleted posts.
+
+DeletePostView only flags the post (is_deleted + is_hidden). The rows that
+hang off it (likes, comments, comment likes, reports, notifications) are
+removed here in bounded batches, children first, with plain DELETE ... WHERE
+pk IN (...) statements: no cascade collection, no per-row post_delete
+signals, and no lock held for longer than one batch.
+"""
+import time
+
+from .models import (
+    Post,
+    Comment,
+    PostLike,
+    CommentLike,
+    PostReport,
+    CommentReport,
+    Notification,
+    PostMedia,
+)
+from .media import delete_files
+
+PURGE_BATCH_SIZE = 1000
+
+
+def raw_delete(queryset):
+    """
+    DELETE the queryset's rows without loading them, cascading or sending
+    signals. Callers must have removed dependent rows first.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_in_batches(queryset, batch_size=PURGE_BATCH_SIZE, pause=0):
+    """ Delete matching rows batch_size at a time. Returns rows deleted. """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += raw_delete(model.objects.filter(pk__in=pks))
+        if pause:
+            time.sleep(pause)
+
+
+def purge_post(post_id, batch_size=PURGE_BATCH_SIZE):
+    """ Remove a soft-deleted post and everything that references it. """
+    delete_files(PostMedia.objects.filter(post_id=post_id).values_list("pk", flat=True))
+    steps = [
+        CommentLike.objects.filter(comment__post_id=post_id),
+        CommentReport.objects.filter(comment__post_id=post_id),
+        Comment.objects.filter(post_id=post_id),
+        PostLike.objects.filter(post_id=post_id),
+        PostReport.objects.filter(post_id=post_id),
+        Notification.objects.filter(post_id=post_id),
+        PostMedia.objects.filter(post_id=post_id),
+        Post.objects.filter(pk=post_id, is_deleted=True),
+    ]
+    return sum(delete_in_batches(qs, batch_size) for qs in steps)
+
+
+def purge_deleted_posts(limit=100, batch_size=PURGE_BATCH_SIZE):
+    """ Purge up to `limit` soft-deleted posts, oldest deletion first. """
+    post_ids = list(
+        Post.objects.filter(is_deleted=True)
+        .order_by("deleted_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+    for post_id in post_ids:
+        purge_post(post_id, batch_size)
+    return len(post_ids)
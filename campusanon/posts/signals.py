@@ -1,59 +1,49 @@
+import logging
+
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import PostReport, CommentReport, PostLike, Comment, Notification # ✅ Import Notification
-from django.core.cache import cache
-# We match the thresholds from your views.py
-REPORT_THRESHOLD = 3
-COMMENT_REPORT_THRESHOLD = 3
+from django.db import transaction
+from .models import Post, PostReport, CommentReport, PostLike, Comment, FilterTerm
+from campusanon import stamps
+from .moderation import REPORT_THRESHOLD, COMMENT_REPORT_THRESHOLD, release_report
+from .content_filter import content_filter
+from .tasks import notify_post_owner
+
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_delete, sender=PostReport)
 def check_post_reports_on_delete(sender, instance, **kwargs):
-    post = instance.post
-    # Count remaining reports
-    count = post.reports.count()
-    
-    # If it was hidden but now has fewer reports than threshold, unhide it
-    if post.is_hidden and count < REPORT_THRESHOLD:
-        post.is_hidden = False
-        post.save()
-        print(f"✅ Auto-unhidden Post {post.alias} (Reports dropped to {count})")
+    # Decrement the stored counter (no COUNT / save per removed report)
+    # and unhide if it dropped below the threshold
+    if release_report(Post, instance.post_id, REPORT_THRESHOLD):
+        post = Post.objects.only("community_id").get(pk=instance.post_id)
+        stamps.bump(stamps.feed(post.community_id), stamps.post(post.pk))
+        logger.info("Auto-unhidden post %s (reports dropped below %s)", instance.post_id, REPORT_THRESHOLD)
 
 @receiver(post_delete, sender=CommentReport)
 def check_comment_reports_on_delete(sender, instance, **kwargs):
-    comment = instance.comment
-    count = comment.reports.count()
-    
-    if comment.is_hidden and count < COMMENT_REPORT_THRESHOLD:
-        comment.is_hidden = False
-        comment.save()
-        print(f"✅ Auto-unhidden Comment {comment.alias} (Reports dropped to {count})")
+    if release_report(Comment, instance.comment_id, COMMENT_REPORT_THRESHOLD):
+        comment = Comment.objects.only("post_id").get(pk=instance.comment_id)
+        stamps.bump(stamps.post(comment.post_id))
+        logger.info("Auto-unhidden comment %s (reports dropped below %s)", instance.comment_id, COMMENT_REPORT_THRESHOLD)
+
+
 
+@receiver(post_save, sender=FilterTerm)
+@receiver(post_delete, sender=FilterTerm)
+def rebuild_content_filter(sender, instance, **kwargs):
+    # Wait for the commit so other workers don't rebuild from the old terms.
+    transaction.on_commit(content_filter.notify_changed)
 
 
 @receiver(post_save, sender=PostLike)
 def notify_on_like(sender, instance, created, **kwargs):
+    # Looked up and written by the task worker, off the request path
     if created:
-        post = instance.post
-        # Don't notify if I like my own post
-        if instance.user != post.user:
-            Notification.objects.create(
-                recipient=post.user,
-                actor=instance.user,
-                verb='like',
-                post=post
-            )
-            cache.set(f"has_notif_{post.user.id}", True, timeout=86400)
+        notify_post_owner.delay(instance.post_id, instance.user_id, "like")
 
 @receiver(post_save, sender=Comment)
 def notify_on_comment(sender, instance, created, **kwargs):
     if created:
-        post = instance.post
-        # Don't notify if I comment on my own post
-        if instance.user != post.user:
-             Notification.objects.create(
-                recipient=post.user,
-                actor=instance.user,
-                verb='comment',
-                post=post
-            )
-             cache.set(f"has_notif_{post.user.id}", True, timeout=86400)
\ No newline at end of file
+        notify_post_owner.delay(instance.post_id, instance.user_id, "comment")
@@ -0,0 +1,69 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from campusanon.scheduler import periodic
+from campusanon.tasks import task
+from . import audit
+from .models import Post, Comment, Notification, RateLimit
+from .moderation import refresh_report_velocity
+from .partitions import check_partitioning, detach_old_partitions, ensure_partitions, is_partitioned
+from .purge import delete_in_batches
+
+# Longest window any caller passes to utils.is_rate_limited is an hour
+RATE_LIMIT_KEEP = timedelta(days=1)
+
+
+@task
+def notify_post_owner(post_id, actor_id, verb):
+    """ Tell a post's author about a like / comment (not their own). """
+    owner_id = Post.objects.filter(pk=post_id).values_list("user_id", flat=True).first()
+    if owner_id is None or str(owner_id) == str(actor_id):
+        return
+    Notification.objects.create(recipient_id=owner_id, actor_id=actor_id, verb=verb, post_id=post_id)
+    cache.set(f"has_notif_{owner_id}", True, timeout=86400)
+
+
+# ---------------------------------------------------------
+# ⏰ Maintenance (campusanon/scheduler.py, UTC)
+# ---------------------------------------------------------
+@periodic("17 * * * *")
+def prune_rate_limits():
+    """ RateLimit rows only matter inside their window. """
+    return delete_in_batches(RateLimit.objects.filter(created_at__lt=timezone.now() - RATE_LIMIT_KEEP))
+
+
+@periodic("40 3 * * *")
+def maintain_notifications():
+    """
+    Drop notifications older than NOTIFICATION_RETENTION_DAYS. A partitioned
+    table also gets its upcoming months created, and loses whole expired
+    months (archived, see manage_partitions) instead of row deletes.
+    """
+    check_partitioning()
+    days = settings.NOTIFICATION_RETENTION_DAYS
+    table = Notification._meta.db_table
+    if is_partitioned(table):
+        today = timezone.now().date()
+        ensure_partitions(table, today)
+        if days:
+            detach_old_partitions(table, today, retain_months=math.ceil(days / 30))
+        return
+    if days:
+        cutoff = timezone.now() - timedelta(days=days)
+        delete_in_batches(Notification.objects.filter(created_at__lt=cutoff))
+
+
+@periodic("*/10 * * * *")
+def refresh_report_velocities():
+    """ Stored report velocities only change on a report: let them decay. """
+    return refresh_report_velocity(Post) + refresh_report_velocity(Comment)
+
+
+@periodic("* * * * *")
+def flush_audit_log():
+    """ Safety net for audit rows buffered by a worker that died before flushing. """
+    audit.flush_pending()
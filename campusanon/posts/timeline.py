@@ -0,0 +1,170 @@
+"""
+Home timeline: every community a user may read, merged into one
+reverse-chronological stream (fan-out on read).
+
+Each community keeps a cached list of its newest visible post ids as
+(created_at in microseconds, id) pairs, newest first. The list is keyed by the
+community's feed stamp, so anything that bumps the stamp (new post, hide,
+delete...) simply makes the next reader rebuild it. Likes don't: counts are
+read with the page.
+
+A page is a k-way heap merge of those lists after the cursor, cut at the page
+size. Communities whose lists are not cached are rebuilt together in one
+query (ROW_NUMBER() per community), and communities whose cached list runs
+out before the cursor are read together in one keyset query, so a page
+costs one cache round trip, one query for the posts themselves and at most
+one rebuild and one fallback query, however many communities the user
+follows.
+"""
+import heapq
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.core.cache import cache
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from communities.utils import joined_community_ids
+from communities.registry import community_registry
+from campusanon import stamps
+
+from .models import Post
+
+CACHED_IDS = 200          # newest post ids cached per community
+IDS_CACHE_SECONDS = 600
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def visible_communities(user):
+    """ Same rules as the community feed: global, own class, joined (staff: all). """
+    communities = community_registry.all()
+    if user.is_staff or user.is_superuser:
+        return communities
+
+    joined = joined_community_ids(user.id)
+    return [
+        c for c in communities
+        if c.is_global
+        or c.id in joined
+        or (
+            (c.year is None or c.year == user.year)
+            and (c.branch is None or c.branch == user.branch)
+        )
+    ]
+
+
+# ---------------------------------------------------------
+# Keys and cursors
+# ---------------------------------------------------------
+def to_micros(dt):
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros):
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def encode_cursor(entry):
+    micros, post_id = entry
+    return f"{micros}_{post_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        micros, post_id = cursor.split("_", 1)
+        return int(micros), str(uuid.UUID(post_id))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _ids_key(community_id, stamp):
+    return f"timeline_ids_{community_id}_{stamp}"
+
+
+def _entries(rows):
+    return [(to_micros(created_at), str(post_id)) for created_at, post_id in rows]
+
+
+def _newest_first(queryset):
+    return queryset.order_by("-created_at", "-id").values_list("created_at", "id")
+
+
+def _after(queryset, cursor):
+    """ Rows strictly after the cursor in (-created_at, -id) order. """
+    micros, post_id = cursor
+    created_at = from_micros(micros)
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=post_id))
+
+
+# ---------------------------------------------------------
+# Per-community id lists
+# ---------------------------------------------------------
+def community_id_lists(community_ids, feed_stamps):
+    """ {community_id: [(micros, post_id), ...] newest first}, cached per feed stamp. """
+    keys = {cid: _ids_key(cid, feed_stamps[stamps.feed(cid)]) for cid in community_ids}
+    found = cache.get_many(list(keys.values()))
+
+    lists, missing = {}, {}
+    for cid, key in keys.items():
+        if key in found:
+            lists[cid] = found[key]
+        else:
+            missing[key] = cid
+
+    if not missing:
+        return lists
+
+    # One query for every missed community: the newest CACHED_IDS of each
+    rows = (
+        Post.objects.filter(community_id__in=missing.values(), is_hidden=False)
+        .annotate(rank=Window(
+            RowNumber(), partition_by=F("community_id"), order_by=[F("created_at").desc(), F("id").desc()],
+        ))
+        .filter(rank__lte=CACHED_IDS)
+        .order_by("community_id", "-created_at", "-id")
+        .values_list("community_id", "created_at", "id")
+    )
+    by_community = {cid: [] for cid in missing.values()}
+    for cid, created_at, post_id in rows:
+        by_community[cid].append((created_at, post_id))
+
+    built = {}
+    for key, cid in missing.items():
+        lists[cid] = built[key] = _entries(by_community[cid])
+    cache.set_many(built, timeout=IDS_CACHE_SECONDS)
+    return lists
+
+
+def _first_after(entries, cursor):
+    """ Index of the first entry strictly after the cursor (entries are newest first). """
+    lo, hi = 0, len(entries)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if tuple(entries[mid]) < cursor:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def merge_page(id_lists, cursor, page_size):
+    """ The next page_size (micros, post_id) entries across all communities. """
+    streams, exhausted = [], []
+    for cid, entries in id_lists.items():
+        start = _first_after(entries, cursor) if cursor else 0
+        # A full list may be truncated: past its end the cache can't tell
+        # whether older posts exist, so the database answers for it.
+        if len(entries) >= CACHED_IDS and len(entries) - start < page_size:
+            exhausted.append(cid)
+            continue
+        streams.append(islice(entries, start, None))
+
+    if exhausted:
+        fallback = Post.objects.filter(community_id__in=exhausted, is_hidden=False)
+        if cursor:
+            fallback = _after(fallback, cursor)
+        streams.append(iter(_entries(_newest_first(fallback)[:page_size])))
+
+    return list(islice(heapq.merge(*streams, key=tuple, reverse=True), page_size))
@@ -1,7 +1,10 @@
 from django.urls import path
+from .models import Post, Comment
 from .views import (
     CreatePostView,
+    UploadMediaView,
     CommunityFeedView,
+    HomeTimelineView,
     DeletePostView,
     CreateCommentView,
     GetPostView,
@@ -14,6 +17,10 @@ from .views import (
     AdminUnhidePostView,
     AdminUnhideCommentView,
     AdminAuditLogView,
+    AdminModerationQueueView,
+    AdminDuplicateClustersView,
+    AdminBanAndPurgeView,
+    AdminBulkVisibilityView,
     SearchPostsView,
     NotificationListView,
     MarkNotificationReadView,
@@ -24,7 +31,9 @@ from .views import (
 urlpatterns = [
     # Posts
     path("create/", CreatePostView.as_view(), name="create-post"),
+    path("media/upload/", UploadMediaView.as_view(), name="upload-media"),
     path("feed/<uuid:community_id>/", CommunityFeedView.as_view(), name="community-feed"),
+    path("home/", HomeTimelineView.as_view(), name="home-timeline"),
     path("delete/<uuid:post_id>/", DeletePostView.as_view(), name="delete-post"),
     path("get/<uuid:post_id>/", GetPostView.as_view(), name="get-single-post"),
 
@@ -42,7 +51,14 @@ urlpatterns = [
     path("admin/user/unban/<uuid:user_id>/", AdminUnbanUserView.as_view(), name="admin-unban-user"),
     path("admin/post/unhide/<uuid:post_id>/", AdminUnhidePostView.as_view(), name="admin-unhide-post"),
     path("admin/comment/unhide/<uuid:comment_id>/", AdminUnhideCommentView.as_view(), name="admin-unhide-comment"),
+    path("admin/user/ban-purge/<uuid:user_id>/", AdminBanAndPurgeView.as_view(), name="admin-ban-purge-user"),
+    path("admin/post/bulk-hide/", AdminBulkVisibilityView.as_view(model=Post, hidden=True), name="admin-bulk-hide-posts"),
+    path("admin/post/bulk-unhide/", AdminBulkVisibilityView.as_view(model=Post, hidden=False), name="admin-bulk-unhide-posts"),
+    path("admin/comment/bulk-hide/", AdminBulkVisibilityView.as_view(model=Comment, hidden=True), name="admin-bulk-hide-comments"),
+    path("admin/comment/bulk-unhide/", AdminBulkVisibilityView.as_view(model=Comment, hidden=False), name="admin-bulk-unhide-comments"),
     path("admin/audit-logs/", AdminAuditLogView.as_view(), name="admin-audit-logs"),
+    path("admin/moderation/queue/", AdminModerationQueueView.as_view(), name="admin-moderation-queue"),
+    path("admin/duplicates/", AdminDuplicateClustersView.as_view(), name="admin-duplicate-clusters"),
 
     # Search
     path("search/", SearchPostsView.as_view(), name="search-posts"),
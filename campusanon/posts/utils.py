@@ -3,7 +3,7 @@ from datetime import timedelta
 from django.utils import timezone
 from .models import RateLimit
 from campusanon.redis import redis_client
-from .models import AdminAuditLog
+from . import audit
 
 
 def is_rate_limited(user, action, limit, window_seconds):
@@ -23,32 +23,27 @@ def is_rate_limited(user, action, limit, window_seconds):
 
 def is_rate_limited_redis(user_id, action, limit, window_seconds):
     """
-    Redis-based fixed window rate limiter
+    Redis-based fixed window rate limiter.
+    One round trip: count this action, then start the window if it has no
+    expiry yet. If the key expires between the two, INCR recreates it and
+    EXPIRE NX gives it a fresh window, so a key can never outlive its window.
     """
     key = f"rate:{action}:{user_id}"
 
-    current = redis_client.get(key)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(key)
+    pipe.expire(key, window_seconds, nx=True)
+    count, _ = pipe.execute()
 
-    if current is None:
-        # First action in window
-        redis_client.setex(key, window_seconds, 1)
-        return False
-
-    if int(current) >= limit:
-        return True
-
-    redis_client.incr(key)
-    return False
+    return count > limit
 
 
 def log_admin_action(admin, action, target_id, target_type, reason=""):
-    AdminAuditLog.objects.create(
-        admin=admin,
-        action=action,
-        target_id=target_id,
-        target_type=target_type,
-        reason=reason
-    )
+    """
+    Record an admin action. The row is buffered in Redis and bulk-inserted
+    off the request path (see posts/audit.py).
+    """
+    audit.enqueue([(admin.id, action, target_id, target_type, reason)])
 
 
 ADJECTIVES = [
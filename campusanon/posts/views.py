@@ -1,4 +1,9 @@
+import logging
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
 from rest_framework.views import APIView
+from campusanon.db_router import ReplicaReadMixin
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,10 +11,12 @@ from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from django.db.models import Count, Exists, OuterRef
 from rest_framework.exceptions import PermissionDenied
-from django.shortcuts import get_object_or_404
-from communities.models import Community, CommunityMembership # Check your paths
+from django.http import Http404
+from communities.utils import joined_community_ids
+from communities.registry import community_registry
 from django.db.models import Q
 from django.core.cache import cache
+from django.conf import settings
 
 from accounts.models import User
 from .models import (
@@ -27,12 +34,34 @@ from .utils import (
     log_admin_action  # ✅ Imported Helper
 )
 from .permissions import IsAdminUser
+from . import audit
+from .moderation import (
+    REPORT_THRESHOLD,
+    COMMENT_REPORT_THRESHOLD,
+    record_report,
+    in_moderation_queue,
+    encode_queue_cursor,
+    apply_queue_cursor,
+    bulk_set_hidden,
+    ban_and_purge,
+    write_time_hidden_reason,
+)
+from . import duplicates, feeds, media, timeline
+from .content_filter import content_filter
+from campusanon import stamps
+from campusanon.conditional import (
+    make_etag,
+    is_not_modified,
+    not_modified_response,
+    with_validators,
+)
 
-REPORT_THRESHOLD = 3
-COMMENT_REPORT_THRESHOLD = 3
 PAGE_SIZE = 20
 COMMENT_PAGE_SIZE = 20
 
+logger = logging.getLogger(__name__)
+admin_check_logger = logging.getLogger("posts.admin_check")
+
 
 # -------------------------------
 # CREATE POST
@@ -56,13 +85,14 @@ class CreatePostView(APIView):
             str(request.user.id) == MY_ADMIN_ID
         )
 
-        # 🔍 DEBUG: Prove it works in the terminal
-        print(f"\n---- ADMIN CHECK ----")
-        print(f"User ID:    {request.user.id}")
-        print(f"Is Super?   {request.user.is_superuser}")
-        print(f"Is Staff?   {request.user.is_staff}")
-        print(f"GOD MODE:   {is_god_mode}")
-        print(f"---------------------\n")
+        # 🔍 Sampled and written off the request thread (settings.LOGGING)
+        admin_check_logger.info("admin check", extra={
+            "action": "create_post",
+            "user_id": request.user.id,
+            "is_superuser": request.user.is_superuser,
+            "is_staff": request.user.is_staff,
+            "god_mode": is_god_mode,
+        })
 
         # 1. RATE LIMIT (Bypass for God Mode)
         if not is_god_mode:
@@ -77,25 +107,52 @@ class CreatePostView(APIView):
         if not community_id or not content:
             return Response({"error": "Data required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            community = Community.objects.get(id=community_id)
-        except Community.DoesNotExist:
+        community = community_registry.get(community_id)
+        if community is None:
             return Response({"error": "Community not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        # 🧹 Banned terms (posts/content_filter.py): block, or publish hidden / flagged
+        filter_action, filter_matches = content_filter.check(content)
+        if filter_action == "block":
+            logger.info("Post blocked by content filter", extra={"user_id": request.user.id, "terms": filter_matches})
+            return Response({"error": "Post contains words that aren't allowed"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 🪞 The same text pasted across communities / accounts (posts/duplicates.py)
+        duplicate_action, fingerprint = (None, None) if is_god_mode else duplicates.check(content)
+        if duplicate_action == "block":
+            return Response({"error": "Too many copies of this post."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # 🖼️ Images uploaded beforehand through posts/media/upload/
+        try:
+            media_ids = media.parse_media_ids(request.data.get("media_ids"))
+            if media_ids:
+                media.check_attachable(request.user, media_ids)
+        except media.UploadRejected as e:
+            return Response({"error": str(e)}, status=e.status)
+
         # 2. ALIAS (loyaldude for God Mode)
         if is_god_mode:
             post_alias = "loyaldude"
-            print("✅ Assigning loyaldude (Admin Bypass)")
+            admin_check_logger.info("assigning admin alias", extra={"user_id": request.user.id})
         else:
             post_alias = generate_alias()
 
+        hidden_reason = write_time_hidden_reason(filter_action, duplicate_action)
         post = Post.objects.create(
             user=request.user,
             community=community,
             content=content,
             alias=post_alias,
             post_type=post_type, 
+            is_hidden=bool(hidden_reason),
+            hidden_reason=hidden_reason,
+            is_flagged=bool(filter_matches),
+            filter_matches=filter_matches,
         )
+        if media_ids:
+            media.attach(post, media_ids)
+        duplicates.record("post", post.id, fingerprint)
+        stamps.bump(stamps.feed(community.id))
 
         return Response({
             "id": str(post.id),
@@ -103,6 +160,9 @@ class CreatePostView(APIView):
             "content": post.content,
             "post_type": post.post_type,
             "created_at": post.created_at,
+            "media": media.attachment_payload(post.attachments),
+            "media_pending": len(media_ids) - len(post.attachments),
+            "is_hidden": post.is_hidden,  # held for review by the content filter
             "is_mine": True,            # 👈 ADD THIS LINE
             "is_liked": False,          # 👈 Good to have default
             "likes_count": 0,           # 👈 Good to have default
@@ -110,17 +170,54 @@ class CreatePostView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+# -------------------------------
+# UPLOAD IMAGE (attach it with CreatePostView's media_ids)
+# -------------------------------
+class UploadMediaView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = []  # the body is streamed to storage by posts/media.py, never parsed
+
+    def post(self, request):
+        if request.user.is_banned:
+            return Response({"error": "User is banned"}, status=status.HTTP_403_FORBIDDEN)
+
+        # Refuse oversized uploads before reading a byte of them
+        try:
+            declared = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            declared = 0
+        if declared > settings.MEDIA_MAX_UPLOAD_BYTES:
+            return Response({"error": "Image too large"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        if not (request.user.is_staff or request.user.is_superuser):
+            if is_rate_limited_redis(request.user.id, action="upload_media", limit=20, window_seconds=3600):
+                return Response({"error": "Too many uploads."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        try:
+            upload = media.receive_upload(request.stream, request.user)
+        except media.UploadRejected as e:
+            return Response({"error": str(e)}, status=e.status)
+
+        return Response({
+            "id": str(upload.id),
+            "status": upload.status,
+            "size": upload.size,
+        }, status=status.HTTP_201_CREATED)
+
+
 # -------------------------------
 # COMMUNITY FEED
 # -------------------------------
-class CommunityFeedView(APIView):
+class CommunityFeedView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, community_id):
         user = request.user
 
-        # 1. Get Community (or 404)
-        community = get_object_or_404(Community, id=community_id)
+        # 1. Get Community (or 404) from the in-memory registry
+        community = community_registry.get(community_id)
+        if community is None:
+            raise Http404("No Community matches the given query.")
 
         # ---------------------------------------------------------
         # 🔒 SECURITY CHECK (The "Bouncer")
@@ -147,7 +244,7 @@ class CommunityFeedView(APIView):
             has_access = True
             
         # Rule 4: Allow if User is explicitly a member (e.g. joined a club manually)
-        elif CommunityMembership.objects.filter(user=user, community=community).exists():
+        elif community.id in joined_community_ids(user.id):
             has_access = True
 
         # 🚨 FINAL VERDICT
@@ -163,66 +260,106 @@ class CommunityFeedView(APIView):
         
         cursor = request.query_params.get("cursor")
 
-        # Subquery: Did THIS user like the post?
-        is_liked_by_user = PostLike.objects.filter(
-            post=OuterRef('pk'),
-            user=user
-        )
-
-        # Subquery: Did THIS user report the post?
-        is_reported_by_user = PostReport.objects.filter(
-            post=OuterRef('pk'),
-            reporter=user
-        )
-
-        # Main Query with Annotation
+        # 🏷️ Optional post_type filter (confession, question, ...)
+        try:
+            post_type = feeds.parse_post_type(request.query_params.get("post_type"))
+        except ValueError:
+            return Response({"error": "Invalid post_type"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # ⚡ CONDITIONAL GET: nothing in this feed changed since the client's copy?
+        tokens = stamps.get_many([stamps.feed(community.id), stamps.likes(community.id)])
+        feed_stamp = tokens[stamps.feed(community.id)]
+        etag = make_etag("feed", community.id, user.id, post_type, cursor, feed_stamp, tokens[stamps.likes(community.id)])
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        # Main Query (post_type_feed_idx / post_feed_idx range scan)
         posts = Post.objects.filter(
             community=community,  # Filter by the secure community object
             is_hidden=False
-        ).annotate(
-            # Count likes directly in DB
-            total_likes=Count('likes'),
-            # Boolean checks
-            is_liked=Exists(is_liked_by_user),
-            is_reported=Exists(is_reported_by_user)
         )
+        if post_type:
+            posts = posts.filter(post_type=post_type)
 
         # Cursor Pagination Logic
-        if cursor:
-            cursor_dt = parse_datetime(cursor)
-            if cursor_dt:
-                posts = posts.filter(created_at__lt=cursor_dt)
+        cursor_dt = parse_datetime(cursor) if cursor else None
+        if cursor_dt:
+            rows = feeds.page_rows(posts.filter(created_at__lt=cursor_dt), PAGE_SIZE)
+        else:
+            # First page: shared by every reader until the feed stamp moves
+            rows = feeds.first_page_rows(posts, PAGE_SIZE, community.id, post_type, feed_stamp)
 
-        # Order & Slice
-        posts = list(
-            posts.order_by("-created_at")[:PAGE_SIZE]
-        )
+        # Serialize Data (+ this user's liked / reported flags)
+        data = feeds.for_viewer(rows, user)
 
-        # Serialize Data
-        data = [
-            {
+        # Calculate Next Cursor
+        next_cursor = None
+        if rows:
+            next_cursor = rows[-1]["created_at"].isoformat()
+
+        return with_validators(Response({
+            "results": data,
+            "next_cursor": next_cursor
+        }), etag)
+
+# -------------------------------
+# HOME TIMELINE (all readable communities, merged)
+# -------------------------------
+class HomeTimelineView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+
+        communities = {c.id: c for c in timeline.visible_communities(user)}
+        cursor = request.query_params.get("cursor")
+
+        # ⚡ CONDITIONAL GET: feed and likes stamps per community
+        feed_stamps = stamps.get_many([name for cid in communities for name in (stamps.feed(cid), stamps.likes(cid))])
+        etag = make_etag("home", user.id, cursor, *sorted(feed_stamps.items()))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        # 1. Merge the cached per-community id lists (bounded by PAGE_SIZE)
+        id_lists = timeline.community_id_lists(communities, feed_stamps)
+        page = timeline.merge_page(id_lists, timeline.decode_cursor(cursor), PAGE_SIZE)
+
+        # 2. Load just those posts
+        posts = Post.objects.filter(
+            id__in=[post_id for _, post_id in page],
+            is_hidden=False
+        ).annotate(
+            total_likes=Count('likes'),
+            is_liked=Exists(PostLike.objects.filter(post=OuterRef('pk'), user=user)),
+            is_reported=Exists(PostReport.objects.filter(post=OuterRef('pk'), reporter=user))
+        ).in_bulk()
+
+        data = []
+        for _, post_id in page:
+            p = posts.get(uuid.UUID(post_id))
+            if p is None:
+                continue  # hidden since the id list was cached
+            community = communities[p.community_id]
+            data.append({
                 "id": str(p.id),
                 "alias": p.alias,
                 "content": p.content,
                 "post_type": p.post_type,
                 "created_at": p.created_at,
+                "media": media.attachment_payload(p.attachments),
                 "likes_count": p.total_likes,
                 "is_liked": p.is_liked,
                 "is_mine": p.user_id == user.id,
-                "is_reported": p.is_reported
-            }
-            for p in posts
-        ]
+                "is_reported": p.is_reported,
+                "community": {"id": str(community.id), "name": community.name},
+            })
 
-        # Calculate Next Cursor
-        next_cursor = None
-        if posts:
-            next_cursor = posts[-1].created_at.isoformat()
+        next_cursor = timeline.encode_cursor(page[-1]) if len(page) == PAGE_SIZE else None
 
-        return Response({
+        return with_validators(Response({
             "results": data,
             "next_cursor": next_cursor
-        })
+        }), etag)
 
 # -------------------------------
 # DELETE OWN POST
@@ -232,20 +369,27 @@ class DeletePostView(APIView):
 
     def delete(self, request, post_id):
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.get(id=post_id, is_deleted=False)
         except Post.DoesNotExist:
             return Response(
                 {"error": "Post not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if post.user != request.user:
+        if post.user_id != request.user.id:
             return Response(
                 {"error": "Not allowed to delete this post"},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        post.delete()
+        # 🗑️ Soft delete: hide now, posts/purge.py removes the rows later
+        Post.objects.filter(pk=post.pk).update(
+            is_deleted=True,
+            is_hidden=True,
+            hidden_reason="deleted",
+            deleted_at=timezone.now()
+        )
+        stamps.bump(stamps.feed(post.community_id), stamps.post(post.id))
 
         return Response(
             {"message": "Post deleted successfully"},
@@ -275,13 +419,14 @@ class CreateCommentView(APIView):
             str(request.user.id) == MY_ADMIN_ID
         )
 
-        # 🔍 DEBUG: Prove it works in the terminal
-        print(f"\n---- ADMIN CHECK (Comment) ----")
-        print(f"User ID:    {request.user.id}")
-        print(f"Is Super?   {request.user.is_superuser}")
-        print(f"Is Staff?   {request.user.is_staff}")
-        print(f"GOD MODE:   {is_god_mode}")
-        print(f"--------------------------------\n")
+        # 🔍 Sampled and written off the request thread (settings.LOGGING)
+        admin_check_logger.info("admin check", extra={
+            "action": "create_comment",
+            "user_id": request.user.id,
+            "is_superuser": request.user.is_superuser,
+            "is_staff": request.user.is_staff,
+            "god_mode": is_god_mode,
+        })
 
         # 1. RATE LIMIT (Bypass for God Mode)
         if not is_god_mode:
@@ -292,30 +437,49 @@ class CreateCommentView(APIView):
         if not content:
             return Response({"error": "content required"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # 🧹 Banned terms (posts/content_filter.py)
+        filter_action, filter_matches = content_filter.check(content)
+        if filter_action == "block":
+            logger.info("Comment blocked by content filter", extra={"user_id": request.user.id, "terms": filter_matches})
+            return Response({"error": "Comment contains words that aren't allowed"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 🪞 The same text pasted under many posts (posts/duplicates.py)
+        duplicate_action, fingerprint = (None, None) if is_god_mode else duplicates.check(content)
+        if duplicate_action == "block":
+            return Response({"error": "Too many copies of this comment."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.get(id=post_id, is_deleted=False)
         except Post.DoesNotExist:
             return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # 2. ALIAS (loyaldude for God Mode)
         if is_god_mode:
             comment_alias = "loyaldude"
-            print("✅ Assigning loyaldude (Admin Bypass)")
+            admin_check_logger.info("assigning admin alias", extra={"user_id": request.user.id})
         else:
             comment_alias = generate_alias()
 
+        hidden_reason = write_time_hidden_reason(filter_action, duplicate_action)
         comment = Comment.objects.create(
             post=post,
             user=request.user,
             content=content,
             alias=comment_alias,
+            is_hidden=bool(hidden_reason),
+            hidden_reason=hidden_reason,
+            is_flagged=bool(filter_matches),
+            filter_matches=filter_matches,
         )
+        duplicates.record("comment", comment.id, fingerprint)
+        stamps.bump(stamps.post(post.id))
 
         return Response({
             "id": str(comment.id),
             "alias": comment.alias,
             "content": comment.content,
             "created_at": comment.created_at,
+            "is_hidden": comment.is_hidden,  # held for review by the content filter
             "is_mine": True,            # 👈 ADD THIS LINE
             "is_reported": False        # 👈 Good to have default
         }, status=status.HTTP_201_CREATED)
@@ -324,12 +488,12 @@ class CreateCommentView(APIView):
 # -------------------------------
 # LIST COMMENTS FOR A POST
 # -------------------------------
-class PostCommentsView(APIView):
+class PostCommentsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, post_id):
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.get(id=post_id, is_deleted=False)
         except Post.DoesNotExist:
             return Response(
                 {"error": "Post not found"},
@@ -404,7 +568,7 @@ class ToggleLikeView(APIView):
             )
 
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.get(id=post_id, is_deleted=False)
         except Post.DoesNotExist:
             return Response(
                 {"error": "Post not found"},
@@ -415,6 +579,8 @@ class ToggleLikeView(APIView):
             user=request.user,
             post=post
         )
+        # likes_count / is_liked changed; the posts in the feed did not
+        stamps.bump(stamps.likes(post.community_id), stamps.post(post.id))
 
         if not created:
             like.delete()
@@ -428,10 +594,16 @@ class ToggleLikeView(APIView):
             "likes_count": post.likes.count()
         })
 
-class GetPostView(APIView):
+class GetPostView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, post_id):
+        # ⚡ CONDITIONAL GET (decided before touching the database)
+        post_stamp = stamps.get(stamps.post(post_id))
+        etag = make_etag("post", post_id, request.user.id, post_stamp)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
         # Subquery to check if user liked this specific post
         is_liked_by_user = PostLike.objects.filter(
             post=OuterRef('pk'),
@@ -446,7 +618,7 @@ class GetPostView(APIView):
 
         try:
             # We use filter() + first() instead of get() to allow annotation
-            post = Post.objects.filter(id=post_id).annotate(
+            post = Post.objects.filter(id=post_id, is_deleted=False).select_related("community").annotate(
                 total_likes=Count('likes'),
                 is_liked=Exists(is_liked_by_user),
                 is_reported=Exists(is_reported_by_user)
@@ -455,22 +627,23 @@ class GetPostView(APIView):
             if not post:
                 return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            return Response({
+            return with_validators(Response({
             "id": str(post.id),
             "alias": post.alias,
             "content": post.content,
             "post_type": post.post_type,
             "created_at": post.created_at,
+            "media": media.attachment_payload(post.attachments),
             "likes_count": post.total_likes,
             "is_liked": post.is_liked,
             "community_id": str(post.community.id),
             "community_name": post.community.name,
             "is_mine": post.user_id == request.user.id,
             "is_reported": post.is_reported
-        })
+        }), etag)
 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error fetching post %s", post_id)
             return Response({"error": "Error fetching post"}, status=500)
 
 
@@ -499,7 +672,7 @@ class ReportPostView(APIView):
         reason = request.data.get("reason", "unspecified")
 
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.get(id=post_id, is_deleted=False)
         except Post.DoesNotExist:
             return Response(
                 {"error": "Post not found"},
@@ -524,14 +697,14 @@ class ReportPostView(APIView):
                 status=status.HTTP_200_OK
             )
 
-        if post.reports.count() >= REPORT_THRESHOLD:
-            post.is_hidden = True
-            post.save()
+        # ⚡ Atomic counter bump (hides at REPORT_THRESHOLD)
+        reports_count, hidden = record_report(post, REPORT_THRESHOLD)
+        stamps.bump(stamps.feed(post.community_id), stamps.post(post.id))
 
         return Response({
             "message": "Reported successfully",
-            "reports_count": post.reports.count(),
-            "hidden": post.is_hidden
+            "reports_count": reports_count,
+            "hidden": hidden
         })
 
 
@@ -585,14 +758,14 @@ class ReportCommentView(APIView):
                 status=status.HTTP_200_OK
             )
 
-        if comment.reports.count() >= COMMENT_REPORT_THRESHOLD:
-            comment.is_hidden = True
-            comment.save()
+        # ⚡ Atomic counter bump (hides at COMMENT_REPORT_THRESHOLD)
+        reports_count, hidden = record_report(comment, COMMENT_REPORT_THRESHOLD)
+        stamps.bump(stamps.post(comment.post_id))
 
         return Response({
             "message": "Reported successfully",
-            "reports_count": comment.reports.count(),
-            "hidden": comment.is_hidden
+            "reports_count": reports_count,
+            "hidden": hidden
         })
 
 
@@ -601,7 +774,7 @@ class AdminUnhidePostView(APIView):
 
     def post(self, request, post_id):
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.get(id=post_id, is_deleted=False)
         except Post.DoesNotExist:
             return Response(
                 {"error": "Post not found"},
@@ -609,7 +782,9 @@ class AdminUnhidePostView(APIView):
             )
 
         post.is_hidden = False
-        post.save()
+        post.hidden_reason = ""
+        post.save(update_fields=["is_hidden", "hidden_reason"])
+        stamps.bump(stamps.feed(post.community_id), stamps.post(post.id))
 
         # ✅ LOGGING
         log_admin_action(
@@ -635,7 +810,9 @@ class AdminUnhideCommentView(APIView):
             )
 
         comment.is_hidden = False
-        comment.save()
+        comment.hidden_reason = ""
+        comment.save(update_fields=["is_hidden", "hidden_reason"])
+        stamps.bump(stamps.post(comment.post_id))
 
         # ✅ LOGGING
         log_admin_action(
@@ -701,27 +878,267 @@ class AdminUnbanUserView(APIView):
         return Response({"message": "User unbanned"})
 
 
+# -------------------------------
+# BULK MODERATION
+# -------------------------------
+BULK_MAX_IDS = 5000
+
+
+class AdminBanAndPurgeView(APIView):
+    """ Ban a user and hide all of their posts and comments """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, user_id):
+        try:
+            user = User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            return Response(
+                {"error": "User not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        post_ids, comment_ids = ban_and_purge(
+            admin=request.user,
+            user=user,
+            reason=request.data.get("reason", "")
+        )
+
+        return Response({
+            "message": "User banned and content hidden",
+            "posts_hidden": len(post_ids),
+            "comments_hidden": len(comment_ids)
+        })
+
+
+class AdminBulkVisibilityView(APIView):
+    """
+    Hide / unhide many posts or comments at once.
+    Body: {"ids": [...], "reason": "..."}
+    Configured per route: as_view(model=Post, hidden=True)
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    model = None
+    hidden = None
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > BULK_MAX_IDS:
+            return Response({"error": f"At most {BULK_MAX_IDS} ids per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ids = [uuid.UUID(str(i)) for i in ids]
+        except ValueError:
+            return Response({"error": "Invalid id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        changed = bulk_set_hidden(
+            admin=request.user,
+            model=self.model,
+            pks=ids,
+            hidden=self.hidden,
+            reason=request.data.get("reason", "")
+        )
+
+        return Response({
+            "message": f"{self.model.__name__}s {'hidden' if self.hidden else 'unhidden'}",
+            "updated": len(changed)
+        })
+
+
 # ✅ NEW: Read-only Audit Log API
+AUDIT_PAGE_SIZE = 100
+AUDIT_MAX_PAGE_SIZE = 500
+
+
 class AdminAuditLogView(APIView):
+    """
+    Filters: admin, action, target_type, target_id, since, until (ISO datetimes)
+    Pagination: ?cursor=<next_cursor>&limit=<n>
+    """
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        logs = AdminAuditLog.objects.all()[:100]
+        # Make sure buffered entries are visible before reading
+        try:
+            audit.flush_pending()
+        except Exception as e:
+            logger.warning("Audit flush failed: %s", e)
 
-        return Response([
-            {
-                "admin_id": str(log.admin_id),
-                "action": log.action,
-                "target_type": log.target_type,
-                "target_id": str(log.target_id),
-                "reason": log.reason,
-                "created_at": log.created_at,
+        params = request.query_params
+        logs = AdminAuditLog.objects.all()
+
+        try:
+            if params.get("admin"):
+                logs = logs.filter(admin_id=uuid.UUID(params["admin"]))
+            if params.get("target_id"):
+                logs = logs.filter(target_id=uuid.UUID(params["target_id"]))
+        except ValueError:
+            return Response({"error": "Invalid id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if params.get("action"):
+            logs = logs.filter(action=params["action"])
+        if params.get("target_type"):
+            logs = logs.filter(target_type=params["target_type"])
+
+        for name, lookup in (("since", "created_at__gte"), ("until", "created_at__lt")):
+            if params.get(name):
+                value = parse_datetime(params[name])
+                if value is None:
+                    return Response({"error": f"Invalid {name}"}, status=status.HTTP_400_BAD_REQUEST)
+                logs = logs.filter(**{lookup: value})
+
+        # Keyset cursor: "<created_at iso>_<id>"
+        cursor = params.get("cursor")
+        if cursor:
+            created_at, _, last_id = cursor.rpartition("_")
+            cursor_dt = parse_datetime(created_at)
+            if cursor_dt is None or not last_id.isdigit():
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+            logs = logs.filter(
+                Q(created_at__lt=cursor_dt) | Q(created_at=cursor_dt, id__lt=int(last_id))
+            )
+
+        try:
+            limit = min(max(int(params.get("limit", AUDIT_PAGE_SIZE)), 1), AUDIT_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = AUDIT_PAGE_SIZE
+
+        logs = list(logs.order_by("-created_at", "-id")[:limit])
+
+        next_cursor = None
+        if len(logs) == limit:
+            next_cursor = f"{logs[-1].created_at.isoformat()}_{logs[-1].id}"
+
+        return Response({
+            "results": [
+                {
+                    "id": log.id,
+                    "admin_id": str(log.admin_id),
+                    "action": log.action,
+                    "target_type": log.target_type,
+                    "target_id": str(log.target_id),
+                    "reason": log.reason,
+                    "created_at": log.created_at,
+                }
+                for log in logs
+            ],
+            "next_cursor": next_cursor
+        })
+
+
+MODERATION_PAGE_SIZE = 50
+
+
+class AdminModerationQueueView(APIView):
+    """ Reported / hidden / filter-flagged posts or comments, fastest-reported first """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        kind = request.query_params.get("type", "post")
+        cursor = request.query_params.get("cursor")
+
+        if kind == "post":
+            items = Post.objects.all()
+        elif kind == "comment":
+            items = Comment.objects.all()
+        else:
+            return Response(
+                {"error": "type must be 'post' or 'comment'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = in_moderation_queue(items)
+        if kind == "post":
+            items = items.filter(is_deleted=False)
+        if cursor:
+            items = apply_queue_cursor(items, cursor)
+
+        items = list(items.order_by("-report_velocity", "-id")[:MODERATION_PAGE_SIZE])
+
+        data = []
+        for item in items:
+            entry = {
+                "id": str(item.id),
+                "alias": item.alias,
+                "content": item.content,
+                "user_id": str(item.user_id),
+                "is_hidden": item.is_hidden,
+                "is_flagged": item.is_flagged,
+                "filter_matches": item.filter_matches,
+                "reports_count": item.reports_count,
+                "report_velocity": item.report_velocity,
+                "first_reported_at": item.first_reported_at,
+                "last_reported_at": item.last_reported_at,
+                "created_at": item.created_at,
             }
-            for log in logs
-        ])
-    
+            if kind == "post":
+                entry["community_id"] = str(item.community_id)
+                entry["post_type"] = item.post_type
+            else:
+                entry["post_id"] = str(item.post_id)
+            data.append(entry)
+
+        next_cursor = None
+        if len(items) == MODERATION_PAGE_SIZE:
+            next_cursor = encode_queue_cursor(items[-1])
+
+        return Response({
+            "results": data,
+            "next_cursor": next_cursor
+        })
 
-class SearchPostsView(APIView):
+
+DUPLICATE_CLUSTERS_LIMIT = 100
+
+
+class AdminDuplicateClustersView(APIView):
+    """ Near-duplicate clusters (raids), most recently active first """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), DUPLICATE_CLUSTERS_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        clusters = duplicates.recent_clusters(limit)
+
+        # One query per kind for every item of every cluster
+        ids = {"post": set(), "comment": set()}
+        for _, _, items in clusters:
+            for item, _ in items:
+                kind, item_id = item.split(":", 1)
+                ids[kind].add(item_id)
+        rows = {}
+        for post in Post.objects.filter(id__in=ids["post"]).only("id", "content", "user_id", "community_id", "is_hidden"):
+            rows[f"post:{post.id}"] = {"user_id": str(post.user_id), "community_id": str(post.community_id),
+                                       "content": post.content, "is_hidden": post.is_hidden}
+        for comment in Comment.objects.filter(id__in=ids["comment"]).only("id", "content", "user_id", "post_id", "is_hidden"):
+            rows[f"comment:{comment.id}"] = {"user_id": str(comment.user_id), "post_id": str(comment.post_id),
+                                             "content": comment.content, "is_hidden": comment.is_hidden}
+
+        def seen(timestamp):
+            return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+        data = []
+        for root, last_seen, items in clusters:
+            data.append({
+                "cluster": root,
+                "size": len(items),
+                "accounts": len({rows[item]["user_id"] for item, _ in items if item in rows}),
+                "last_seen": seen(last_seen),
+                # Deleted / purged items are listed without content
+                "items": [
+                    {"type": item.split(":", 1)[0], "id": item.split(":", 1)[1], "seen_at": seen(seen_at), **rows.get(item, {})}
+                    for item, seen_at in items
+                ],
+            })
+
+        return Response({"results": data})
+
+
+class SearchPostsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -735,6 +1152,11 @@ class SearchPostsView(APIView):
         query = request.query_params.get("q", "").strip()
         community_id = request.query_params.get("community_id")
 
+        try:
+            post_type = feeds.parse_post_type(request.query_params.get("post_type"))
+        except ValueError:
+            return Response({"error": "Invalid post_type"}, status=status.HTTP_400_BAD_REQUEST)
+
         if not query:
             return Response([], status=status.HTTP_200_OK)
 
@@ -759,6 +1181,9 @@ class SearchPostsView(APIView):
         if community_id:
             posts = posts.filter(community_id=community_id)
 
+        if post_type:
+            posts = posts.filter(post_type=post_type)
+
         # Add the "intelligence" (Counts + Flags)
         posts = posts.annotate(
             total_likes=Count('likes'),
@@ -774,6 +1199,7 @@ class SearchPostsView(APIView):
                 "content": p.content,
                 "post_type": p.post_type,
                 "created_at": p.created_at,
+                "media": media.attachment_payload(p.attachments),
                 "likes_count": p.total_likes,
                 "is_liked": p.is_liked,       # ✅ Interactive Heart
                 "is_mine": p.user_id == request.user.id, # ✅ Interactive Delete
@@ -795,7 +1221,7 @@ class CheckNewNotificationsView(APIView):
 
 
 # 2. MAIN LIST VIEW (Call this ONLY when 'has_new' is True)
-class NotificationListView(APIView):
+class NotificationListView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):